@@ -0,0 +1,120 @@
+# benchmark of the model file loading in assembler.assemble_project
+#
+# generates a few hundred model files and times reading and decoding them
+# (iter_definitions) serially with the stdlib json module against the thread
+# pool with each installed JSON backend. The serialization into the spec is
+# timed separately as it does not depend on the backend, and every combination
+# is checked to produce the same definitions section
+#
+#   python benchmarks/bench_models.py [--files 400] [--models 25] [--repeat 3]
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'swagger-parser'))
+
+import assembler
+import json_backend
+
+POOL_WORKERS = 8
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--files", help="number of model files", type=int, default=400)
+    arg_parser.add_argument("--models", help="models per file", type=int, default=25)
+    arg_parser.add_argument("--repeat", help="runs per configuration, the best one is reported", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        model_list = write_models(model_dir, args.files, args.models)
+        total_bytes = sum(os.path.getsize(model_file) for model_file in model_list)
+        print('%d model files, %d models, %.1f MB' % (args.files, args.files * args.models, total_bytes / 1e6))
+
+        configurations = [('json', 1)]
+        for name in sorted(json_backend.BACKENDS):
+            if name != 'json':
+                configurations.append((name, 1))
+            configurations.append((name, POOL_WORKERS))
+
+        reference = None
+        baseline = None
+
+        for name, workers in configurations:
+            backend = json_backend.get_backend(name)
+            best = None
+            for _ in range(args.repeat):
+                elapsed = time_loading(model_list, backend, workers)
+                best = elapsed if best is None else min(best, elapsed)
+
+            spool_elapsed, output = time_spooling(model_list, backend, workers)
+
+            if reference is None:
+                reference = output
+            elif output != reference:
+                print('ERROR: %s with %d workers produced a different spec' % (name, workers))
+                sys.exit(1)
+
+            baseline = baseline or best
+            print('%-8s workers=%-3d load %8.3fs  %5.2fx   load + serialize %8.3fs'
+                % (name, workers, best, baseline / best, spool_elapsed))
+
+def time_loading(model_list, backend, workers):
+    start = time.perf_counter()
+    for _ in assembler.iter_definitions(model_list, None, backend, workers):
+        pass
+    return time.perf_counter() - start
+
+def time_spooling(model_list, backend, workers):
+    # times the loading and spooling of every model file and returns the
+    # elapsed time along with the definitions section it produced
+    start = time.perf_counter()
+    with tempfile.TemporaryFile() as spool:
+        spooled = assembler.spool_definitions(model_list, spool, None, backend, workers)
+        elapsed = time.perf_counter() - start
+
+        output = io.StringIO()
+        definitions = assembler.StreamedObject(spooled, lambda model: assembler.read_spooled(spool, spooled[model]))
+        assembler.write_spec(output, {}, {'definitions': definitions})
+
+    return elapsed, output.getvalue()
+
+def write_models(model_dir, files, models):
+    rng = random.Random(files * models)
+    model_list = []
+
+    for file_index in range(files):
+        definitions = {}
+        for model_index in range(models):
+            name = 'Model%d_%d' % (file_index, model_index)
+            definitions[name] = make_model(rng, files, models)
+
+        model_file = os.path.join(model_dir, 'Model%d.json' % file_index)
+        with open(model_file, 'w') as outfile:
+            json.dump({'definitions': definitions}, outfile, indent=2)
+        model_list.append(model_file)
+
+    return model_list
+
+def make_model(rng, files, models):
+    properties = {}
+    for index in range(rng.randint(3, 15)):
+        kind = rng.random()
+        if kind < 0.2:
+            prop = {'$ref': '#/definitions/Model%d_%d' % (rng.randrange(files), rng.randrange(models))}
+        elif kind < 0.4:
+            prop = {'type': 'array', 'items': {'type': 'string'}}
+        elif kind < 0.7:
+            prop = {'type': 'integer', 'format': 'int64', 'example': rng.randint(0, 10 ** 6)}
+        else:
+            prop = {'type': 'number', 'example': rng.random() * 1000, 'description': 'value é %d' % index}
+        properties['field%d' % index] = prop
+
+    return {'type': 'object', 'required': sorted(properties)[:2], 'properties': properties}
+
+if __name__ == '__main__':
+    main()
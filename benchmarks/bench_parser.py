@@ -0,0 +1,208 @@
+# benchmark of the resource parsing pipeline across corpus sizes
+#
+# generates a synthetic project per size tier (see corpus.py) and times the
+# annotation parsers (parse_api_operation, parse_implicit_params), whole
+# files (parse_class), the conversion (converter.assemble_class) and an
+# end-to-end run of parser.py without the build cache. For every benchmark
+# it reports the best time, the time per method, the peak memory and how
+# the time grows from one tier to the next (a growth exponent of 1 is
+# linear in the number of methods)
+#
+# results can be saved and later compared against, the run fails when any
+# benchmark got slower than the threshold allows:
+#   python benchmarks/bench_parser.py --save baseline.json
+#   python benchmarks/bench_parser.py --baseline baseline.json [--threshold 0.25]
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+PARSER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'swagger-parser')
+sys.path.insert(0, PARSER_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import converter
+import corpus
+import lexer
+import parser
+
+# name -> (resources, methods per class, params per method, responses per method)
+TIERS = [
+    ('small', (10, 5, 3, 2)),
+    ('medium', (40, 10, 5, 3)),
+    ('large', (160, 20, 8, 4))
+]
+
+BENCHMARKS = ['parse_api_operation', 'parse_implicit_params', 'parse_class', 'assemble_class', 'main']
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--tiers", help="comma separated tiers to run",
+                    default=','.join(name for name, _ in TIERS))
+    arg_parser.add_argument("--repeat", help="runs per benchmark, the best one is reported", type=int, default=3)
+    arg_parser.add_argument("--save", help="write the results to this file")
+    arg_parser.add_argument("--baseline", help="results file (see --save) to compare against")
+    arg_parser.add_argument("--threshold", help="allowed slowdown against the baseline, 0.25 = 25%%",
+                    type=float, default=0.25)
+    args = arg_parser.parse_args()
+
+    selected = args.tiers.split(',')
+    results = {}
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        for name, sizes in TIERS:
+            if name not in selected:
+                continue
+
+            config_file = corpus.write_corpus(os.path.join(work_dir, name), *sizes)
+            results[name] = run_tier(config_file, work_dir, args.repeat)
+            report_tier(name, sizes, results[name])
+
+    report_growth(results)
+
+    if args.save:
+        with open(args.save, 'w') as outfile:
+            json.dump(results, outfile, sort_keys=True, indent=4 * ' ')
+
+    if args.baseline:
+        with open(args.baseline) as infile:
+            regressions = compare(results, json.load(infile), args.threshold)
+        if regressions:
+            for regression in regressions:
+                print('REGRESSION: ' + regression)
+            sys.exit(1)
+        print('no regressions beyond %d%%' % (args.threshold * 100))
+
+def run_tier(config_file, work_dir, repeat):
+    # returns benchmark -> {'seconds', 'peak_kb', 'methods'} for one corpus
+    base_dir = os.path.dirname(config_file)
+    info_obj = parser.load_config(config_file)
+    resource_list, _ = parser.get_resource_model_lists(info_obj['include'], False, base_dir)
+
+    # the inputs of the individual stages are prepared up front so that each
+    # benchmark only times its own stage
+    annotations = []
+    classes = []
+    for source_file in resource_list:
+        with open(source_file, 'rb') as infile:
+            api_blocks = list(lexer.scan(infile.read(), prefilter=True))
+        class_block = next(block for block in api_blocks if block.is_class)
+        resource = parser.parse_resource(lexer.class_header(class_block))
+        annotations.extend(block.annotation for block in api_blocks if not block.is_class)
+        classes.append((parser.parse_methods(api_blocks, False), resource))
+
+    methods = len(annotations)
+
+    def parse_operations():
+        for annotation in annotations:
+            parser.parse_api_operation(annotation)
+
+    def parse_params():
+        for annotation in annotations:
+            parser.parse_implicit_params(annotation)
+
+    def parse_classes():
+        for source_file in resource_list:
+            parser.parse_class(source_file, False)
+
+    def assemble_classes():
+        for operations, resource in classes:
+            converter.assemble_class(operations, resource)
+
+    tier = {}
+    tier['parse_api_operation'] = measure(parse_operations, repeat)
+    tier['parse_implicit_params'] = measure(parse_params, repeat)
+    tier['parse_class'] = measure(parse_classes, repeat)
+    tier['assemble_class'] = measure(assemble_classes, repeat)
+    tier['main'] = measure_main(config_file, work_dir, repeat)
+
+    for result in tier.values():
+        result['methods'] = methods
+
+    return tier
+
+def measure(function, repeat):
+    # best wall time of repeat runs, the peak memory is taken from a separate
+    # run as tracemalloc slows everything down
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'seconds': best, 'peak_kb': peak // 1024}
+
+def measure_main(config_file, work_dir, repeat):
+    # runs parser.py as a separate process, the peak memory is the maximum
+    # resident set size of that process
+    output_file = os.path.join(work_dir, 'apis.json')
+    command = [sys.executable, os.path.join(PARSER_DIR, 'parser.py'), '-c', config_file,
+        '-o', output_file, '--no-cache']
+
+    best = None
+    peak_kb = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+        if hasattr(os, 'wait4'):
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            peak_kb = usage.ru_maxrss
+        else:
+            process.wait()
+        elapsed = time.perf_counter() - start
+
+        if process.returncode != 0:
+            print('ERROR: parser.py exited with status %d' % process.returncode)
+            sys.exit(1)
+        best = elapsed if best is None else min(best, elapsed)
+
+    return {'seconds': best, 'peak_kb': peak_kb}
+
+def report_tier(name, sizes, tier):
+    print('%s: %d resources x %d methods, %d params, %d responses'
+        % ((name,) + sizes))
+    for benchmark in BENCHMARKS:
+        result = tier[benchmark]
+        print('  %-22s %9.4fs  %8.1fus/method  peak %s KB' % (benchmark, result['seconds'],
+            result['seconds'] / result['methods'] * 1e6, result['peak_kb']))
+
+def report_growth(results):
+    # growth exponent of each benchmark between consecutive tiers, ie: the k
+    # in time ~ methods^k
+    names = [name for name, _ in TIERS if name in results]
+    for previous, current in zip(names, names[1:]):
+        print('growth %s -> %s:' % (previous, current))
+        for benchmark in BENCHMARKS:
+            before = results[previous][benchmark]
+            after = results[current][benchmark]
+            exponent = math.log(after['seconds'] / before['seconds']) / math.log(after['methods'] / before['methods'])
+            print('  %-22s %5.2f' % (benchmark, exponent))
+
+def compare(results, baseline, threshold):
+    # returns a description of every benchmark that is more than threshold
+    # slower than in the baseline
+    regressions = []
+    for name, tier in sorted(results.items()):
+        for benchmark, result in sorted(tier.items()):
+            if benchmark not in baseline.get(name, {}):
+                continue
+            before = baseline[name][benchmark]['seconds']
+            if result['seconds'] > before * (1 + threshold):
+                regressions.append('%s/%s took %.4fs against %.4fs (+%.0f%%)' % (name, benchmark,
+                    result['seconds'], before, (result['seconds'] / before - 1) * 100))
+    return regressions
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+# generator of a synthetic project to benchmark the parser against
+#
+# writes annotated JAX-RS resources, the model files they refer to and a
+# SwaggerConfig.json including all of them into the output directory. The
+# resources mix the annotation styles seen in real projects (multi-line
+# @ApiImplicitParams, string concatenation, @Internal methods, generic and
+# fully qualified data types) and their method bodies contain braces and
+# strings the lexer has to step over. The same arguments always produce
+# the same corpus, and its full and production specs pass parser.py validate
+#
+#   python benchmarks/corpus.py DIR [--resources 50] [--methods 10] [--params 4] [--responses 3]
+import argparse
+import json
+import os
+import random
+
+HTTP_METHODS = ['GET', 'POST', 'PUT', 'DELETE', 'PATCH']
+# the first parameter of a method is always its {id} path parameter
+PARAM_TYPES = ['query', 'header', 'body']
+PRIMITIVE_TYPES = ['long', 'integer', 'string', 'boolean', 'double', 'date', 'byte[]']
+RESPONSE_CODES = [200, 201, 204, 400, 401, 403, 404, 409, 422, 500]
+
+# models written per model file, every resource gets its own model file
+MODELS_PER_FILE = 5
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("directory", help="directory the project is written to")
+    arg_parser.add_argument("--resources", help="number of resource classes", type=int, default=50)
+    arg_parser.add_argument("--methods", help="annotated methods per class", type=int, default=10)
+    arg_parser.add_argument("--params", help="@ApiImplicitParams per method", type=int, default=4)
+    arg_parser.add_argument("--responses", help="@ApiResponses per method", type=int, default=3)
+    arg_parser.add_argument("--seed", help="seed of the random choices", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    config_file = write_corpus(args.directory, args.resources, args.methods, args.params,
+        args.responses, args.seed)
+    print('wrote ' + config_file)
+
+def write_corpus(directory, resources, methods, params, responses, seed=0):
+    # writes the project and returns the path of its SwaggerConfig.json
+    rng = random.Random(seed)
+    os.makedirs(os.path.join(directory, 'resources'), exist_ok=True)
+    os.makedirs(os.path.join(directory, 'models'), exist_ok=True)
+
+    include = []
+    for index in range(resources):
+        resource = 'resources/Resource%d.java' % index
+        model = 'models/Model%d.json' % index
+
+        with open(os.path.join(directory, resource), 'w') as outfile:
+            outfile.write(make_resource(rng, index, resources, methods, params, responses))
+
+        with open(os.path.join(directory, model), 'w') as outfile:
+            json.dump(make_models(rng, index, resources), outfile, indent=2)
+
+        include.append({
+            'name': 'resource%d' % index,
+            'description': 'Operations of resource %d' % index,
+            'resource': resource,
+            'model': model,
+            'production': is_production(index)
+        })
+
+    config = {
+        'swagger': '2.0',
+        'info': {'version': '1.0.0', 'title': 'Synthetic API'},
+        'host': 'api.example.com',
+        'basePath': '/v1',
+        'schemes': ['https'],
+        'include': include
+    }
+
+    config_file = os.path.join(directory, 'SwaggerConfig.json')
+    with open(config_file, 'w') as outfile:
+        json.dump(config, outfile, indent=2)
+
+    return config_file
+
+def make_resource(rng, index, resources, methods, params, responses):
+    lines = []
+    lines.append('package bench.resource;')
+    lines.append('')
+    lines.append('import javax.ws.rs.*;')
+    lines.append('import java.util.List;')
+    lines.append('')
+    lines.append('/*api')
+    lines.append(' * @Path("/resource%d")' % index)
+    lines.append(' * @Api(value = "/resource%d", description = "Operations of resource %d", tags = {"resource%d"})'
+        % (index, index, index))
+    lines.append(' */')
+    lines.append('@Produces({"application/json"})')
+    lines.append('public class Resource%d {' % index)
+    lines.append('    private static final String PREFIX = "{resource%d}";' % index)
+    lines.append('')
+
+    for method_index in range(methods):
+        lines.extend(make_method(rng, index, method_index, resources, params, responses))
+
+    lines.append('}')
+    lines.append('')
+    return '\n'.join(lines)
+
+def make_method(rng, index, method_index, resources, params, responses):
+    http_method = HTTP_METHODS[method_index % len(HTTP_METHODS)]
+    name = '%s%dItem%d' % (http_method.lower(), index, method_index)
+
+    operation = ['value = "Operation %d of resource %d"' % (method_index, index)]
+    if rng.random() < 0.5:
+        operation.append('notes = "Returns the item " + "when it exists, {braces} and (parens) " + "are kept"')
+    if http_method != 'DELETE':
+        operation.append('response = "%s"' % model_name(rng, resources))
+        if rng.random() < 0.3:
+            operation.append('responseContainer = "List"')
+    operation.append('httpMethod = "%s"' % http_method)
+    if rng.random() < 0.2:
+        operation.append('nickname = "%sAlias"' % name)
+    if rng.random() < 0.2:
+        operation.append('tags = {"resource%d", "shared"}' % index)
+
+    lines = []
+    lines.append('    /*api')
+    lines.append('     * @%s' % http_method)
+    lines.append('     * @Path("/{id}/item%d")' % method_index)
+    if rng.random() < 0.1:
+        lines.append('     * @Internal')
+    lines.append('     * @ApiOperation(%s)' % ', '.join(operation))
+
+    if responses:
+        codes = sorted(rng.sample(RESPONSE_CODES, min(responses, len(RESPONSE_CODES))))
+        entries = []
+        for code in codes:
+            if code >= 400 and rng.random() < 0.3:
+                entries.append('@ApiResponse(code = %d, message = "Error %d", response = "ApiError")' % (code, code))
+            else:
+                entries.append('@ApiResponse(code = %d, message = "Status %d")' % (code, code))
+        lines.append('     * @ApiResponses(value = { %s })' % ', '.join(entries))
+
+    if params:
+        lines.append('     * @ApiImplicitParams({')
+        entries = []
+        param_types = []
+        for param_index in range(params):
+            entries.append('     *     ' + make_param(rng, param_index, resources, param_types))
+        lines.append(',\n'.join(entries))
+        lines.append('     * })')
+
+    lines.append('     */')
+    lines.append('    public Response %s(@PathParam("id") String id) throws NotFoundException {' % name)
+    lines.append('        if (id == null) { throw new NotFoundException("missing {id}"); }')
+    lines.append('        String text = "char \'}\' and \\"quote\\"";')
+    lines.append('        return Response.ok(PREFIX + id).build();')
+    lines.append('    }')
+    lines.append('')
+    return lines
+
+def make_param(rng, param_index, resources, param_types):
+    # param_types are the types of the method's earlier parameters, a method
+    # can only have one body
+    if param_index == 0:
+        param_type = 'path'
+        attributes = ['name = "id"', 'value = "Id of the item"']
+    else:
+        param_type = rng.choice([choice for choice in PARAM_TYPES if choice != 'body' or 'body' not in param_types])
+        attributes = ['name = "param%d"' % param_index, 'value = "Parameter %d"' % param_index]
+    param_types.append(param_type)
+
+    if param_type == 'body':
+        kind = rng.random()
+        if kind < 0.4:
+            data_type = model_name(rng, resources)
+        elif kind < 0.7:
+            data_type = 'List<%s>' % model_name(rng, resources)
+        elif kind < 0.9:
+            data_type = 'Map<String, %s>' % model_name(rng, resources)
+        else:
+            data_type = 'bench.model.' + model_name(rng, resources)
+    else:
+        data_type = rng.choice(PRIMITIVE_TYPES)
+
+    attributes.append('required = %s' % ('true' if param_type == 'path' else rng.choice(['true', 'false'])))
+    attributes.append('dataType = "%s"' % data_type)
+    attributes.append('paramType = "%s"' % param_type)
+
+    if data_type in ('long', 'integer') and rng.random() < 0.5:
+        attributes.append('allowableValues = "range[1, %d]"' % rng.randint(10, 1000))
+    elif data_type == 'string' and rng.random() < 0.5:
+        attributes.append('allowableValues = "available,pending,sold"')
+    if param_type == 'query' and rng.random() < 0.3:
+        attributes.append('allowMultiple = true')
+
+    return '@ApiImplicitParam(%s)' % ', '.join(attributes)
+
+def make_models(rng, index, resources):
+    definitions = {}
+    for model_index in range(MODELS_PER_FILE):
+        properties = {'id': {'type': 'integer', 'format': 'int64'}}
+        for prop_index in range(rng.randint(2, 8)):
+            if rng.random() < 0.25:
+                properties['link%d' % prop_index] = {'$ref': '#/definitions/' + model_name(rng, resources)}
+            else:
+                properties['field%d' % prop_index] = {'type': 'string', 'example': 'value %d' % prop_index}
+        definitions['Model%d_%d' % (index, model_index)] = {'type': 'object', 'properties': properties}
+
+    if index == 0:
+        definitions['ApiError'] = {'type': 'object', 'properties': {'message': {'type': 'string'}}}
+
+    return {'definitions': definitions}
+
+def is_production(index):
+    return index % 4 != 3
+
+def model_name(rng, resources):
+    # only the models of production resources are referred to, so that the
+    # production spec has no dangling $refs either
+    index = rng.choice([index for index in range(resources) if is_production(index)])
+    return 'Model%d_%d' % (index, rng.randrange(MODELS_PER_FILE))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+import hashlib
+import os
+import tempfile
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def min_path(output_file):
+    # apis.json -> apis.min.json
+    root, ext = os.path.splitext(output_file)
+    return root + '.min' + ext
+
+def manifest_path(output_file):
+    # apis.json -> apis.manifest.json
+    root, ext = os.path.splitext(output_file)
+    return root + '.manifest' + ext
+
+def spec_etag(sha256):
+    # the ETag of a spec is taken from the sha256 of its minified form, the
+    # manifest of the artifacts and parser.py serve hand out the same one
+    return '"' + sha256[:32] + '"'
+
+def gzip_compressor():
+    # gzip stream without a timestamp so identical content always compresses
+    # to identical bytes
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress, compressor.flush
+
+def brotli_compressor():
+    compressor = brotli.Compressor(quality=11)
+    return compressor.process, compressor.finish
+
+class OutputFile:
+    # a text file that is written to a temporary file next to it while its
+    # sha256 is computed, the existing file is only replaced when the content
+    # differs, so unchanged outputs keep their modification time and whatever
+    # watches them sees no change. With a compressor, a (compress, flush) pair
+    # of functions, the encoded text is compressed before it is written
+    def __init__(self, path, compressor=None):
+        self.path = path
+        self.compressor = compressor
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.sha256 = None
+        self.changed = None
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, self.tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '.', suffix='.tmp')
+        self.tmp = os.fdopen(fd, 'wb')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        if exc_type:
+            self.discard()
+        else:
+            self.close()
+
+    def write(self, text):
+        self.write_bytes(text.encode('utf-8'))
+
+    def write_bytes(self, data):
+        if self.compressor:
+            data = self.compressor[0](data)
+        self.put(data)
+
+    def put(self, data):
+        self.digest.update(data)
+        self.size += len(data)
+        self.tmp.write(data)
+
+    def close(self):
+        # moves the temporary file into place unless the file on disk already
+        # has the same content, returns whether the file was replaced
+        if self.compressor:
+            self.put(self.compressor[1]())
+
+        self.tmp.close()
+        self.sha256 = self.digest.hexdigest()
+        self.changed = not same_content(self.path, self.size, self.sha256)
+
+        if self.changed:
+            # temporary files are private, give the output the permissions a
+            # plain open() would have
+            os.chmod(self.tmp_path, file_mode())
+            os.replace(self.tmp_path, self.path)
+        else:
+            os.remove(self.tmp_path)
+
+        return self.changed
+
+    def discard(self):
+        self.tmp.close()
+        os.remove(self.tmp_path)
+
+class Tee:
+    # writes the same text to several output files, encoding it only once
+    def __init__(self, outputs):
+        self.outputs = outputs
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        for output in self.outputs:
+            output.__exit__(exc_type, exc_value, exc_traceback)
+
+    def write(self, text):
+        data = text.encode('utf-8')
+        for output in self.outputs:
+            output.write_bytes(data)
+
+def file_mode():
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+def same_content(path, size, sha256):
+    # compares a file on disk against a size and sha256 without reading it
+    # into memory all at once
+    try:
+        if os.path.getsize(path) != size:
+            return False
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as existing:
+            for chunk in iter(lambda: existing.read(1024 * 1024), b''):
+                digest.update(chunk)
+    except OSError:
+        return False
+
+    return digest.hexdigest() == sha256
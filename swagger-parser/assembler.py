@@ -1,10 +1,141 @@
+import re
 import json
+import hashlib
+import json_backend
+import artifacts
+import openapi
+import profiler
+import os
+import tempfile
+import collections
+import concurrent.futures
 
-def assemble_project(complete_paths_obj, model_list, tags, metadata):
-    final_obj = {}
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+OUTPUT_FILE = 'apis.json'
+INDENT = 4 * ' '
+
+DEFINITIONS_PREFIX = '#/definitions/'
+
+# per-tag shards, see write_tag_shards
+# the shard files carry a prefix so that no tag can end up as the index
+SHARD_INDEX = 'index.json'
+SHARD_PREFIX = 'tag-'
+DEFAULT_SHARD = 'default'
+SHARD_NAME_REGEX = re.compile(r'[^\w.-]')
+
+# extra formats the spec can be written in next to the Swagger 2.0 JSON,
+# see emit_formats. suffix replaces the extension of the output file, openapi
+# converts the spec to OpenAPI 3.0 and yaml writes YAML instead of JSON
+Emitter = collections.namedtuple('Emitter', ['suffix', 'openapi', 'yaml'])
+EMITTERS = {
+    'yaml': Emitter('.yaml', False, True),
+    'openapi3': Emitter('.openapi3.json', True, False),
+    'openapi3-yaml': Emitter('.openapi3.yaml', True, True)
+}
+
+# the C based dumper is an order of magnitude faster where libyaml is there
+if yaml:
+    class SpecDumper(getattr(yaml, 'CSafeDumper', None) or yaml.SafeDumper):
+        # interned schemas (see converter.intern_schema) and the ones
+        # openapi.convert_response shares between media types are written
+        # out in full instead of as &id001 anchors and *id001 aliases
+        def ignore_aliases(self, data):
+            return True
+
+    # the frozen schemas are dict subclasses, they are written as mappings
+    SpecDumper.add_multi_representer(dict, yaml.SafeDumper.represent_dict)
+    YAML_DUMPER = SpecDumper
+else:
+    YAML_DUMPER = None
+
+# number of threads reading and decoding model files, decoding holds the GIL
+# so more than one only pays off when the files sit on slow or network storage
+MODEL_WORKERS = 1
+
+def assemble_project(complete_paths_obj, model_list, tags, metadata, build_cache=None,
+    backend=None, workers=MODEL_WORKERS, prune=False, build_artifacts=False, tag_shards=False,
+    output_file=OUTPUT_FILE, build_profiler=profiler.NULL_PROFILER, formats=()):
+    # writes the spec to output_file (unless it is unchanged), with prune set
+    # the definitions that can't be reached from any path are left out, with
+    # build_artifacts set the minified, compressed and manifest files are
+    # written next to it and with tag_shards set a spec fragment per tag is
+    # written as well. formats names EMITTERS to also write the spec in.
+    # Returns the names of the pruned definitions
+
+    # everything besides the paths and definitions is small enough to be
+    # serialized in one go
+    final_obj = spec_header(tags, metadata)
+
+    # the models are serialized one model file at a time into a spool file
+    # and the paths one path at a time straight into the output, so peak
+    # memory is bounded by the largest single entry rather than the whole spec
+    with tempfile.TemporaryFile() as spool:
+        ref_index = {} if prune or tag_shards else None
+        with build_profiler.stage('models'):
+            spooled = spool_definitions(model_list, spool, build_cache, backend, workers, ref_index)
+        build_profiler.count('model_files', len(model_list))
+        build_profiler.count('definitions', len(spooled))
+
+        pruned = []
+        model_names = spooled
+        if prune:
+            with build_profiler.stage('prune'):
+                model_names, pruned = prune_definitions(complete_paths_obj, ref_index)
 
-    # aggregate paths obj with project info
+        streamed = {}
+        streamed['paths'] = StreamedObject(complete_paths_obj, complete_paths_obj.get)
+        streamed['definitions'] = StreamedObject(model_names, lambda model: read_spooled(spool, spooled[model]))
+
+        with build_profiler.stage('emit'):
+            with artifacts.OutputFile(output_file) as outfile:
+                write_spec(outfile, final_obj, streamed)
+        build_profiler.count('output_bytes', outfile.size)
+
+        if build_artifacts:
+            with build_profiler.stage('artifacts'):
+                write_artifacts(output_file, outfile, final_obj, streamed)
+
+        if tag_shards:
+            with build_profiler.stage('shards'):
+                write_tag_shards(output_file, final_obj, complete_paths_obj, ref_index, streamed['definitions'])
+
+        if formats:
+            with build_profiler.stage('formats'):
+                emit_formats(output_file, final_obj, streamed, formats)
+
+    return pruned
+
+def build_spec(complete_paths_obj, model_list, tags, metadata, build_cache=None, backend=None,
+    workers=MODEL_WORKERS, prune=False, build_profiler=profiler.NULL_PROFILER):
+    # in-memory counterpart of assemble_project, returns the whole spec as a
+    # dict instead of streaming it to a file
+    final_obj = spec_header(tags, metadata)
     final_obj['paths'] = complete_paths_obj
+    final_obj['definitions'] = {}
+
+    # inject the models into the final object
+    with build_profiler.stage('models'):
+        for definitions in iter_definitions(model_list, build_cache, backend, workers):
+            for model in definitions:
+                final_obj['definitions'][model] = definitions[model]
+    build_profiler.count('model_files', len(model_list))
+    build_profiler.count('definitions', len(final_obj['definitions']))
+
+    if prune:
+        with build_profiler.stage('prune'):
+            ref_index = dict((model, collect_refs(value)) for model, value in final_obj['definitions'].items())
+            reachable, _ = prune_definitions(complete_paths_obj, ref_index)
+            final_obj['definitions'] = dict((model, final_obj['definitions'][model]) for model in reachable)
+
+    return final_obj
+
+def spec_header(tags, metadata):
+    # returns the spec without its paths and definitions
+    final_obj = {}
 
     # add the metadata to the final object
     final_obj['swagger'] = metadata['swagger']
@@ -12,21 +143,6 @@ def assemble_project(complete_paths_obj, model_list, tags, metadata):
     final_obj['host'] = metadata['host']
     final_obj['basePath'] = metadata['basePath']
     final_obj['schemes'] = metadata['schemes']
-    final_obj['definitions'] = {}
-
-    # inject the models into the final object
-    for model_file in model_list:
-        try:
-            with open(model_file) as mdl:
-                model_obj = json.load(mdl)
-
-            try:
-                for model in model_obj['definitions']:
-                    final_obj['definitions'][model] = model_obj['definitions'][model]
-            except:
-                print('WARNING: ' + model_file + ' contains an empty JSON object')
-        except ValueError:
-            print('WARNING: ' + model_file + ' is either empty or contains malformed JSON')
 
     # inject top-level tags
     final_obj['tags'] = []
@@ -37,5 +153,372 @@ def assemble_project(complete_paths_obj, model_list, tags, metadata):
             'description': tag[1]
         })
 
-    with open('apis.json', 'w') as outfile:
-        json.dump(final_obj, outfile, sort_keys=True,  indent=4 * ' ')
+    return final_obj
+
+def emit_formats(output_file, final_obj, streamed, formats):
+    # writes the spec (the header and the streamed paths and definitions of
+    # write_spec) in each of the formats next to output_file, eg: apis.json ->
+    # apis.openapi3.json. Every format reads the same entries, nothing is
+    # parsed or assembled again
+    for name in formats:
+        emitter = EMITTERS[name]
+        header, entries = final_obj, streamed
+        if emitter.openapi:
+            header, entries = openapi.convert_spec(final_obj, streamed)
+
+        with artifacts.OutputFile(format_path(output_file, name)) as outfile:
+            if emitter.yaml:
+                write_yaml_spec(outfile, header, entries)
+            else:
+                write_spec(outfile, header, entries)
+
+def format_path(output_file, name):
+    # apis.json -> apis.yaml, apis.openapi3.json, ...
+    return os.path.splitext(output_file)[0] + EMITTERS[name].suffix
+
+def streamed_spec(spec):
+    # splits a spec dict (see build_spec) into the header and streamed
+    # objects write_spec and emit_formats take
+    final_obj = dict((key, value) for key, value in spec.items() if key not in ('paths', 'definitions'))
+    streamed = {}
+    streamed['paths'] = StreamedObject(spec['paths'], spec['paths'].get)
+    streamed['definitions'] = StreamedObject(spec['definitions'], spec['definitions'].get)
+    return final_obj, streamed
+
+def write_spec_file(spec, output_file):
+    # writes a spec dict (see build_spec) to output_file unless it is unchanged
+    with artifacts.OutputFile(output_file) as outfile:
+        json.dump(spec, outfile, sort_keys=True, indent=INDENT)
+    return outfile.changed
+
+def prune_definitions(paths, ref_index):
+    # returns the reachable model names and the sorted unreachable ones, which
+    # are reported
+    reachable, pruned = find_reachable(paths, ref_index)
+    if pruned:
+        print('NOTE: pruned ' + str(len(pruned)) + ' unreachable definitions: ' + ', '.join(pruned))
+    return reachable, pruned
+
+def write_tag_shards(output_file, final_obj, complete_paths_obj, ref_index, definitions):
+    # writes one spec per tag into the shard directory next to output_file
+    # holding only the operations with that tag (operations without tags go
+    # in DEFAULT_SHARD) and the models they need, plus an index of the shards and their hashes for clients to
+    # load them lazily. Unchanged shards are not rewritten and the shards of
+    # tags that no longer exist are removed
+    shard_dir = shard_path(output_file)
+    os.makedirs(shard_dir, exist_ok=True)
+
+    descriptions = dict((tag['name'], tag['description']) for tag in final_obj['tags'])
+    shards = collections.OrderedDict((tag['name'], {}) for tag in final_obj['tags'])
+
+    for path in sorted(complete_paths_obj):
+        for verb, operation in complete_paths_obj[path].items():
+            for tag in operation.get('tags') or [DEFAULT_SHARD]:
+                shards.setdefault(tag, {}).setdefault(path, {})[verb] = operation
+
+    index = {}
+    index['shards'] = []
+    written = set()
+
+    for tag, shard_paths in shards.items():
+        if not shard_paths:
+            continue
+
+        shard_obj = dict(final_obj)
+        shard_obj['tags'] = [{'name': tag, 'description': descriptions.get(tag, '')}]
+
+        reachable, _ = find_reachable(shard_paths, ref_index)
+        streamed = {}
+        streamed['paths'] = StreamedObject(shard_paths, shard_paths.get)
+        streamed['definitions'] = StreamedObject(reachable, definitions.get_value)
+
+        file_name = shard_file_name(tag, written)
+        with artifacts.OutputFile(os.path.join(shard_dir, file_name)) as shard_file:
+            write_spec(shard_file, shard_obj, streamed)
+
+        written.add(file_name)
+        index['shards'].append({
+            'tag': tag,
+            'file': file_name,
+            'bytes': shard_file.size,
+            'sha256': shard_file.sha256,
+            'paths': len(shard_paths)
+        })
+
+    with artifacts.OutputFile(os.path.join(shard_dir, SHARD_INDEX)) as index_file:
+        index_file.write(dump_entry(index))
+
+    for file_name in os.listdir(shard_dir):
+        if file_name.endswith('.json') and file_name != SHARD_INDEX and file_name not in written:
+            os.remove(os.path.join(shard_dir, file_name))
+
+def shard_file_name(tag, taken):
+    # tag-<tag>.json, tags with characters that are not safe in a file name
+    # (or that would clash with a name in taken) get a hash of the tag added,
+    # eg: 'a b' and 'a/b' -> tag-a_b-<hash>.json
+    name = SHARD_NAME_REGEX.sub('_', tag)
+    file_name = SHARD_PREFIX + name + '.json'
+
+    if name != tag or file_name in taken:
+        digest = hashlib.sha256(tag.encode('utf-8')).hexdigest()
+        length = 8
+        file_name = SHARD_PREFIX + name + '-' + digest[:length] + '.json'
+        while file_name in taken:
+            length += 8
+            file_name = SHARD_PREFIX + name + '-' + digest[:length] + '.json'
+
+    return file_name
+
+def shard_path(output_file):
+    # apis.json -> apis.shards
+    return os.path.splitext(output_file)[0] + '.shards'
+
+def write_artifacts(output_file, outfile, final_obj, streamed):
+    # writes the minified spec along with its gzip (and brotli, if available)
+    # compressed copies and a manifest of their sizes and hashes. The sha256
+    # of the minified spec doubles as the ETag of the spec
+    min_file = artifacts.min_path(output_file)
+    outputs = [artifacts.OutputFile(min_file), artifacts.OutputFile(min_file + '.gz', artifacts.gzip_compressor())]
+    if artifacts.brotli:
+        outputs.append(artifacts.OutputFile(min_file + '.br', artifacts.brotli_compressor()))
+
+    with artifacts.Tee(outputs) as minified:
+        write_spec(minified, final_obj, streamed, indent=None)
+
+    manifest = {}
+    manifest['etag'] = artifacts.spec_etag(outputs[0].sha256)
+    manifest['sha256'] = outputs[0].sha256
+    manifest['files'] = {}
+
+    for output in [outfile] + outputs:
+        manifest['files'][os.path.basename(output.path)] = {
+            'bytes': output.size,
+            'sha256': output.sha256
+        }
+
+    with artifacts.OutputFile(artifacts.manifest_path(output_file)) as manifest_file:
+        manifest_file.write(dump_entry(manifest))
+
+class StreamedObject:
+    # a JSON object that is written one entry at a time, get_value returns the
+    # value of an entry by name
+    def __init__(self, names, get_value):
+        self.names = names
+        self.get_value = get_value
+
+def write_spec(outfile, final_obj, streamed, indent=INDENT):
+    # writes final_obj plus the streamed objects in exactly the layout
+    # json.dump(..., sort_keys=True, indent=indent) gives the combined object,
+    # or in the compact layout of separators=(',', ':') when indent is None.
+    # A streamed object can also sit one level down, eg: components/schemas
+    combined = dict(final_obj)
+    combined.update(streamed)
+    write_object(outfile, combined, indent, 0)
+
+def write_object(outfile, obj, indent, depth):
+    # writes a dict or StreamedObject nested depth levels deep, the entries of
+    # a StreamedObject are read and written one at a time
+    if indent is None:
+        outer = inner = ''
+        key_separator = ':'
+    else:
+        outer = '\n' + indent * depth
+        inner = outer + indent
+        key_separator = ': '
+
+    names, get_value, nested = object_entries(obj)
+    if not names:
+        outfile.write('{}')
+        return
+
+    outfile.write('{')
+    separator = inner
+    for name in names:
+        value = get_value(name)
+        outfile.write(separator + json.dumps(name) + key_separator)
+        separator = ',' + inner
+
+        if nested and is_streamed(value):
+            write_object(outfile, value, indent, depth + 1)
+        else:
+            outfile.write(dump_entry(value, indent).replace('\n', inner))
+
+    outfile.write(outer + '}')
+
+def write_yaml_spec(outfile, final_obj, streamed):
+    # YAML counterpart of write_spec, block style with sorted keys
+    combined = dict(final_obj)
+    combined.update(streamed)
+    write_yaml_object(outfile, combined, 0)
+
+def write_yaml_object(outfile, obj, depth):
+    prefix = '  ' * depth
+    names, get_value, nested = object_entries(obj)
+
+    for name in names:
+        value = get_value(name)
+
+        if nested and is_streamed(value):
+            # the key on its own line and the entries indented below it
+            key = dump_yaml({name: None})[:-len(' null\n')]
+            if not object_entries(value)[0]:
+                outfile.write(prefix + key + ' {}\n')
+                continue
+            outfile.write(prefix + key + '\n')
+            write_yaml_object(outfile, value, depth + 1)
+        else:
+            outfile.write(''.join(prefix + line for line in dump_yaml({name: value}).splitlines(True)))
+
+def dump_yaml(value):
+    return yaml.dump(value, Dumper=YAML_DUMPER, default_flow_style=False, sort_keys=True, allow_unicode=True)
+
+def object_entries(obj):
+    # returns the sorted names, the getter and whether the values can hold
+    # streamed objects themselves (only those of plain dicts can)
+    if isinstance(obj, StreamedObject):
+        return sorted(obj.names), obj.get_value, False
+    return sorted(obj), obj.get, True
+
+def is_streamed(value):
+    return isinstance(value, StreamedObject) or (isinstance(value, dict)
+        and any(isinstance(item, StreamedObject) for item in value.values()))
+
+def dump_entry(value, indent=INDENT):
+    if indent is None:
+        return json.dumps(value, sort_keys=True, separators=(',', ':'))
+    return json.dumps(value, sort_keys=True, indent=indent)
+
+def spool_definitions(model_list, spool, build_cache=None, backend=None, workers=MODEL_WORKERS,
+    ref_index=None):
+    # serializes the models of every model file into the (binary) spool file
+    # and returns a dict of model name -> (offset, length) in the spool, models
+    # in later files replace the ones with the same name in earlier files.
+    # If a ref_index dict is passed it is filled with model name -> the set of
+    # model names its $refs point at
+    spooled = {}
+
+    for definitions in iter_definitions(model_list, build_cache, backend, workers):
+        for model in definitions:
+            text = dump_entry(definitions[model], None).encode('ascii')
+            spooled[model] = (spool.tell(), len(text))
+            spool.write(text)
+
+            if ref_index is not None:
+                ref_index[model] = collect_refs(definitions[model])
+
+    return spooled
+
+def find_reachable(paths, ref_index):
+    # walks the $refs from the paths object through the definitions and
+    # returns the set of reachable model names and the sorted list of the
+    # unreachable ones. Every path and definition is visited at most once so
+    # this is linear in the size of the spec
+    reachable = set()
+    pending = list(collect_refs(paths))
+
+    while pending:
+        model = pending.pop()
+        if model in reachable or model not in ref_index:
+            continue
+        reachable.add(model)
+        pending.extend(ref_index[model])
+
+    pruned = sorted(model for model in ref_index if model not in reachable)
+    return reachable, pruned
+
+def collect_refs(obj):
+    # returns the set of model names referenced as "$ref": "#/definitions/X"
+    # anywhere inside obj
+    refs = set()
+    pending = [obj]
+
+    while pending:
+        value = pending.pop()
+        if isinstance(value, dict):
+            ref = value.get('$ref')
+            if isinstance(ref, str) and ref.startswith(DEFINITIONS_PREFIX):
+                refs.add(ref[len(DEFINITIONS_PREFIX):])
+            pending.extend(value.values())
+        elif isinstance(value, list):
+            pending.extend(value)
+
+    return refs
+
+def iter_definitions(model_list, build_cache=None, backend=None, workers=MODEL_WORKERS):
+    # yields the definitions of every valid model file in model_list order
+    # while up to workers threads read and decode the files ahead of it. At
+    # most 2 * workers files are in flight so memory stays bounded, and the
+    # warnings are printed in model_list order as if loaded one by one
+    backend = backend or json_backend.get_backend()
+
+    if workers <= 1:
+        for model_file in model_list:
+            definitions = load_definitions(model_file, build_cache, backend)
+            if definitions is not None:
+                yield definitions
+        return
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = collections.deque()
+        model_iter = iter(model_list)
+
+        for model_file in model_iter:
+            in_flight.append(executor.submit(read_definitions, model_file, build_cache, backend))
+            if len(in_flight) >= 2 * workers:
+                break
+
+        while in_flight:
+            definitions, warning = in_flight.popleft().result()
+
+            next_file = next(model_iter, None)
+            if next_file is not None:
+                in_flight.append(executor.submit(read_definitions, next_file, build_cache, backend))
+
+            if warning:
+                print(warning)
+            elif definitions is not None:
+                yield definitions
+
+def read_spooled(spool, location):
+    offset, length = location
+    spool.seek(offset)
+    value = json.loads(spool.read(length))
+    spool.seek(0, 2)
+    return value
+
+def load_definitions(model_file, build_cache=None, backend=None):
+    # returns the definitions object of a model file or None (with a warning)
+    # if the file is malformed, unchanged files are served from the build cache
+    definitions, warning = read_definitions(model_file, build_cache, backend)
+    if warning:
+        print(warning)
+    return definitions
+
+def read_definitions(model_file, build_cache=None, backend=None):
+    # returns a (definitions, warning) tuple for a model file where exactly
+    # one of the two is None
+    backend = backend or json_backend.get_backend()
+
+    with open(model_file, 'rb') as mdl:
+        raw_model = mdl.read()
+
+    if build_cache:
+        cache_key = build_cache.key('model', raw_model)
+        definitions = build_cache.get(cache_key)
+        if definitions is not None:
+            return definitions, None
+
+    try:
+        model_obj = backend.loads(raw_model)
+    except ValueError:
+        return None, 'WARNING: ' + model_file + ' is either empty or contains malformed JSON'
+
+    try:
+        definitions = dict((model, model_obj['definitions'][model]) for model in model_obj['definitions'])
+    except:
+        return None, 'WARNING: ' + model_file + ' contains an empty JSON object'
+
+    if build_cache:
+        build_cache.put(cache_key, definitions)
+
+    return definitions, None
@@ -0,0 +1,100 @@
+import hashlib
+import json_backend
+import os
+import shutil
+import tempfile
+
+################################################
+CACHE_DIR = '.swagger-cache'
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+################################################
+
+class BuildCache:
+    # on-disk store of parse results keyed on the content hash of the source
+    # file, the parser version and the flags that influence the result
+    #
+    # entries are plain JSON files spread over 256 sub directories, and the
+    # modification time of an entry doubles as its last use so that eviction
+    # can drop the least recently used entries once max_bytes is exceeded
+
+    def __init__(self, version, directory=CACHE_DIR, max_bytes=MAX_CACHE_BYTES, backend=None):
+        self.version = version
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.backend = backend or json_backend.get_backend()
+
+    def key(self, kind, content, *flags):
+        # kind separates the different result types (resource, model) and
+        # flags are any options that change the result, eg: production
+        digest = hashlib.sha256()
+        digest.update(('%s\0%s\0%s\0' % (self.version, kind, flags)).encode('utf-8'))
+        digest.update(content)
+        return digest.hexdigest()
+
+    def get(self, key):
+        # returns the cached value or None on a miss
+        entry_path = self.entry_path(key)
+        try:
+            with open(entry_path, 'rb') as entry:
+                value = self.backend.loads(entry.read())
+        except (OSError, ValueError):
+            return None
+
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+
+        return value
+
+    def put(self, key, value):
+        # entries are written to a temporary file first and then moved into
+        # place so concurrent builds never see a partially written entry
+        entry_path = self.entry_path(key)
+        entry_dir = os.path.dirname(entry_path)
+
+        try:
+            os.makedirs(entry_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=entry_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as entry:
+                entry.write(self.backend.dumps(value))
+            os.replace(tmp_path, entry_path)
+        except OSError:
+            print('WARNING: unable to write cache entry ' + entry_path)
+
+    def evict(self):
+        # removes the least recently used entries until the cache fits in
+        # max_bytes, returns the number of entries removed
+        entries = []
+        total_bytes = 0
+
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                entry_path = os.path.join(root, name)
+                try:
+                    stat = os.stat(entry_path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry_path))
+                total_bytes += stat.st_size
+
+        removed = 0
+        entries.sort()
+
+        for _, size, entry_path in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(entry_path)
+            except OSError:
+                continue
+            total_bytes -= size
+            removed += 1
+
+        return removed
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def entry_path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.json')
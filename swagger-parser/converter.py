@@ -1,283 +1,458 @@
 import re
 import json
-
-def assemble_class(swagger_methods, api):
+import functools
+
+# dictionary of name (key) and (type, format) tuple values from the Swagger spec
+DATATYPES = {
+    'integer': ('integer', 'int32'),
+    'long':	('integer', 'int64'),
+    'float':	('number', 'float'),
+    'double':	('number', 'double'),
+    'string':	('string', ''),
+    'byte':	('string', 'byte'),
+    'binary':	('string', 'binary'),
+    'boolean':	('boolean', ''),
+    'date':	('string', 'date'),
+    'datetime':	('string', 'date-time'),
+    'password':	('string', 'password'),
+    'file': ('file', '')
+}
+
+# Java names of the Swagger primitives that do not match them case-insensitively
+JAVA_DATATYPES = {
+    'int': 'integer',
+    'short': 'integer',
+    'char': 'string',
+    'character': 'string'
+}
+
+# generic containers that map onto Swagger arrays (sets also get uniqueItems)
+# and onto objects with additionalProperties
+LIST_TYPES = ['list', 'arraylist', 'linkedlist', 'collection', 'iterable']
+SET_TYPES = ['set', 'hashset', 'linkedhashset', 'treeset', 'sortedset']
+MAP_TYPES = ['map', 'hashmap', 'linkedhashmap', 'treemap', 'sortedmap']
+
+# tokens of a type expression, eg: java.util.Map<String, List<Pet>>[]
+TYPE_TOKEN_REGEX = re.compile(r'\s*([\w$.]+|\[[^\]]*\]|[<>,?])')
+RANGE_REGEX = re.compile(r'range(\[|\()\s*?(\S.*?)\s*?,\s*?(\S.*?)\s*?(\]|\))')
+ENUM_SPLIT_REGEX = re.compile(r'\s?,\s?')
+
+# the types a path, query, header or formData parameter (and the items of an
+# array one) can have, only body parameters take a schema
+PARAMETER_TYPES = ['string', 'number', 'integer', 'boolean', 'array', 'file']
+
+# canonical copy of every schema built during the current build, see
+# intern_schema and reset_caches
+interned_schemas = {}
+
+def assemble_class(operations, resource):
     # the paths object that gets passed around from one assembled
-    # class to another
+    # class to another, built from the ir.Operation records of a class and
+    # its ir.Resource
     paths = {}
 
-    for method in swagger_methods:
+    for operation in operations:
         # go through each method and assemble it
-        method_obj = assemble_method(method['http_method'], method['method_name'],
-            method['api_responses'], method['api_operations'], method['implicit_params'], api)
+        method_obj = assemble_method(operation, resource)
 
-        if 'tags' not in method_obj and 'tags' in api:
+        if 'tags' not in method_obj and resource.tags is not None:
             # if tags obj already exists in the method then it overwrites the
             # class level declaration - so in this case we create a new one
-            method_obj['tags'] = api['tags']
-
+            method_obj['tags'] = resource.tags
 
         # for each method that has been assembled, add it to the paths object
-        if method['path']:
+        if operation.path:
             # if the path var is not None, append it to the class path
-            full_path = method['class_path'] + method['path']
+            full_path = resource.path + operation.path
         else:
             # if the path var is None, use only the class_path
-            full_path = method['class_path']
+            full_path = resource.path
 
         # check if a path matches full_path has already been added
-        if full_path in paths:
-            # append the new HTTP verb to the existing path
-            paths[full_path][method['http_method'].lower().strip('"')] = method_obj
-        else:
+        if full_path not in paths:
             paths[full_path] = {}
-            paths[full_path][method['http_method'].lower().strip('"')] = method_obj
+        paths[full_path][operation.http_method] = method_obj
 
     # debugger(json.dumps(paths, indent=4 * ' '))
     return paths
 
-def assemble_method(http_method, method_name, api_responses, api_operations,
-    implicit_params, api):
+def assemble_method(operation, resource):
     # method level assembly of Swagger objects in eg - "get" : {....}
     method_obj = {}
 
-    method_obj['operationId'] = method_name.strip('"')
-    method_obj['summary'] = api_operations['value'].strip('"')
+    method_obj['operationId'] = operation.operation_id
+    method_obj['summary'] = operation.summary
 
-    if 'notes' in api_operations:
-        # if notes is not None
-        method_obj['description'] = api_operations['notes'].strip('"')
+    if operation.description is not None:
+        method_obj['description'] = operation.description
 
-    if 'produces' in api:
-        produces = [x.strip(' ').strip('"') for x in api['produces'].split(",")]
-        method_obj['produces'] = produces
-        
-    if 'consumes' in api:
-        consumes = [x.strip(' ').strip('"') for x in api['consumes'].split(",")]
-        method_obj['consumes'] = consumes
-        
     # if the @ApiOperation has a produces/consumes attribute, overwrite the resource
-    # level comsumes/produces declaration in @Api (if any)    
-    if 'produces' in api_operations:
-        produces = [x.strip(' ').strip('"') for x in api_operations['produces'].split(",")]
+    # level comsumes/produces declaration in @Api (if any)
+    produces = operation.produces if operation.produces is not None else resource.produces
+    if produces is not None:
         method_obj['produces'] = produces
 
-    if 'consumes' in api_operations:
-        consumes = [x.strip(' ').strip('"') for x in api_operations['consumes'].split(",")]
+    consumes = operation.consumes if operation.consumes is not None else resource.consumes
+    if consumes is not None:
         method_obj['consumes'] = consumes
-        
-    if 'tags' in api_operations:
-        method_obj['tags'] = api_operations['tags']
 
-    if implicit_params:
-        method_obj['parameters'] = convert_parameters(implicit_params)
-    
-    if api_responses:
-        method_obj['responses'] = convert_responses(api_responses, api_operations)
+    if operation.tags is not None:
+        method_obj['tags'] = operation.tags
+
+    if operation.parameters:
+        method_obj['parameters'] = convert_parameters(operation.parameters)
+
+    if operation.responses:
+        method_obj['responses'] = convert_responses(operation.responses, operation)
 
     # print(json.dumps(method_obj, indent=4 * ' '))
     return method_obj
 
 def convert_parameters(params):
-    # converts a list of dictionary of implicit parameters to a parameter object
-    # to be consumed by SwaggerUI
+    # converts a list of ir.Parameter records to a parameter object to be
+    # consumed by SwaggerUI
 
     param_obj = []
     for param in params:
         inner_dict = {}
-        inner_dict['name'] = param['name'].strip('"')
-        inner_dict['in'] = param['paramType'].strip('"')
-
-        data_type_val = param['dataType'].strip('"')
-        datatype_format = get_datatype_format(data_type_val)
-        if not datatype_format:
-            # if we got None then the datatype is not a Swagger primitive
-            # so we need to check if it's a single primitive or a List/Array of
-            # non-primitive types
-
-            non_prim_regex = re.compile('(\w+\[.*?\]|List<\w+>)')
-            matches = non_prim_regex.match(data_type_val)
-            if matches:
-                # we have an array/List of non-primitives to process
-                type_regex = re.compile('(\w+)\[.*?\]|List<(\w+)>')
-
-                if 'List' in data_type_val:
-                    class_type = type_regex.match(data_type_val).group(2)
-                else:
-                    class_type = type_regex.match(data_type_val).group(1)
-
-                inner_dict['schema'] = {}
-                inner_dict['schema']['type'] = "array"
-                inner_dict['schema']['items'] = {"$ref" : "#/definitions/" + class_type.strip('"')}
-
-            else:
-                # create a single element schema since it's a single non-prim
-                inner_dict['schema'] = {"$ref" : "#/definitions/" + data_type_val.strip('"')}
+        inner_dict['name'] = param.name
+        inner_dict['in'] = param.location
 
-        else:
+        datatype_format, schema = resolve_type(param.data_type)
+        if param.location == 'body':
+            # the body is described by a schema, the shared one of the
+            # dataType, be it a model, a List/Array or a primitive
+            inner_dict['schema'] = schema if schema is not None else resolve_schema(param.data_type)
+
+        elif datatype_format:
             # it's a Swagger primitive so handle it normally
             inner_dict['type'] = datatype_format[0]
             if datatype_format[1] != '':
                 inner_dict['format'] = datatype_format[1]
 
-        if 'value' in param:
-            inner_dict['description'] = param['value'].strip('"')
-            
-        if 'defaultValue' in param and 'type' in inner_dict:
-            default_val = param['defaultValue'].strip('"')
-            # check the dataType field (if if exists) to type-cast the defaultValue element
-            if inner_dict['type'] == 'string':
-                inner_dict['default'] = str(default_val)
-            elif inner_dict['type'] == 'integer':
-                inner_dict['default'] = int(default_val)
-            elif inner_dict['type'] == 'number':
-                inner_dict['default'] = float(default_val)
-            elif inner_dict['type'] == 'boolean':
-                if default_val in('true', 'True'):
-                    inner_dict['default'] = True
-                else:
-                    inner_dict['default'] = False
-                    
-        if 'allowableValues' in param:
-            allow_vals = param['allowableValues']
-            # if range, then minimum - maximum
-            if 'range' in allow_vals:
-                range_matches = re.search('range(\[|\()\s*?(\S.*?)\s*?,\s*?(\S.*?)\s*?(\]|\))', allow_vals)
-
-                # range_matches 1: [ or (, 2: start or -infinity, 3: end or infinity, 4: ] or )
-                start_bracket = range_matches.group(1)
-                end_bracket = range_matches.group(4)
-                                
-                if isfloat(range_matches.group(2)):
-                    start_range = float(range_matches.group(2))
-                elif isint(range_matches.group(2)):
-                    start_range = int(range_matches.group(2))
-                else:
-                    start_range = range_matches.group(2)
-                
-                if isfloat(range_matches.group(3)):
-                    end_range = float(range_matches.group(3))
-                elif isint(range_matches.group(3)):
-                    end_range = int(range_matches.group(3))
-                else:
-                    end_range = range_matches.group(3)
-                    
-                if type(start_range) != str:
-                    inner_dict['minimum'] = (start_range if start_bracket == '[' else start_range - 1)
-                
-                if type(end_range) != str:# and 'infinity' in end_range:
-                    inner_dict['maximum'] = (end_range if end_bracket == ']' else end_range - 1)
-            else:
-                # if comma-separated list, then enum
-                enum_matches = [x.strip('"') for x in re.split('\s?,\s?', allow_vals)]
-                inner_dict['enum'] = enum_matches
-            
-
-        if 'required' in param:
-             is_required = param['required']
-             if is_required.lower() == 'true':
-                 inner_dict['required'] = True
-             else:
-                inner_dict['required'] = False
         else:
-            inner_dict['required'] = False
+            # the other parameters can't have a schema, their type, format and
+            # items are written inline (eg: byte[] or List<String>)
+            inline = inline_schema(schema)
+            if inline is None:
+                print('WARNING: ' + param.location + ' parameter ' + param.name + ' can\'t be of type '
+                    + param.data_type + ', only body parameters can take a model or map, using string')
+                inline = {'type': 'string'}
+            inner_dict.update(inline)
+
+        if param.description is not None:
+            inner_dict['description'] = param.description
+
+        if param.default is not None:
+            inner_dict['default'] = param.default
+
+        if param.minimum is not None:
+            inner_dict['minimum'] = param.minimum
+
+        if param.maximum is not None:
+            inner_dict['maximum'] = param.maximum
+
+        if param.enum is not None:
+            inner_dict['enum'] = param.enum
+
+        inner_dict['required'] = param.required
 
         param_obj.append(inner_dict)
 
     # print(json.dumps(param_obj, indent=4 * ' '))
     return param_obj
 
-
-def convert_responses(responses, operations):
-    # converts a dictionary of responses to a response object to be consumed by
-    # SwaggerUI
+def convert_responses(responses, operation):
+    # converts a list of ir.Response records to a response object to be
+    # consumed by SwaggerUI
     res_obj = {}
     for response in responses:
         inner_dict = {}
-        inner_dict['description'] = response['message'].strip('"')
-        
-        if 'response' in response:
-        # check to see if it contains any 'response' or 'responseContainer' keys
-
-            if 'responseContainer' in response:
-                # we have a schema with types and items objects
-                inner_dict['schema'] = {}
-                inner_dict['schema']['type'] = "array"
-                
-                data_type_val = response['response'].strip('"')
-                datatype_format = get_datatype_format(data_type_val)
-                if not datatype_format:
-                    # We got None so the datatype is not a Swagger primitive
-                    inner_dict['schema']['items'] = {"$ref" : "#/definitions/" + data_type_val}
-                else:
-                    inner_dict['schema']['items'] = {"type": datatype_format[0]}
-            else:
-                # we only have a schema with a single $ref obj or primitive
-                data_type_val = response['response'].strip('"')
-                datatype_format = get_datatype_format(data_type_val)
-                if not datatype_format:
-                    # We got None so the datatype is not a Swagger primitive
-                    inner_dict['schema'] = {"$ref" : "#/definitions/" + data_type_val}
-                else:
-                    inner_dict['schema'] = {"type": datatype_format[0]}
-        
-        res_obj[response['code']] = inner_dict
-
-    if 'response' in operations:
-        # check the operations param to see if it contains any 'response' or
+        inner_dict['description'] = response.message
+
+        if response.response is not None:
+            # check to see if it contains any 'response' or 'responseContainer' keys
+            inner_dict['schema'] = resolve_response(response.response, response.container)
+
+        res_obj[response.code] = inner_dict
+
+    if operation.response is not None:
+        # check the operation to see if it contains any 'response' or
         # 'responseContainer' keys for a status 200
         inner_dict = {}
         inner_dict['description'] = "successful operation"
-        if 'responseContainer' in operations:
-            # we have a schema with types and items objects
-            inner_dict['schema'] = {}
-            inner_dict['schema']['type'] = "array"
-            
-            data_type_val = operations['response'].strip('"')
-            datatype_format = get_datatype_format(data_type_val)
-            if not datatype_format:
-                # We got None so the datatype is not a Swagger primitive
-                inner_dict['schema']['items'] = {"$ref" : "#/definitions/" + data_type_val}
-            else:
-                inner_dict['schema']['items'] = {"type": datatype_format[0]}
-        else:
-            # we only have a schema with a single $ref obj or primitive
-            data_type_val = operations['response'].strip('"')
-            datatype_format = get_datatype_format(data_type_val)
-            if not datatype_format:
-                # We got None so the datatype is not a Swagger primitive
-                inner_dict['schema'] = {"$ref" : "#/definitions/" + data_type_val}
-            else:
-                inner_dict['schema'] = {"type": datatype_format[0]}
+        inner_dict['schema'] = resolve_response(operation.response, operation.response_container)
 
         res_obj['200'] = inner_dict
 
     # print(json.dumps(res_obj, indent=4 * ' '))
     return res_obj
 
+def inline_schema(schema):
+    # returns the type, format, items and uniqueItems of a schema as a non-body
+    # parameter declares them, or None for the schemas that have no such form
+    # (models, maps and arrays of them)
+    if schema.get('type') not in PARAMETER_TYPES:
+        return None
+
+    inline = {}
+    for key in ['type', 'format', 'uniqueItems']:
+        if key in schema:
+            inline[key] = schema[key]
+
+    if 'items' in schema:
+        inline['items'] = inline_schema(schema['items'])
+        if inline['items'] is None:
+            return None
+
+    return inline
+
+def default_value(data_type, default_val):
+    # coerces the (unquoted) defaultValue of a parameter to its type, returns
+    # None for types that can't have one (non-primitives and files)
+    datatype_format, _ = resolve_type(data_type)
+    if not datatype_format:
+        return None
+
+    # check the dataType field (if if exists) to type-cast the defaultValue element
+    if datatype_format[0] == 'string':
+        return str(default_val)
+    elif datatype_format[0] == 'integer':
+        return int(default_val)
+    elif datatype_format[0] == 'number':
+        return float(default_val)
+    elif datatype_format[0] == 'boolean':
+        return default_val in ('true', 'True')
+
+    return None
+
+def allowable_values(allow_vals):
+    # parses the raw allowableValues of a parameter into a (minimum, maximum,
+    # enum) tuple where the parts that don't apply are None
+    # if range, then minimum - maximum
+    if 'range' in allow_vals:
+        range_matches = RANGE_REGEX.search(allow_vals)
+
+        # range_matches 1: [ or (, 2: start or -infinity, 3: end or infinity, 4: ] or )
+        start_bracket = range_matches.group(1)
+        end_bracket = range_matches.group(4)
+
+        if isfloat(range_matches.group(2)):
+            start_range = float(range_matches.group(2))
+        elif isint(range_matches.group(2)):
+            start_range = int(range_matches.group(2))
+        else:
+            start_range = range_matches.group(2)
+
+        if isfloat(range_matches.group(3)):
+            end_range = float(range_matches.group(3))
+        elif isint(range_matches.group(3)):
+            end_range = int(range_matches.group(3))
+        else:
+            end_range = range_matches.group(3)
+
+        minimum = None
+        maximum = None
+
+        if type(start_range) != str:
+            minimum = (start_range if start_bracket == '[' else start_range - 1)
+
+        if type(end_range) != str:# and 'infinity' in end_range:
+            maximum = (end_range if end_bracket == ']' else end_range - 1)
+
+        return minimum, maximum, None
+
+    # if comma-separated list, then enum
+    return None, None, [x.strip('"') for x in ENUM_SPLIT_REGEX.split(allow_vals)]
+
+def reset_caches():
+    # forgets the interned schemas and the memoized type resolution, called at
+    # the start of every build so that a long running process (--watch, serve,
+    # generate) only holds on to the types of the current one
+    interned_schemas.clear()
+    resolve_type.cache_clear()
+    resolve_response.cache_clear()
+    resolve_schema.cache_clear()
+    parse_type_expression.cache_clear()
+
+def thaw(obj):
+    # returns a copy of obj with the shared FrozenSchema objects replaced by
+    # plain dicts, for specs handed to callers that may change them
+    if isinstance(obj, dict):
+        return dict((key, thaw(value)) for key, value in obj.items())
+    if isinstance(obj, list):
+        return [thaw(value) for value in obj]
+    return obj
+
 def get_datatype_format(datatype_in):
-    # dictionary of name (key) and (type, format) tuple values from the Swagger spec
-    datatypes = {
-        'integer': ('integer', 'int32'),
-        'long':	('integer', 'int64'),
-        'float':	('number', 'float'),
-        'double':	('number', 'double'),
-        'string':	('string', ''),
-        'byte':	('string', 'byte'),
-        'binary':	('string', 'binary'),
-        'boolean':	('boolean', ''),
-        'date':	('string', 'date'),
-        'datetime':	('string', 'date-time'),
-        'password':	('string', 'password'),
-        'file': ('file', '')
-    }
-
-    datatype = datatype_in.lower()
-    if datatype in datatypes:
-        return datatypes[datatype]
-    else:
+    # returns the (type, format) tuple of a Swagger primitive or None
+    return DATATYPES.get(datatype_in.lower())
+
+@functools.lru_cache(maxsize=None)
+def resolve_type(data_type):
+    # maps the dataType of a parameter to a ((type, format), None) tuple for
+    # Swagger primitives or a (None, schema) tuple for everything else, where
+    # schema is the shared (immutable) schema object of that type
+    datatype_format = get_datatype_format(data_type)
+    if datatype_format:
+        return datatype_format, None
+
+    return None, resolve_schema(data_type)
+
+@functools.lru_cache(maxsize=None)
+def resolve_response(data_type, container):
+    # maps the response type of an @ApiResponse/@ApiOperation to its shared
+    # schema object, an array of that type if there is a responseContainer
+    schema = resolve_schema(data_type)
+
+    if container:
+        schema = intern_schema({'type': 'array', 'items': schema})
+
+    return schema
+
+@functools.lru_cache(maxsize=None)
+def resolve_schema(data_type):
+    # maps a type expression such as Pet, List<Pet>, Map<String, Pet[]> or
+    # com.example.Pet to its shared schema object
+    type_expr = parse_type_expression(data_type)
+    if type_expr is None:
+        # not something we understand, keep it as a reference as it is
+        return intern_schema({'$ref': '#/definitions/' + data_type})
+
+    return intern_schema(type_schema(type_expr))
+
+@functools.lru_cache(maxsize=None)
+def parse_type_expression(data_type):
+    # parses a Java type expression into a (name, args, dimensions) tuple
+    # where args is a tuple of the parsed generic arguments and dimensions is
+    # the number of array brackets, eg:
+    #   Map<String, Pet[]> -> ('Map', (('String', (), 0), ('Pet', (), 1)), 0)
+    # returns None if the expression is malformed
+    tokens = []
+    index = 0
+    data_type = data_type.strip()
+
+    while index < len(data_type):
+        match = TYPE_TOKEN_REGEX.match(data_type, index)
+        if not match:
+            return None
+        tokens.append(match.group(1))
+        index = match.end()
+
+    if not tokens:
+        return None
+
+    try:
+        type_expr, index = parse_type_tokens(tokens, 0)
+    except IndexError:
+        return None
+
+    if type_expr is None or index != len(tokens):
         return None
 
+    return type_expr
+
+def parse_type_tokens(tokens, index):
+    # recursive descent over the tokens of a type expression, returns the
+    # parsed type (or None) and the index of the first token after it
+    name = tokens[index]
+    index += 1
+
+    if name == '?':
+        # wildcards, eg: List<? extends Pet>, are treated as their bound
+        if index < len(tokens) and tokens[index] in ('extends', 'super'):
+            return parse_type_tokens(tokens, index + 1)
+        return ('Object', (), 0), index
+
+    if not (name[0].isalnum() or name[0] in '_$'):
+        return None, index
+
+    args = []
+    if index < len(tokens) and tokens[index] == '<':
+        while True:
+            arg, index = parse_type_tokens(tokens, index + 1)
+            if arg is None:
+                return None, index
+            args.append(arg)
+
+            if tokens[index] == '>':
+                index += 1
+                break
+            if tokens[index] != ',':
+                return None, index
+
+    dimensions = 0
+    while index < len(tokens) and tokens[index].startswith('['):
+        dimensions += 1
+        index += 1
+
+    return (name, tuple(args), dimensions), index
+
+def type_schema(type_expr):
+    # builds the (plain) schema of a parsed type expression
+    name, args, dimensions = type_expr
+    simple_name = name.rsplit('.', 1)[-1]
+    lower_name = simple_name.lower()
+
+    if lower_name == 'byte' and dimensions:
+        # byte[] is how Swagger represents base64 encoded binary data
+        schema = {'type': 'string', 'format': 'byte'}
+        dimensions -= 1
+
+    elif lower_name in LIST_TYPES or lower_name in SET_TYPES:
+        schema = {'type': 'array'}
+        schema['items'] = type_schema(args[0]) if args else {'type': 'object'}
+        if lower_name in SET_TYPES:
+            schema['uniqueItems'] = True
+
+    elif lower_name in MAP_TYPES:
+        # Swagger only has string keys so the key type is not represented
+        schema = {'type': 'object'}
+        schema['additionalProperties'] = type_schema(args[-1]) if args else {'type': 'object'}
+
+    elif lower_name == 'object':
+        schema = {'type': 'object'}
+
+    else:
+        datatype_format = get_datatype_format(JAVA_DATATYPES.get(lower_name, simple_name))
+        if datatype_format:
+            schema = {'type': datatype_format[0]}
+            if datatype_format[1] != '':
+                schema['format'] = datatype_format[1]
+        else:
+            schema = {'$ref': '#/definitions/' + simple_name}
+
+    for _ in range(dimensions):
+        schema = {'type': 'array', 'items': schema}
+
+    return schema
+
+def intern_schema(schema):
+    # returns the canonical FrozenSchema equal to schema so that identical
+    # schemas are only ever built once per run and shared between operations
+    key = json.dumps(schema, sort_keys=True)
+    if key not in interned_schemas:
+        interned_schemas[key] = FrozenSchema((name, intern_schema(value) if isinstance(value, dict) else value)
+            for name, value in schema.items())
+    return interned_schemas[key]
+
+class FrozenSchema(dict):
+    # a dict that refuses to be modified, schemas handed out by intern_schema
+    # are shared by many operations so they have to be copied before changing
+    def immutable(self, *args, **kwargs):
+        raise TypeError('shared schemas are immutable, copy them before making changes')
+
+    __setitem__ = immutable
+    __delitem__ = immutable
+    clear = immutable
+    pop = immutable
+    popitem = immutable
+    setdefault = immutable
+    update = immutable
+
+    def __reduce__(self):
+        return (FrozenSchema, (dict(self),))
+
 def isint(str_in):
     if str_in.isdigit():
         return True
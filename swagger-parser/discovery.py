@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+# a file is a resource when it contains an @Api( declaration, eg:
+# @Api(value = "/pet", description = "Operations about pets")
+RESOURCE_MARKER = b'@Api('
+
+GLOB_TOKEN_REGEX = re.compile(r'\*\*/|\*\*|\*|\?|[^*?]+')
+
+def discover(rules, base_dir, index_file=None):
+    # returns the sorted resource and model files under base_dir that match the
+    # "discover" rules of a project config, eg:
+    #   "discover": {"resources": ["**/*.java"], "models": ["models/**/*.json"],
+    #                "exclude": ["**/test/**"], "production": true}
+    # patterns are relative to base_dir, ** matches any number of directories
+    # and directories starting with a dot are never entered. With index_file
+    # the stat and resource flag of every candidate are kept in that file so
+    # later runs only re-read the files whose size or mtime changed
+    resource_patterns = [glob_regex(pattern) for pattern in rules.get('resources', [])]
+    model_patterns = [glob_regex(pattern) for pattern in rules.get('models', [])]
+    exclude_patterns = [glob_regex(pattern) for pattern in rules.get('exclude', [])]
+
+    index = load_index(index_file) if index_file else {}
+    new_index = {}
+    resource_list = []
+    model_list = []
+
+    for rel_path, entry in walk(base_dir or '.', '', exclude_patterns):
+        if matches(model_patterns, rel_path):
+            model_list.append(os.path.join(base_dir, rel_path))
+
+        if not matches(resource_patterns, rel_path):
+            continue
+
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+
+        cached = index.get(rel_path)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            is_resource = cached[2]
+        else:
+            is_resource = is_annotated(entry.path)
+
+        new_index[rel_path] = [stat.st_mtime_ns, stat.st_size, is_resource]
+        if is_resource:
+            resource_list.append(os.path.join(base_dir, rel_path))
+
+    if index_file and new_index != index:
+        save_index(index_file, new_index)
+
+    return sorted(resource_list), sorted(model_list)
+
+def is_candidate(rules, rel_path):
+    # whether discover would consider the file at rel_path, used to tell a
+    # new resource or model apart from an editor's temporary files
+    if matches([glob_regex(pattern) for pattern in rules.get('exclude', [])], rel_path):
+        return False
+    patterns = rules.get('resources', []) + rules.get('models', [])
+    return matches([glob_regex(pattern) for pattern in patterns], rel_path)
+
+def walk(directory, rel_dir, exclude_patterns):
+    # yields (path relative to the walk root, os.DirEntry) for every file below
+    # directory in sorted order, skipping the excluded and hidden directories.
+    # An unreadable subdirectory is reported and skipped, an unreadable root
+    # raises the OSError since nothing could be discovered
+    try:
+        entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+    except OSError:
+        if not rel_dir:
+            raise
+        print('WARNING: unable to read ' + directory + ', skipping it')
+        return
+
+    for entry in entries:
+        rel_path = rel_dir + entry.name
+        if entry.is_dir():
+            if entry.name.startswith('.') or matches(exclude_patterns, rel_path + '/'):
+                continue
+            yield from walk(entry.path, rel_path + '/', exclude_patterns)
+        elif entry.is_file() and not matches(exclude_patterns, rel_path):
+            yield rel_path, entry
+
+def is_annotated(file_path):
+    # cheap byte scan for the resource marker, nothing is decoded
+    try:
+        with open(file_path, 'rb') as source_file:
+            return source_file.read().find(RESOURCE_MARKER) != -1
+    except OSError:
+        return False
+
+def glob_regex(pattern):
+    # compiles a glob pattern into a regex matching whole relative paths, a
+    # trailing ** also matches the directory itself, eg: **/test/** matches
+    # 'test/' so the walk can skip it
+    parts = []
+    for token in GLOB_TOKEN_REGEX.findall(pattern):
+        if token == '**/':
+            parts.append('(?:.*/)?')
+        elif token == '**':
+            parts.append('.*')
+        elif token == '*':
+            parts.append('[^/]*')
+        elif token == '?':
+            parts.append('[^/]')
+        else:
+            parts.append(re.escape(token))
+    return re.compile(''.join(parts) + r'\Z')
+
+def matches(patterns, rel_path):
+    for pattern in patterns:
+        if pattern.match(rel_path):
+            return True
+    return False
+
+def index_path(cache_dir, base_dir):
+    # every project directory gets its own index file in the cache directory
+    digest = hashlib.sha256(os.path.abspath(base_dir).encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, 'discovery', digest[:16] + '.json')
+
+def load_index(index_file):
+    try:
+        with open(index_file) as infile:
+            return json.load(infile)
+    except (OSError, ValueError):
+        return {}
+
+def save_index(index_file, index):
+    # written to a temporary file first and then moved into place, like the
+    # build cache entries
+    index_dir = os.path.dirname(index_file)
+
+    try:
+        os.makedirs(index_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=index_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as outfile:
+            json.dump(index, outfile)
+        os.replace(tmp_path, index_file)
+    except OSError:
+        print('WARNING: unable to write the discovery index ' + index_file)
@@ -0,0 +1,117 @@
+import assembler
+import hashlib
+import json
+import os
+
+# a sharded build (parser.py --shard i/N) parses every N-th resource and model
+# file of the project, starting at the i-th, and writes what it found to a
+# fragment instead of the spec. parser.py merge combines the N fragments into
+# the spec a single build would have written: every class and model keeps the
+# position of its file in the project, so merging them in that order gives
+# the same "later files win" result as merge_paths does in one run
+#
+# a fragment is a JSON object of:
+#   shard: [i, N]
+#   project: what has to be the same for every shard (parser version, config
+#            digest, -p, number of resource and model files)
+#   metadata, tags: the swagger project info and top-level tags
+#   classes, models: [position, file, paths object or definitions] entries
+
+# bump whenever the layout above changes
+FRAGMENT_VERSION = 1
+
+def shard_slice(items, index, count):
+    # returns the (position, item) pairs of shard index (1 based) out of
+    # count, files are dealt round-robin so that clusters of large files end
+    # up spread over the shards
+    return [(position, item) for position, item in enumerate(items) if position % count == index - 1]
+
+def fragment_path(output_file, index, count):
+    # apis.json -> apis.shard-1-of-4.json
+    stem, extension = os.path.splitext(output_file)
+    return '%s.shard-%d-of-%d%s' % (stem, index, count, extension)
+
+def config_digest(info_obj):
+    text = json.dumps(info_obj, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def build_fragment(index, count, project, metadata, tags, classes, models):
+    fragment = {}
+    fragment['version'] = FRAGMENT_VERSION
+    fragment['shard'] = [index, count]
+    fragment['project'] = project
+    fragment['metadata'] = metadata
+    fragment['tags'] = [list(tag) for tag in tags]
+    fragment['classes'] = classes
+    fragment['models'] = models
+    return fragment
+
+def check_fragments(fragments):
+    # raises a ValueError unless the fragments are the complete set of shards
+    # of one build
+    if not fragments:
+        raise ValueError('no fragments given')
+
+    for fragment in fragments:
+        if fragment.get('version') != FRAGMENT_VERSION:
+            raise ValueError('fragment of shard %s has version %s, expected %d' % (fragment.get('shard'),
+                fragment.get('version'), FRAGMENT_VERSION))
+
+    count = fragments[0]['shard'][1]
+    project = fragments[0]['project']
+
+    for fragment in fragments:
+        if fragment['shard'][1] != count:
+            raise ValueError('fragments of %d and %d shards can\'t be merged' % (count, fragment['shard'][1]))
+        if fragment['project'] != project:
+            differences = sorted(key for key in set(project) | set(fragment['project'])
+                if project.get(key) != fragment['project'].get(key))
+            raise ValueError('shard %d was built from a different project (%s)' % (fragment['shard'][0],
+                ', '.join(differences)))
+
+    shards = sorted(fragment['shard'][0] for fragment in fragments)
+    duplicates = sorted(set(shard for shard in shards if shards.count(shard) > 1))
+    if duplicates:
+        raise ValueError('more than one fragment of shard ' + ', '.join(map(str, duplicates)))
+
+    missing = sorted(set(range(1, count + 1)) - set(shards))
+    if missing:
+        raise ValueError('missing the fragments of shard ' + ', '.join(map(str, missing)))
+
+def merge_fragments(fragments):
+    # returns the spec dict of the complete set of fragments and the list of
+    # collisions, paths or definitions declared by more than one file, each a
+    # dict of kind ('path' or 'definition'), name and files (the last one wins)
+    check_fragments(fragments)
+
+    classes = sorted((entry for fragment in fragments for entry in fragment['classes']), key=lambda entry: entry[0])
+    models = sorted((entry for fragment in fragments for entry in fragment['models']), key=lambda entry: entry[0])
+
+    collisions = []
+    spec = assembler.spec_header(fragments[0]['tags'], fragments[0]['metadata'])
+    spec['paths'] = merge_entries(classes, 'path', collisions)
+    spec['definitions'] = merge_entries(models, 'definition', collisions)
+
+    return spec, collisions
+
+def merge_entries(entries, kind, collisions):
+    # merges the objects of the (position, file, object) entries in order,
+    # later ones win, and appends a collision for every name that more than
+    # one file declares
+    merged = {}
+    owners = {}
+
+    for _, file_name, obj in entries:
+        for name, value in obj.items():
+            owners[name] = [owner for owner in owners.get(name, []) if owner != file_name] + [file_name]
+            merged[name] = value
+
+    for name in sorted(owners):
+        if len(owners[name]) > 1:
+            collisions.append({'kind': kind, 'name': name, 'files': owners[name]})
+
+    return merged
+
+def format_collision(collision):
+    return 'WARNING: %s %s is declared in %s, the one in %s wins' % (collision['kind'], collision['name'],
+        ', '.join(collision['files']), collision['files'][-1])
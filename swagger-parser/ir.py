@@ -0,0 +1,68 @@
+# the intermediate representation handed from the parser to the converter
+#
+# every value is unquoted and coerced once when the /*api blocks are parsed,
+# attributes that were not declared are None (or an empty list) so the
+# converter can tell them apart from empty ones. The records use __slots__ to
+# keep the per-operation footprint small, they carry no per-instance dict
+
+class Resource:
+    # a resource class: its @Path and the @Api attributes its operations
+    # inherit (media types as lists, tags as a list)
+    __slots__ = ('path', 'produces', 'consumes', 'tags')
+
+    def __init__(self, path, produces=None, consumes=None, tags=None):
+        self.path = path
+        self.produces = produces
+        self.consumes = consumes
+        self.tags = tags
+
+class Operation:
+    # a method annotated with @ApiOperation, http_method is lower case and
+    # path is relative to the path of its resource (None for the same path)
+    __slots__ = ('http_method', 'path', 'operation_id', 'summary', 'description', 'produces',
+        'consumes', 'tags', 'response', 'response_container', 'parameters', 'responses', 'internal')
+
+    def __init__(self, http_method, path, operation_id, summary, description=None, produces=None,
+        consumes=None, tags=None, response=None, response_container=False, parameters=None,
+        responses=None, internal=False):
+        self.http_method = http_method
+        self.path = path
+        self.operation_id = operation_id
+        self.summary = summary
+        self.description = description
+        self.produces = produces
+        self.consumes = consumes
+        self.tags = tags
+        self.response = response
+        self.response_container = response_container
+        self.parameters = parameters or []
+        self.responses = responses or []
+        self.internal = internal
+
+class Parameter:
+    # an @ApiImplicitParam, default is already coerced to the type of the
+    # parameter and minimum/maximum or enum come from its allowableValues
+    __slots__ = ('name', 'location', 'data_type', 'description', 'default', 'minimum', 'maximum',
+        'enum', 'required')
+
+    def __init__(self, name, location, data_type, description=None, default=None, minimum=None,
+        maximum=None, enum=None, required=False):
+        self.name = name
+        self.location = location
+        self.data_type = data_type
+        self.description = description
+        self.default = default
+        self.minimum = minimum
+        self.maximum = maximum
+        self.enum = enum
+        self.required = required
+
+class Response:
+    # an @ApiResponse, code is kept as written as it becomes a JSON key
+    __slots__ = ('code', 'message', 'response', 'container')
+
+    def __init__(self, code, message, response=None, container=False):
+        self.code = code
+        self.message = message
+        self.response = response
+        self.container = container
@@ -0,0 +1,72 @@
+import json
+import re
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class JsonBackend:
+    # a JSON implementation used for everything that is decoded (model files,
+    # cache entries) and for the compact encoding of the build cache entries
+    #   - loads takes bytes and returns the decoded object
+    #   - dumps takes an object and returns compact UTF-8 encoded bytes
+    #
+    # the spec itself is always written by the stdlib encoder, none of the
+    # faster libraries can reproduce its sorted, 4 space indented and ASCII
+    # escaped layout, so apis.json stays identical whichever backend is used
+    def __init__(self, name, loads, dumps):
+        self.name = name
+        self.loads = loads
+        self.dumps = dumps
+
+def stdlib_dumps(obj):
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+# orjson is stricter than the stdlib decoder and encoder: it refuses NaN and
+# Infinity, integers beyond 64 bits, non-string keys and text that isn't
+# valid UTF-8, it decodes large integers as floats and encodes NaN as null.
+# Those documents go through the stdlib instead so every backend gives the
+# same results
+
+# integers beyond 64 bits have at least 19 digits, a match inside a string
+# only costs a slower decode
+LONG_NUMBER_REGEX = re.compile(rb'\d{19}')
+
+def orjson_loads(data):
+    if LONG_NUMBER_REGEX.search(data):
+        return json.loads(data)
+
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        return json.loads(data)
+
+def orjson_dumps(obj):
+    try:
+        data = orjson.dumps(obj)
+    except orjson.JSONEncodeError:
+        return stdlib_dumps(obj)
+
+    # a null may be a NaN or an infinity orjson replaced, the rare documents
+    # with a null are encoded by the stdlib to be sure
+    if b'null' in data:
+        return stdlib_dumps(obj)
+    return data
+
+BACKENDS = {
+    'json': JsonBackend('json', json.loads, stdlib_dumps)
+}
+
+if orjson:
+    BACKENDS['orjson'] = JsonBackend('orjson', orjson_loads, orjson_dumps)
+
+def get_backend(name='auto'):
+    # returns the named backend, 'auto' picks the fastest one installed
+    if name == 'auto':
+        return BACKENDS.get('orjson', BACKENDS['json'])
+
+    if name not in BACKENDS:
+        raise ValueError('JSON backend ' + name + ' is not available, choose from: ' + ', '.join(sorted(BACKENDS)))
+
+    return BACKENDS[name]
@@ -0,0 +1,165 @@
+import collections
+import re
+import time
+
+################################################
+# per-file guards, a source file above MAX_SOURCE_BYTES or a scan running
+# longer than SCAN_TIMEOUT seconds is reported instead of stalling the build
+MAX_SOURCE_BYTES = 8 * 1024 * 1024
+SCAN_TIMEOUT = 10.0
+################################################
+
+# everything the lexer has to stop at, the rest of the source is skipped by
+# the regex engine. None of the patterns can backtrack so every search is
+# linear in the distance it covers and the lexer never revisits a position
+TOKEN_REGEX = re.compile(rb'/\*|//|"""|"|\'|[{}();]|(?<![\w.])(?:class|interface)\b')
+STRING_END_REGEX = re.compile(rb'(?:[^"\\\n]|\\.)*"')
+CHAR_END_REGEX = re.compile(rb"(?:[^'\\\n]|\\.)*'")
+
+# a /*api ... */ block and the declaration that follows it
+#   - annotation is everything between /*api and */
+#   - signature is the declaration up to (not including) its body or the
+#     terminating semicolon, along with any other non-API tags such as
+#     @Override or @Deprecated
+#   - offset is the byte offset of /*api in the file and line its line number
+#   - is_class is set when the declaration is the top-level class
+ApiBlock = collections.namedtuple('ApiBlock', ['annotation', 'signature', 'offset', 'line', 'is_class'])
+
+class ScanError(Exception):
+    pass
+
+def scan(source, timeout=SCAN_TIMEOUT, prefilter=False):
+    # single pass over the raw bytes of a Java source file that yields an
+    # ApiBlock for every /*api block in the order they appear. Ordinary
+    # comments, string literals and char literals are skipped over so their
+    # contents are never mistaken for annotations or code, and only the
+    # annotation blocks and signatures are ever decoded
+    #
+    # with prefilter set the lexer jumps straight from one /*api marker to the
+    # next with a plain bytes search and only lexes the blocks and their
+    # signatures, which is much cheaper on large files with few annotations.
+    # Nesting is not tracked in that mode, so every class or interface
+    # declaration is flagged as is_class and the first one is the class header
+    deadline = time.monotonic() + timeout
+    steps = 0
+
+    index = 0
+    line = 1
+    line_index = 0
+    brace_depth = 0
+    paren_depth = 0
+
+    # the block whose signature is being read: (start, end of the comment,
+    # line, brace depth) and whether its declaration is a class
+    pending = None
+    is_class = False
+
+    while True:
+        steps += 1
+        if steps & 1023 == 0 and time.monotonic() > deadline:
+            raise ScanError('scan did not finish within %s seconds (stopped at line %d)'
+                % (timeout, line + count_lines(source, line_index, index)))
+
+        if prefilter and not pending:
+            index = find_marker(source, index)
+            if index == -1:
+                return
+
+        match = TOKEN_REGEX.search(source, index)
+        if not match:
+            if pending:
+                yield make_block(source, pending, len(source), is_class)
+            return
+
+        token = match.group()
+        start = match.start()
+        index = match.end()
+
+        if token == b'/*':
+            end = source.find(b'*/', index)
+            if end == -1:
+                raise ScanError('unterminated comment starting at line %d'
+                    % (line + count_lines(source, line_index, start)))
+
+            if source[start:start + 5] == b'/*api':
+                if pending:
+                    yield make_block(source, pending, start, is_class)
+
+                line += count_lines(source, line_index, start)
+                line_index = start
+                pending = (start, end, line, 0 if prefilter else brace_depth)
+                is_class = False
+                paren_depth = 0
+            index = end + 2
+
+        elif token == b'//':
+            end = source.find(b'\n', index)
+            index = len(source) if end == -1 else end + 1
+
+        elif token == b'"""':
+            end = source.find(b'"""', index)
+            index = len(source) if end == -1 else end + 3
+
+        elif token == b'"' or token == b"'":
+            end_regex = STRING_END_REGEX if token == b'"' else CHAR_END_REGEX
+            end = end_regex.match(source, index)
+            if end:
+                index = end.end()
+
+        elif token == b'(':
+            paren_depth += 1
+
+        elif token == b')':
+            paren_depth -= 1
+
+        elif token == b'{' or token == b';':
+            # the body (or end) of the declaration that follows the pending block
+            if pending and paren_depth == 0:
+                yield make_block(source, pending, start, is_class and token == b'{')
+                pending = None
+
+            if token == b'{':
+                brace_depth += 1
+
+        elif token == b'}':
+            brace_depth -= 1
+
+        elif pending and pending[3] == 0:
+            # class or interface keyword in a top-level declaration
+            is_class = True
+
+def find_marker(source, index):
+    # returns the offset of the next /*api marker from index, skipping the
+    # ones that obviously sit in a line comment or a string literal, or -1
+    while True:
+        index = source.find(b'/*api', index)
+        if index == -1:
+            return -1
+
+        line_start = source.rfind(b'\n', 0, index) + 1
+        prefix = bytes(source[line_start:index])
+        if b'//' not in prefix and prefix.count(b'"') % 2 == 0:
+            return index
+
+        index += 5
+
+def count_lines(source, start, end):
+    # counts the newlines in source[start:end] a chunk at a time, since
+    # memory-mapped files have no count method of their own
+    lines = 0
+    while start < end:
+        chunk_end = min(end, start + 1024 * 1024)
+        lines += bytes(source[start:chunk_end]).count(b'\n')
+        start = chunk_end
+    return lines
+
+def make_block(source, pending, signature_end, is_class):
+    start, end, line, _ = pending
+    annotation = bytes(source[start + 5:end]).decode('utf-8')
+    signature = bytes(source[end + 2:signature_end]).decode('utf-8')
+    return ApiBlock(annotation, signature, start, line, is_class)
+
+def class_header(block):
+    # returns the class declaration of a block in the same shape as it appears
+    # in the source, eg: /*api @Path("/pet") @Api(...) */ public class PetResource {
+    return '/*api' + block.annotation + '*/' + block.signature + '{'
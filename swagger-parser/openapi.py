@@ -0,0 +1,187 @@
+import assembler
+
+# converts the Swagger 2.0 spec this tool writes into an OpenAPI 3.0 one,
+# one path or definition at a time so the conversion can run while the spec
+# is streamed out (see assembler.EMITTERS)
+
+OPENAPI_VERSION = '3.0.3'
+SCHEMAS_PREFIX = '#/components/schemas/'
+
+# what a response or body is sent as when the operation lists no media types
+DEFAULT_MEDIA_TYPES = ['application/json']
+FORM_MEDIA_TYPE = 'application/x-www-form-urlencoded'
+MULTIPART_MEDIA_TYPE = 'multipart/form-data'
+
+# keys of a non-body parameter that move into its schema
+SCHEMA_KEYS = ['type', 'format', 'items', 'uniqueItems', 'default', 'minimum', 'maximum', 'enum']
+
+def convert_spec(final_obj, streamed):
+    # takes the spec header and streamed paths and definitions as written by
+    # assembler.write_spec and returns the same pair for the OpenAPI 3.0 spec,
+    # the entries are converted as they are read
+    header = {}
+    header['openapi'] = OPENAPI_VERSION
+    header['info'] = final_obj['info']
+    header['tags'] = final_obj['tags']
+
+    servers = convert_servers(final_obj)
+    if servers:
+        header['servers'] = servers
+
+    paths = streamed['paths']
+    definitions = streamed['definitions']
+
+    converted = {}
+    converted['paths'] = assembler.StreamedObject(paths.names,
+        lambda path: convert_path_item(paths.get_value(path)))
+    converted['components'] = {
+        'schemas': assembler.StreamedObject(definitions.names,
+            lambda model: convert_schema(definitions.get_value(model)))
+    }
+
+    return header, converted
+
+def convert_document(spec):
+    # in-memory counterpart of convert_spec for a whole spec dict (see
+    # assembler.build_spec)
+    header, converted = convert_spec(*assembler.streamed_spec(spec))
+
+    schemas = converted['components']['schemas']
+    header['paths'] = dict((path, converted['paths'].get_value(path)) for path in converted['paths'].names)
+    header['components'] = {'schemas': dict((model, schemas.get_value(model)) for model in schemas.names)}
+    return header
+
+def convert_servers(final_obj):
+    # host, basePath and schemes become one server url per scheme
+    base_path = final_obj.get('basePath') or ''
+    host = final_obj.get('host')
+    if not host:
+        return [{'url': base_path}] if base_path else []
+
+    schemes = final_obj.get('schemes') or ['https']
+    return [{'url': scheme + '://' + host + base_path} for scheme in schemes]
+
+def convert_path_item(path_item):
+    return dict((method, convert_operation(operation)) for method, operation in path_item.items())
+
+def convert_operation(operation):
+    # produces/consumes turn into the content of the responses and the
+    # request body, body and formData parameters into the request body
+    converted = {}
+    for key, value in operation.items():
+        if key not in ('produces', 'consumes', 'parameters', 'responses'):
+            converted[key] = value
+
+    produces = operation.get('produces') or DEFAULT_MEDIA_TYPES
+    consumes = operation.get('consumes')
+
+    parameters = []
+    body = None
+    form_params = []
+
+    for param in operation.get('parameters', []):
+        if param.get('in') == 'body':
+            body = param
+        elif param.get('in') == 'formData':
+            form_params.append(param)
+        else:
+            parameters.append(convert_parameter(param))
+
+    if parameters:
+        converted['parameters'] = parameters
+
+    if body is not None:
+        converted['requestBody'] = request_body(body.get('schema', {}), consumes or DEFAULT_MEDIA_TYPES,
+            body.get('required', False), body.get('description'))
+    elif form_params:
+        converted['requestBody'] = form_body(form_params, consumes)
+
+    if 'responses' in operation:
+        converted['responses'] = dict((code, convert_response(response, produces))
+            for code, response in operation['responses'].items())
+
+    return converted
+
+def convert_parameter(param):
+    converted = {}
+    schema = dict(param.get('schema', {}))
+
+    for key, value in param.items():
+        if key == 'schema':
+            continue
+        elif key in SCHEMA_KEYS:
+            schema[key] = value
+        else:
+            converted[key] = value
+
+    converted['schema'] = convert_schema(schema)
+    return converted
+
+def request_body(schema, media_types, required, description=None):
+    body = {}
+    body['content'] = dict((media_type, {'schema': convert_schema(schema)}) for media_type in media_types)
+    body['required'] = required
+    if description is not None:
+        body['description'] = description
+    return body
+
+def form_body(form_params, consumes):
+    # the formData parameters become the properties of one object schema,
+    # files need a multipart body
+    schema = {'type': 'object', 'properties': {}}
+    required = []
+
+    for param in form_params:
+        if 'schema' in param:
+            prop = dict(param['schema'])
+        else:
+            prop = dict((key, param[key]) for key in SCHEMA_KEYS if key in param)
+        if param.get('description') is not None:
+            prop['description'] = param['description']
+        schema['properties'][param['name']] = prop
+        if param.get('required'):
+            required.append(param['name'])
+
+    if required:
+        schema['required'] = required
+
+    if not consumes:
+        has_file = any(param.get('type') == 'file' for param in form_params)
+        consumes = [MULTIPART_MEDIA_TYPE if has_file else FORM_MEDIA_TYPE]
+
+    return request_body(schema, consumes, bool(required))
+
+def convert_response(response, produces):
+    converted = {}
+    for key, value in response.items():
+        if key != 'schema':
+            converted[key] = value
+
+    if 'schema' in response:
+        schema = convert_schema(response['schema'])
+        converted['content'] = dict((media_type, {'schema': schema}) for media_type in produces)
+
+    return converted
+
+def convert_schema(schema):
+    # returns a copy of schema with every $ref moved from #/definitions to
+    # #/components/schemas and file types as binary strings, in a single walk
+    if isinstance(schema, list):
+        return [convert_schema(value) for value in schema]
+
+    if not isinstance(schema, dict):
+        return schema
+
+    converted = {}
+    for key, value in schema.items():
+        if key == '$ref' and isinstance(value, str) and value.startswith(assembler.DEFINITIONS_PREFIX):
+            converted[key] = SCHEMAS_PREFIX + value[len(assembler.DEFINITIONS_PREFIX):]
+        elif key == 'type' and value == 'file':
+            converted['type'] = 'string'
+            converted['format'] = 'binary'
+        elif isinstance(value, (dict, list)):
+            converted[key] = convert_schema(value)
+        else:
+            converted[key] = value
+
+    return converted
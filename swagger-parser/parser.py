@@ -1,217 +1,1208 @@
 import re
-from pathlib import Path
 import converter
+import ir
 import assembler
+import artifacts
+import cache
+import discovery
+import fragments
+import watcher
+import server
+import spec_diff
+import validator
+import threading
+import lexer
+import json_backend
+import profiler
 import json
 import argparse
 import os
-import codecs
+import io
+import mmap
+import sys
+import time
+import contextlib
+import traceback
+import concurrent.futures
 
 ################################################
 PROJECT_INFO = '../api/SwaggerConfig.json'
+API_DIR = os.path.dirname(PROJECT_INFO)
 ################################################
 
+# bump whenever the output of parse_class or the model loading changes so that
+# stale entries in the build cache are no longer picked up
+PARSER_VERSION = '1.1.1'
+
+# report written by --profile when no file name is given
+PROFILE_FILE = 'profile.json'
+
+# where parser.py serve listens by default
+SERVE_HOST = '127.0.0.1'
+SERVE_PORT = 8080
+
+# filter profiles of the spec variants built by --variants, a profile says
+# whether the @Internal methods are kept and whether only the production
+# entries of the include list are used. Projects can add their own under
+# "profiles" in the config, eg:
+#   "profiles": {"partner": {"internal": false, "production_only": false}}
+PROFILES = {
+    'full': {'internal': True, 'production_only': False},
+    'production': {'internal': False, 'production_only': True}
+}
+
+# attributes picked up from the @ApiOperation and @ApiImplicitParam tag bodies
+API_OPERATION_ATTRIBUTES = ['value', 'authorizations', 'code',
+    'consumes', 'extensions', 'hidden', 'httpMethod',
+    'nickname', 'notes', 'produces', 'protocols', 'response',
+    'responseContainer', 'responseHeaders', 'responseReference', 'tags']
+
+IMPLICIT_PARAM_ATTRIBUTES = ['access', 'allowableValues', 'allowMultiple',
+    'dataType', 'defaultValue', 'example', 'examples',
+    'name', 'paramType', 'required', 'value']
+
+METHOD_NAME_REGEX = re.compile(r'(?<![@\w.$])([\w$]+)\s*\(')
+
+# escape sequences of a Java string literal: \uXXXX, octal and single characters
+JAVA_ESCAPE_REGEX = re.compile(r'\\(?:u+([0-9a-fA-F]{4})|([0-3][0-7]{2}|[0-7]{1,2})|(.))', re.DOTALL)
+JAVA_ESCAPES = {'b': '\b', 't': '\t', 'n': '\n', 'f': '\f', 'r': '\r', 's': ' '}
+
 def main():
-    arg_parser = argparse.ArgumentParser()
+    # parser.py [options] writes the spec, parser.py <command> [options] runs
+    # one of the COMMANDS instead
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        COMMANDS[sys.argv[1]](sys.argv[2:])
+    else:
+        build_command(sys.argv[1:])
+
+def add_project_arguments(arg_parser):
+    # the options shared by every command that builds the spec
     arg_parser.add_argument("-p", "--production", help="generate a production version of the swagger.json",
                     action="store_true")
-    args = arg_parser.parse_args()
+    arg_parser.add_argument("-c", "--config", help="project config file, the files it includes are relative to it",
+                    default=PROJECT_INFO)
+    arg_parser.add_argument("--no-cache", help="parse every file even if an unchanged copy is in the build cache",
+                    action="store_true")
+    arg_parser.add_argument("--clear-cache", help="empty the build cache before generating",
+                    action="store_true")
+    arg_parser.add_argument("-j", "--jobs", help="number of processes used to parse the resources (0 = one per CPU)",
+                    type=int, default=1)
+    arg_parser.add_argument("--model-workers", help="number of threads loading the model files (default 1 loads them "
+                    "one by one, more only pays off on slow or network storage)",
+                    type=int, default=assembler.MODEL_WORKERS)
+    arg_parser.add_argument("--json-backend", help="JSON library used to read the model files and the build cache",
+                    choices=['auto'] + sorted(json_backend.BACKENDS), default='auto')
+    arg_parser.add_argument("--prune-definitions", help="leave out the models no operation refers to (directly or indirectly)",
+                    action="store_true")
 
+def project_setup(args):
+    # returns the JSON backend and build cache (None with --no-cache) the
+    # project options ask for
+    backend = json_backend.get_backend(args.json_backend)
+    build_cache = cache.BuildCache(PARSER_VERSION, backend=backend)
+    if args.clear_cache:
+        build_cache.clear()
+    if args.no_cache:
+        build_cache = None
+
+    return backend, build_cache
+
+def build_command(argv):
+    arg_parser = argparse.ArgumentParser(epilog="commands: " + ", ".join(sorted(COMMANDS))
+                    + " (see parser.py <command> --help)")
+    add_project_arguments(arg_parser)
+    arg_parser.add_argument("-o", "--output", help="file the spec is written to",
+                    default=assembler.OUTPUT_FILE)
+    arg_parser.add_argument("--artifacts", help="also write a minified spec, its compressed copies and a manifest with their hashes",
+                    action="store_true")
+    arg_parser.add_argument("--tag-shards", help="also write a spec per tag and an index of them for lazy loading",
+                    action="store_true")
+    arg_parser.add_argument("--variants", help="parse once and write a spec per filter profile, eg: full,production "
+                    "(written to the output file name with the profile name added, -p is ignored)")
+    arg_parser.add_argument("--watch", help="keep running and update the spec whenever a resource, model or the config changes",
+                    action="store_true")
+    arg_parser.add_argument("--profile", help="write the time spent per stage and per file, counts and peak memory to a JSON report",
+                    nargs="?", const=PROFILE_FILE, metavar="REPORT")
+    arg_parser.add_argument("--validate", help="check the written spec against Swagger 2.0 and exit with status 1 on errors",
+                    action="store_true")
+    arg_parser.add_argument("--formats", help="also write the spec in these formats next to the output file: "
+                    + ", ".join(sorted(assembler.EMITTERS)) + ", eg: openapi3,yaml", type=format_list, default=[])
+    arg_parser.add_argument("--shard", help="only parse the i-th of N slices of the project and write a fragment "
+                    "(to the output file name with the shard added) for parser.py merge, eg: 2/4",
+                    type=shard_spec, metavar="i/N")
+    args = arg_parser.parse_args(argv)
+
+    if any(assembler.EMITTERS[name].yaml for name in args.formats) and not assembler.yaml:
+        arg_parser.error('the YAML formats need PyYAML (pip install pyyaml)')
+
+    if args.shard:
+        # everything that needs the whole spec happens in parser.py merge,
+        # the rest isn't available for sharded builds at all
+        for option, value in [('--validate', args.validate), ('--formats', args.formats),
+            ('--prune-definitions', args.prune_definitions)]:
+            if value:
+                arg_parser.error('--shard writes a fragment and can\'t be combined with ' + option
+                    + ', pass it to parser.py merge instead')
+        for option, value in [('--variants', args.variants), ('--watch', args.watch),
+            ('--artifacts', args.artifacts), ('--tag-shards', args.tag_shards)]:
+            if value:
+                arg_parser.error(option + ' can\'t be used with a sharded build (--shard)')
+
+    build_profiler = profiler.Profiler() if args.profile else profiler.NULL_PROFILER
+    backend, build_cache = project_setup(args)
 
     # get info file
-    with open(PROJECT_INFO) as info_file:
-        info_obj = json.load(info_file)
+    info_obj = load_config(args.config)
+
+    if args.watch:
+        # an update only rewrites the spec itself (and its --formats)
+        for option, value in [('--variants', args.variants), ('--artifacts', args.artifacts),
+            ('--tag-shards', args.tag_shards), ('--profile', args.profile)]:
+            if value:
+                arg_parser.error('--watch builds a single spec and can\'t be combined with ' + option)
+        watch_project(args, build_cache, backend)
+        return
+
+    if args.variants:
+        try:
+            profiles = load_profiles(info_obj, args.variants.split(','))
+        except ValueError as error:
+            arg_parser.error(str(error))
+        outputs = build_variants(args, info_obj, profiles, build_cache, backend, build_profiler)
+    elif args.shard:
+        outputs = build_shard(args, info_obj, build_cache, backend, build_profiler)
+    else:
+        outputs = build_single(args, info_obj, build_cache, backend, build_profiler)
 
-    # sequentially executes the annotation extraction and processing steps
-    resource_list, model_list = get_resource_model_lists(info_obj['include'], args.production)
-    tag_list = get_top_level_tags(info_obj['include'], args.production)
+    errors = 0
+    if args.validate:
+        with build_profiler.stage('validate'):
+            for output_file in outputs:
+                errors += validate_file(output_file, build_cache, backend)
 
-    swagger_classes = []
+    if build_cache:
+        build_cache.evict()
+
+    if args.profile:
+        build_profiler.write(args.profile)
+
+    if errors:
+        sys.exit(1)
+
+    # logger(json.dumps(complete_paths_obj, indent=4 * ' '))
+
+def build_single(args, info_obj, build_cache, backend, build_profiler):
+    # writes the full or (with -p) production spec, returns the files written
+    try:
+        complete_paths_obj, model_list, tag_list, metadata = parse_project(info_obj,
+            config_dir(args.config), args.production, build_cache, args.jobs, build_profiler)
+    except ParseError as error:
+        print('ERROR: ' + str(error))
+        sys.exit(1)
+
+    assembler.assemble_project(complete_paths_obj, model_list, tag_list, metadata, build_cache,
+        backend, args.model_workers, args.prune_definitions, args.artifacts, args.tag_shards, args.output,
+        build_profiler, args.formats)
+
+    return [args.output]
+
+def build_variants(args, info_obj, profiles, build_cache, backend, build_profiler):
+    # parses every resource once and writes a spec per profile, returns the
+    # files written
+    try:
+        variants, metadata = parse_project_variants(info_obj, config_dir(args.config),
+            profiles, build_cache, args.jobs, build_profiler)
+    except ParseError as error:
+        print('ERROR: ' + str(error))
+        sys.exit(1)
+
+    outputs = []
+    for name, (complete_paths_obj, model_list, tag_list) in variants.items():
+        outputs.append(variant_output(args.output, name, profiles[name]))
+        assembler.assemble_project(complete_paths_obj, model_list, tag_list, metadata, build_cache,
+            backend, args.model_workers, args.prune_definitions, args.artifacts, args.tag_shards,
+            outputs[-1], build_profiler, args.formats)
+
+    return outputs
+
+def build_shard(args, info_obj, build_cache, backend, build_profiler):
+    # parses the resources and loads the models of one shard and writes them
+    # to a fragment, returns the files written
+    index, count = args.shard
+    base_dir = config_dir(args.config)
+
+    try:
+        with build_profiler.stage('discovery'):
+            resource_list, model_list, tag_list = list_project_files(info_obj, args.production, base_dir,
+                build_cache)
+        resources = fragments.shard_slice(resource_list, index, count)
+
+        with build_profiler.stage('parse'):
+            swagger_classes = parse_resources([source_file for _, source_file in resources], args.production,
+                build_cache, args.jobs, build_profiler)
+    except ParseError as error:
+        print('ERROR: ' + str(error))
+        sys.exit(1)
+
+    classes = [[position, os.path.relpath(source_file, base_dir), swagger_class]
+        for (position, source_file), swagger_class in zip(resources, swagger_classes)]
+
+    models = []
+    with build_profiler.stage('models'):
+        for position, model_file in fragments.shard_slice(model_list, index, count):
+            definitions = assembler.load_definitions(model_file, build_cache, backend)
+            if definitions is not None:
+                models.append([position, os.path.relpath(model_file, base_dir), definitions])
+    build_profiler.count('model_files', len(models))
+
+    # the shards have to agree on all of this for their positions to line up
+    project = {
+        'parser': PARSER_VERSION,
+        'config': fragments.config_digest(info_obj),
+        'production': args.production,
+        'resources': len(resource_list),
+        'models': len(model_list)
+    }
+
+    fragment_file = fragments.fragment_path(args.output, index, count)
+    with build_profiler.stage('emit'):
+        with artifacts.OutputFile(fragment_file) as outfile:
+            outfile.write_bytes(backend.dumps(fragments.build_fragment(index, count, project,
+                project_metadata(info_obj), tag_list, classes, models)))
+
+    return [fragment_file]
+
+def validate_file(spec_file, build_cache=None, backend=None):
+    # checks a written spec (see validator.py), prints what is wrong with it
+    # and returns the number of errors
+    try:
+        with open(spec_file, 'rb') as infile:
+            spec = (backend or json_backend.get_backend()).loads(infile.read())
+    except (OSError, ValueError) as error:
+        print('ERROR: unable to read ' + spec_file + ': ' + str(error))
+        return 1
+
+    spec_validator = validator.SpecValidator(build_cache, os.path.abspath(spec_file))
+    return report_issues(spec_file, spec_validator.validate(spec))
+
+def report_issues(spec_name, issues):
+    # prints the issues of a spec, returns the number of errors
+    for found in issues:
+        print(validator.format_issue(found))
+
+    errors = sum(1 for found in issues if found['severity'] == 'error')
+    if issues:
+        print('%s: %d errors, %d warnings' % (spec_name, errors, len(issues) - errors))
+    return errors
+
+def watch_project(args, build_cache, backend):
+    # builds the spec and then rebuilds it incrementally on every change
+    # until interrupted
+    spec_validator = validator.SpecValidator(build_cache, os.path.abspath(args.output)) if args.validate else None
+    build = IncrementalBuild(args.config, args.production, args.output, build_cache, backend,
+        args.prune_definitions, args.jobs, validator=spec_validator, formats=args.formats)
+
+    try:
+        build.load()
+    except ParseError as error:
+        print('ERROR: ' + str(error))
+        sys.exit(1)
+    build.emit()
+
+    file_watcher = watcher.create_watcher(build.watched_files())
+    print('watching ' + str(len(build.watched_files())) + ' files (' + file_watcher.name + '), press Ctrl+C to stop')
+
+    try:
+        watch_changes(build, file_watcher)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        file_watcher.close()
+        if build_cache:
+            build_cache.evict()
+
+def watch_changes(build, file_watcher):
+    # updates the build on every change, forever
+    while True:
+        watched = build.watched_files()
+        build.update(watcher.wait_for_changes(file_watcher))
+        if build.watched_files() != watched:
+            file_watcher.watch(build.watched_files())
+
+def serve_command(argv):
+    # parser.py serve: keeps the spec in memory, serves it over HTTP and
+    # rebuilds it in the background whenever a source changes
+    arg_parser = argparse.ArgumentParser(prog="parser.py serve",
+                    description="serve the spec over HTTP with ETags, 304 responses and gzip")
+    add_project_arguments(arg_parser)
+    arg_parser.add_argument("--host", help="address to listen on", default=SERVE_HOST)
+    arg_parser.add_argument("--port", help="port to listen on", type=int, default=SERVE_PORT)
+    arg_parser.add_argument("--validate", help="check the spec against Swagger 2.0 on every update",
+                    action="store_true")
+    args = arg_parser.parse_args(argv)
+
+    backend, build_cache = project_setup(args)
+    store = server.SpecStore()
+
+    spec_validator = validator.SpecValidator(build_cache, 'serve ' + os.path.abspath(args.config)) if args.validate else None
+    build = IncrementalBuild(args.config, args.production, None, build_cache, backend,
+        args.prune_definitions, args.jobs, store.publish, spec_validator)
+
+    try:
+        build.load()
+    except ParseError as error:
+        print('ERROR: ' + str(error))
+        sys.exit(1)
+    build.emit()
+
+    file_watcher = watcher.create_watcher(build.watched_files())
+    thread = threading.Thread(target=watch_changes, args=(build, file_watcher), daemon=True)
+    thread.start()
+
+    httpd = server.create_server(store, args.host, args.port, ['/', '/' + assembler.OUTPUT_FILE])
+    print('serving the spec on http://%s:%d/ (%s), press Ctrl+C to stop' % (args.host, httpd.server_port,
+        file_watcher.name))
+
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        if build_cache:
+            build_cache.evict()
+
+def diff_command(argv):
+    # parser.py diff: reports the operations and models that changed between
+    # two specs, eg: parser.py diff old/apis.json apis.json
+    arg_parser = argparse.ArgumentParser(prog="parser.py diff",
+                    description="list the added, removed and modified operations and models between two specs")
+    arg_parser.add_argument("old", help="spec before the change")
+    arg_parser.add_argument("new", help="spec after the change")
+    arg_parser.add_argument("--json", help="print the changes as JSON", action="store_true")
+    arg_parser.add_argument("--fail-on-breaking", help="exit with status 2 when a change is breaking",
+                    action="store_true")
+    args = arg_parser.parse_args(argv)
+
+    backend = json_backend.get_backend()
+    specs = []
+    for spec_file in [args.old, args.new]:
+        try:
+            with open(spec_file, 'rb') as infile:
+                specs.append(backend.loads(infile.read()))
+        except (OSError, ValueError) as error:
+            print('ERROR: unable to read ' + spec_file + ': ' + str(error))
+            sys.exit(1)
+
+    changes = spec_diff.diff_specs(specs[0], specs[1])
+
+    if args.json:
+        print(json.dumps(changes, sort_keys=True, indent=4 * ' '))
+    else:
+        print(spec_diff.format_changes(changes))
+
+    if args.fail_on_breaking and any(change['breaking'] for change in changes):
+        sys.exit(2)
+
+def merge_command(argv):
+    # parser.py merge: combines the fragments of a sharded build (--shard) into
+    # the spec, eg: parser.py merge apis.shard-*-of-4.json -o apis.json
+    arg_parser = argparse.ArgumentParser(prog="parser.py merge",
+                    description="merge the fragments written by --shard i/N into the spec")
+    arg_parser.add_argument("fragments", help="the fragment of every shard", nargs="+")
+    arg_parser.add_argument("-o", "--output", help="file the spec is written to",
+                    default=assembler.OUTPUT_FILE)
+    arg_parser.add_argument("--prune-definitions", help="leave out the models no operation refers to (directly or indirectly)",
+                    action="store_true")
+    arg_parser.add_argument("--formats", help="also write the spec in these formats next to the output file: "
+                    + ", ".join(sorted(assembler.EMITTERS)), type=format_list, default=[])
+    arg_parser.add_argument("--validate", help="check the merged spec against Swagger 2.0 and exit with status 1 on errors",
+                    action="store_true")
+    args = arg_parser.parse_args(argv)
+
+    if any(assembler.EMITTERS[name].yaml for name in args.formats) and not assembler.yaml:
+        arg_parser.error('the YAML formats need PyYAML (pip install pyyaml)')
+
+    backend = json_backend.get_backend()
+    shard_fragments = []
+    for fragment_file in args.fragments:
+        try:
+            with open(fragment_file, 'rb') as infile:
+                shard_fragments.append(backend.loads(infile.read()))
+        except (OSError, ValueError) as error:
+            print('ERROR: unable to read ' + fragment_file + ': ' + str(error))
+            sys.exit(1)
+
+    try:
+        spec, collisions = fragments.merge_fragments(shard_fragments)
+    except ValueError as error:
+        print('ERROR: ' + str(error))
+        sys.exit(1)
+
+    for collision in collisions:
+        print(fragments.format_collision(collision))
+
+    if args.prune_definitions:
+        prune_spec(spec)
+
+    errors = 0
+    if args.validate:
+        errors = report_issues(args.output, validator.SpecValidator().validate(spec))
+
+    assembler.write_spec_file(spec, args.output)
+    if args.formats:
+        assembler.emit_formats(args.output, *assembler.streamed_spec(spec), formats=args.formats)
+
+    if errors:
+        sys.exit(1)
+
+def validate_command(argv):
+    # parser.py validate: checks specs against the subset of Swagger 2.0 this
+    # tool writes, eg: parser.py validate apis.json
+    arg_parser = argparse.ArgumentParser(prog="parser.py validate",
+                    description="check specs for Swagger 2.0 errors, dangling $refs and duplicate operationIds")
+    arg_parser.add_argument("specs", help="spec files to check", nargs="+")
+    arg_parser.add_argument("--no-cache", help="check every operation and model even if it was checked before",
+                    action="store_true")
+    args = arg_parser.parse_args(argv)
+
+    backend = json_backend.get_backend()
+    build_cache = None if args.no_cache else cache.BuildCache(PARSER_VERSION, backend=backend)
+
+    errors = 0
+    for spec_file in args.specs:
+        errors += validate_file(spec_file, build_cache, backend)
+
+    if errors:
+        sys.exit(1)
+
+class IncrementalBuild:
+    # keeps the paths object of every class and the definitions of every model
+    # file in memory (--watch), so that a change only re-parses the files that
+    # changed before the spec is merged and written again. A change to the
+    # config, a deleted file or a new file picked up by the discover rules
+    # reloads the whole project
+    #
+    # with publish set the spec dict is handed to it on every update instead
+    # of being written to output_file, with validator (a
+    # validator.SpecValidator) set every update is checked before it is
+    # written and only the operations and models that changed are re-checked.
+    # formats are the assembler.EMITTERS written next to output_file
+    def __init__(self, config_file, production, output_file, build_cache=None, backend=None,
+        prune=False, jobs=1, publish=None, validator=None, formats=()):
+        self.config_file = os.path.abspath(config_file)
+        self.base_dir = config_dir(config_file)
+        self.production = production
+        self.output_file = output_file
+        self.build_cache = build_cache
+        self.backend = backend
+        self.prune = prune
+        self.jobs = jobs
+        self.publish = publish
+        self.formats = formats
+        self.validator = validator
+
+    def load(self):
+        self.info_obj = load_config(self.config_file)
+        self.resource_list, self.model_list, self.tag_list = list_project_files(self.info_obj,
+            self.production, self.base_dir, self.build_cache)
+        self.metadata = project_metadata(self.info_obj)
+
+        self.classes = dict(zip(self.resource_list, parse_resources(self.resource_list,
+            self.production, self.build_cache, self.jobs)))
+        self.models = dict((model_file, self.load_model(model_file)) for model_file in self.model_list)
+
+        self.files = dict((os.path.abspath(file_path), file_path)
+            for file_path in self.resource_list + self.model_list)
+
+    def load_model(self, model_file):
+        return assembler.load_definitions(model_file, self.build_cache, self.backend) or {}
+
+    def watched_files(self):
+        return [self.config_file] + sorted(self.files)
+
+    def update(self, changed):
+        # re-parses the changed files and writes the spec again, a file that
+        # fails to parse keeps its previous paths until it is fixed
+        started = time.perf_counter()
+
+        if self.needs_reload(changed):
+            try:
+                self.load()
+            except (ParseError, OSError, ValueError) as error:
+                print('ERROR: ' + str(error))
+                return
+            updated = ['all files']
+        else:
+            converter.reset_caches()
+            updated = []
+            for path in sorted(changed):
+                file_path = self.files.get(path)
+                if file_path in self.classes:
+                    try:
+                        self.classes[file_path] = parse_class(file_path, self.production, self.build_cache)
+                    except Exception as error:
+                        print('ERROR: ' + file_path + ': ' + format_error(error))
+                        continue
+                    updated.append(file_path)
+                elif file_path in self.models:
+                    self.models[file_path] = self.load_model(file_path)
+                    updated.append(file_path)
+
+            if not updated:
+                return
+
+        changed_output = self.emit()
+        print('%s %s in %.1f ms (%s)' % ('updated' if changed_output else 'unchanged',
+            self.output_file or 'the spec', (time.perf_counter() - started) * 1000, ', '.join(updated)))
+
+    def needs_reload(self, changed):
+        if self.config_file in changed:
+            return True
+
+        rules = self.info_obj.get('discover')
+        for path in changed:
+            if path in self.files:
+                if not os.path.isfile(path):
+                    return True
+            elif rules and discovered_in(self.info_obj, self.production):
+                rel_path = os.path.relpath(path, os.path.abspath(self.base_dir)).replace(os.sep, '/')
+                if not rel_path.startswith('../') and discovery.is_candidate(rules, rel_path):
+                    return True
+
+        return False
+
+    def emit(self):
+        # merges the classes and models in include order and writes (or
+        # publishes) the spec, returns whether it changed
+        spec = assembler.spec_header(self.tag_list, self.metadata)
+        spec['paths'] = merge_paths(self.classes[file_path] for file_path in self.resource_list)
+        spec['definitions'] = merge_paths(self.models[file_path] for file_path in self.model_list)
+
+        if self.prune:
+            prune_spec(spec)
+
+        if self.validator:
+            report_issues(self.output_file or 'spec', self.validator.validate(spec))
+
+        if self.publish:
+            return self.publish(spec)
+
+        changed = assembler.write_spec_file(spec, self.output_file)
+        if self.formats:
+            assembler.emit_formats(self.output_file, *assembler.streamed_spec(spec), formats=self.formats)
+        return changed
+
+def prune_spec(spec):
+    # leaves out the definitions of a spec dict no path can reach
+    ref_index = dict((model, assembler.collect_refs(value)) for model, value in spec['definitions'].items())
+    reachable, _ = assembler.prune_definitions(spec['paths'], ref_index)
+    spec['definitions'] = dict((model, spec['definitions'][model]) for model in reachable)
+
+def generate(config, base_dir, production=False, output=None, build_cache=None, jobs=1,
+    backend=None, prune=False, build_profiler=profiler.NULL_PROFILER, formats=(),
+    model_workers=assembler.MODEL_WORKERS):
+    # library entry point that builds the spec of a project in-process and
+    # returns it as a dict, eg:
+    #   spec = parser.generate(parser.load_config('api/SwaggerConfig.json'), 'api')
+    # config is the parsed project config and the files in its include list
+    # are resolved against base_dir. With output set the spec is also written
+    # to that file (only if it changed) and in the assembler.EMITTERS named
+    # in formats next to it. Pass a profiler.Profiler, with hooks
+    # added to it, to receive the stage and file timings as they happen.
+    # model_workers threads load the model files, the default of
+    # assembler.MODEL_WORKERS (1) loads them one by one.
+    # Raises ParseError on a broken resource
+    complete_paths_obj, model_list, tag_list, metadata = parse_project(config, base_dir,
+        production, build_cache, jobs, build_profiler)
+    # the spec is the caller's to change, it must not share the interned
+    # schemas of the converter
+    complete_paths_obj = converter.thaw(complete_paths_obj)
+
+    spec = assembler.build_spec(complete_paths_obj, model_list, tag_list, metadata, build_cache,
+        backend, model_workers, prune, build_profiler)
+
+    if output:
+        with build_profiler.stage('emit'):
+            assembler.write_spec_file(spec, output)
+        if formats:
+            with build_profiler.stage('formats'):
+                assembler.emit_formats(output, *assembler.streamed_spec(spec), formats=formats)
+
+    return spec
+
+def generate_variants(config, base_dir, names=('full', 'production'), build_cache=None, jobs=1,
+    backend=None, prune=False, build_profiler=profiler.NULL_PROFILER, model_workers=assembler.MODEL_WORKERS):
+    # counterpart of generate for several filter profiles (see PROFILES),
+    # every resource is parsed once and a dict of profile name -> spec is
+    # returned
+    profiles = load_profiles(config, names)
+    variants, metadata = parse_project_variants(config, base_dir, profiles, build_cache, jobs,
+        build_profiler)
+
+    specs = {}
+    for name, (complete_paths_obj, model_list, tag_list) in variants.items():
+        specs[name] = assembler.build_spec(converter.thaw(complete_paths_obj), model_list, tag_list, metadata,
+            build_cache, backend, model_workers, prune, build_profiler)
+
+    return specs
+
+def load_config(config_file):
+    with open(config_file) as info_file:
+        return json.load(info_file)
+
+def config_dir(config_file):
+    # the directory the include list and discover rules of a config are
+    # relative to, '.' for a config in the working directory (os.scandir
+    # can't read '')
+    return os.path.dirname(config_file) or '.'
+
+def load_profiles(info_obj, names):
+    # returns a dict of profile name -> profile for the requested names out of
+    # the built-in PROFILES and the ones in the project config
+    available = dict(PROFILES)
+    available.update(info_obj.get('profiles', {}))
+
+    profiles = {}
+    for name in names:
+        if name not in available:
+            raise ValueError('unknown profile ' + name + ', choose from: ' + ', '.join(sorted(available)))
+        profiles[name] = available[name]
+
+    return profiles
+
+def format_list(value):
+    # argparse type of --formats, eg: 'openapi3,yaml'
+    names = [name for name in value.split(',') if name]
+    for name in names:
+        if name not in assembler.EMITTERS:
+            raise argparse.ArgumentTypeError('unknown format ' + name + ', choose from: '
+                + ', '.join(sorted(assembler.EMITTERS)))
+    return names
+
+def shard_spec(value):
+    # argparse type of --shard, 'i/N' -> (i, N) with 1 <= i <= N
+    try:
+        index, count = [int(part) for part in value.split('/')]
+    except ValueError:
+        raise argparse.ArgumentTypeError('expected i/N, eg: 2/4')
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError('the shard index must be between 1 and ' + str(count))
+    return index, count
+
+def variant_output(output_file, name, profile):
+    # a profile can name its own output file, otherwise the profile name is
+    # added to the output file name, eg: apis.json -> apis.production.json
+    if 'output' in profile:
+        return profile['output']
+
+    stem, extension = os.path.splitext(output_file)
+    return stem + '.' + name + extension
+
+def parse_project(info_obj, base_dir, production, build_cache=None, jobs=1,
+    build_profiler=profiler.NULL_PROFILER):
+    # sequentially executes the annotation extraction and processing steps and
+    # returns the merged paths object, the model files, the top-level tags and
+    # the swagger project info from the config file
+    with build_profiler.stage('discovery'):
+        resource_list, model_list, tag_list = list_project_files(info_obj, production, base_dir, build_cache)
 
     # for each file we parse the classes and, in turn, it's methods
-    for source_file in resource_list:
-        swagger_class = parse_class(source_file, args.production)
-        swagger_classes.append(swagger_class)
+    with build_profiler.stage('parse'):
+        swagger_classes = parse_resources(resource_list, production, build_cache, jobs, build_profiler)
 
     # once we have all the swagger classes we merge their paths objects and
     # construct the swagger project info from the config file
+    complete_paths_obj = merge_paths(swagger_classes)
+    metadata = project_metadata(info_obj)
+
+    return complete_paths_obj, model_list, tag_list, metadata
+
+def list_project_files(info_obj, production, base_dir, build_cache=None):
+    # returns the resource files, model files and top-level tags of the
+    # project from its include list and discover rules
+    resource_list, model_list = get_resource_model_lists(info_obj.get('include', []), production, base_dir)
+    tag_list = get_top_level_tags(info_obj.get('include', []), production)
+
+    if discovered_in(info_obj, production):
+        add_discovered(resource_list, model_list, *discover_files(info_obj, base_dir, build_cache),
+            included=included_files(info_obj.get('include', []), base_dir))
+
+    return resource_list, model_list, tag_list
+
+def parse_project_variants(info_obj, base_dir, profiles, build_cache=None, jobs=1,
+    build_profiler=profiler.NULL_PROFILER):
+    # parses every resource of the project once, keeping apart the methods
+    # marked @Internal, and returns a dict of profile name -> (paths object,
+    # model files, top-level tags) along with the swagger project info
+    include_list = info_obj.get('include', [])
+
+    with build_profiler.stage('discovery'):
+        resource_list, model_list = get_resource_model_lists(include_list, False, base_dir)
+        discovered_resources, discovered_models = add_discovered(resource_list, model_list,
+            *discover_files(info_obj, base_dir, build_cache))
+
+    with build_profiler.stage('parse'):
+        parsed = dict(zip(resource_list, parse_resources(resource_list, None, build_cache, jobs, build_profiler)))
+
+    # every variant is assembled from the parse results of the files its
+    # include entries select, the missing files were already reported above
+    existing_models = set(model_list)
+    variants = {}
+
+    for name, profile in profiles.items():
+        production = profile.get('production_only', False)
+        internal = profile.get('internal', True)
+
+        selected = [file_obj for file_obj in include_list if file_obj['production'] or not production]
+
+        swagger_classes = []
+        for file_obj in selected:
+            file_path = os.path.join(base_dir, file_obj['resource']) if file_obj['resource'] else None
+            if file_path in parsed:
+                swagger_classes.append(variant_class(parsed[file_path], internal))
+
+        variant_models = [os.path.join(base_dir, file_obj['model']) for file_obj in selected
+            if file_obj['model'] and os.path.join(base_dir, file_obj['model']) in existing_models]
+
+        if discovered_in(info_obj, production):
+            swagger_classes.extend(variant_class(parsed[file_path], internal) for file_path in discovered_resources)
+            variant_models.extend(discovered_models)
+
+        variants[name] = (merge_paths(swagger_classes), variant_models,
+            get_top_level_tags(include_list, production))
+
+    return variants, project_metadata(info_obj)
+
+def variant_class(swagger_class, internal):
+    # picks the paths object of a class parsed for every variant
+    if internal or swagger_class['public'] is None:
+        return swagger_class['all']
+    return swagger_class['public']
+
+def merge_paths(swagger_classes):
+    # merges the paths objects of the classes (or the definitions of the model
+    # files), later ones win
     complete_paths_obj = {}
     for paths_obj in swagger_classes:
         for key, value in paths_obj.items():
             complete_paths_obj[key] = value
+    return complete_paths_obj
 
+def project_metadata(info_obj):
+    # the swagger project info from the config file
     metadata = {}
     metadata['swagger'] = info_obj['swagger']
     metadata['info'] = info_obj['info']
     metadata['host'] = info_obj['host']
     metadata['basePath'] = info_obj['basePath']
     metadata['schemes'] = info_obj['schemes']
-    assembler.assemble_project(complete_paths_obj, model_list, tag_list, metadata)
 
-    # logger(json.dumps(complete_paths_obj, indent=4 * ' '))
+    return metadata
+
+class ParseError(Exception):
+    # raised when a resource file cannot be parsed (or the project directory
+    # can't be searched), the offending file is kept on the exception along
+    # with the traceback of the original error
+    def __init__(self, source_file, message, details=None):
+        Exception.__init__(self, source_file + ': ' + message)
+        self.source_file = source_file
+        self.details = details
+
+def parse_resources(resource_list, production, build_cache=None, jobs=1,
+    build_profiler=profiler.NULL_PROFILER):
+    # parses every resource file and returns their paths objects in the same
+    # order as resource_list, spreading the files over a pool of processes when
+    # jobs > 1 (jobs = 0 uses one process per CPU)
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+
+    converter.reset_caches()
+
+    # the per-file stats are only gathered when someone is listening
+    profile = build_profiler.enabled
+    tasks = [(source_file, production, build_cache, profile) for source_file in resource_list]
+
+    if jobs > 1 and len(tasks) > 1:
+        # workers capture their own output so the warnings still come back in
+        # include order and attached to the file that raised them
+        chunksize = max(1, len(tasks) // (jobs * 4))
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = executor.map(parse_class_worker, tasks, chunksize=chunksize)
+
+            swagger_classes = []
+            for source_file, swagger_class, output, error, stats in results:
+                if output:
+                    sys.stdout.write(output)
+                if error:
+                    # the files queued behind the broken one would only be
+                    # parsed for leaving the with block to wait on them
+                    executor.shutdown(wait=True, cancel_futures=True)
+                    raise ParseError(source_file, error[0], error[1])
+                if stats:
+                    build_profiler.add_file(source_file, stats)
+                swagger_classes.append(swagger_class)
+
+        return swagger_classes
+
+    swagger_classes = []
+    for source_file, production, build_cache, profile in tasks:
+        try:
+            swagger_class, stats = profile_class(source_file, production, build_cache, profile)
+        except Exception as error:
+            raise ParseError(source_file, format_error(error), traceback.format_exc())
+        if stats:
+            build_profiler.add_file(source_file, stats)
+        swagger_classes.append(swagger_class)
 
-def parse_class(source_file, production):
-    # logic to extract the class data and associated annotations
+    return swagger_classes
+
+def parse_class_worker(task):
+    # runs parse_class in a pool process and returns its result together with
+    # everything it printed and the error (if any) instead of raising it
+    source_file, production, build_cache, profile = task
+    output = io.StringIO()
+    swagger_class = None
+    error = None
+    stats = None
+
+    with contextlib.redirect_stdout(output):
+        try:
+            swagger_class, stats = profile_class(source_file, production, build_cache, profile)
+        except Exception as exc:
+            error = (format_error(exc), traceback.format_exc())
+
+    return source_file, swagger_class, output.getvalue(), error, stats
+
+def profile_class(source_file, production, build_cache=None, profile=False):
+    # runs parse_class and, with profile set, returns the wall and CPU time it
+    # took along with the counts gathered by parse_class, or None otherwise.
+    # Timed here so the numbers of pool processes come back with the result
+    if not profile:
+        return parse_class(source_file, production, build_cache), None
+
+    stats = {}
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    swagger_class = parse_class(source_file, production, build_cache, stats)
+    stats['wall'] = time.perf_counter() - wall
+    stats['cpu'] = time.process_time() - cpu
+
+    return swagger_class, stats
+
+def format_error(error):
+    return ''.join(traceback.format_exception_only(type(error), error)).strip()
+
+def parse_class(source_file, production, build_cache=None, stats=None):
+    # logic to extract the class data and associated annotations, stats (if
+    # given) is filled with the counts and timings of the file
+    with open(source_file, 'rb') as curr_file:
+        size = os.fstat(curr_file.fileno()).st_size
+        if size > lexer.MAX_SOURCE_BYTES:
+            raise lexer.ScanError('file is %d bytes, larger than the %d byte limit for a source file'
+                % (size, lexer.MAX_SOURCE_BYTES))
+
+        # the file is memory-mapped rather than read and decoded as a whole,
+        # the lexer only ever decodes the /*api blocks and their signatures
+        source = mmap.mmap(curr_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+    if stats is not None:
+        stats['bytes'] = size
+
+    try:
+        return parse_source(source, source_file, production, build_cache, stats)
+    finally:
+        if size:
+            source.close()
+
+def parse_source(source, source_file, production, build_cache=None, stats=None):
+    # parses the raw bytes (or memory-mapped contents) of a resource file,
+    # production None parses for every variant and returns a dict with the
+    # paths object of all the methods under 'all' and the one without the
+    # @Internal methods under 'public' (None when there are none of those)
+    if source.find(b'/*api') == -1:
+        print('WARNING: ' + source_file + ' contains no /*api blocks')
+        return {} if production is not None else {'all': {}, 'public': None}
+
+    # unchanged files are served straight from the build cache
+    if build_cache:
+        cache_key = build_cache.key('resource', source, production)
+        swagger_class = build_cache.get(cache_key)
+        if swagger_class is not None:
+            if stats is not None:
+                stats['cached'] = 1
+                count_operations(swagger_class if production is not None else swagger_class['all'], stats)
+            return swagger_class
+
+    if stats is not None:
+        started = time.perf_counter()
+
+    # a single pass of the lexer yields every /*api block in the file
+    api_blocks = list(lexer.scan(source, prefilter=True))
 
     # find api declaration associated to the class
-    curr_file = codecs.open(source_file, "r", "utf-8")
-    code = curr_file.read()
-    curr_file.close()
-    matches = re.search('(/\*api(.*?)(public|private|protected|)(.*?)class(.*?){)', code, re.DOTALL)
+    class_block = next((block for block in api_blocks if block.is_class), None)
+    if class_block is None:
+        raise lexer.ScanError('no /*api block is attached to a class declaration')
 
-    class_annotations = matches.group(0)
-    path = parse_path(class_annotations)
-    api = parse_api(class_annotations)
+    resource = parse_resource(lexer.class_header(class_block))
+    swagger_methods = parse_methods(api_blocks, production)
 
-    swagger_methods = parse_methods(code, path, production)
-    swagger_class = converter.assemble_class(swagger_methods, api)
+    if stats is not None:
+        converted = time.perf_counter()
+        stats['parse_wall'] = converted - started
+
+    if production is not None:
+        swagger_class = converter.assemble_class(swagger_methods, resource)
+        operations = swagger_class
+    else:
+        public_methods = [method for method in swagger_methods if not method.internal]
+        swagger_class = {}
+        swagger_class['all'] = converter.assemble_class(swagger_methods, resource)
+        swagger_class['public'] = None
+        if len(public_methods) < len(swagger_methods):
+            swagger_class['public'] = converter.assemble_class(public_methods, resource)
+        operations = swagger_class['all']
+
+    if stats is not None:
+        stats['convert_wall'] = time.perf_counter() - converted
+        stats['cached'] = 0
+        count_operations(operations, stats)
+
+    if build_cache:
+        build_cache.put(cache_key, swagger_class)
 
     return swagger_class
 
-def parse_methods(code, class_path, production):
-    # takes in a source file and extracts all the method annotations
+def count_operations(swagger_class, stats):
+    # counts the operations of a paths object and their parameters and
+    # responses into stats
+    stats['methods'] = 0
+    stats['params'] = 0
+    stats['responses'] = 0
+
+    for path_obj in swagger_class.values():
+        for operation in path_obj.values():
+            stats['methods'] += 1
+            stats['params'] += len(operation.get('parameters') or [])
+            stats['responses'] += len(operation.get('responses') or {})
+
+def parse_methods(api_blocks, production):
+    # takes in the /*api blocks of a source file and returns the ir.Operation
+    # of every method
     swagger_methods = []
-    # regex for matching all /*api ... */ INCLUDING the method signature
-    pattern = re.compile('/\*api(.*?)\*/(.*?){', re.DOTALL)
-    # matches is a list containing 2-tuple
-    #   - first is everything between /*api ... */
-    #   - seconds is the method signature and potentially any other non-API
-    #     tags such as @Override or @Deprecated
-    annotation_matches = pattern.findall(code)
-
-    for annotation in annotation_matches:
+
+    for block in api_blocks:
         # make sure we only parse methods and not classes by detecting the
         # @ApiOperation tag in the annotation
-        if '@ApiOperation' in annotation[0]:
-            method_name, method_return = method_sig_analyzer(annotation[1])
-            path = parse_path(annotation[0])
-            api_operations = parse_api_operation(annotation[0])
-            api_responses = parse_api_responses(annotation[0])
-            implicit_params = parse_implicit_params(annotation[0])
-
-            method = {}
-            method['http_method'] = api_operations['httpMethod']
-            method['method_name'] = api_operations['nickname'] if 'nickname' in api_operations else method_name
-            method['path'] = path
-            method['class_path'] = class_path
-            method['api_responses'] = api_responses
-            method['api_operations'] = api_operations
-            method['implicit_params'] = implicit_params
-
-            if '@Internal' in annotation[0] and production:
-                continue
-            else:
-                swagger_methods.append(method)
+        if '@ApiOperation' not in block.annotation:
+            continue
 
-    return swagger_methods
+        internal = '@Internal' in block.annotation
+        if internal and production:
+            continue
 
-def method_sig_analyzer(signature_param):
-    # this method analyzes a method signature and returns its constituents
+        try:
+            method = parse_method(block)
+        except Exception as error:
+            raise lexer.ScanError('unable to parse the /*api block at line %d: %s'
+                % (block.line, format_error(error)))
 
-    # selection of the approprite regex is based on whether a static modifier
-    # exists in the method signature or not
-    method_sig_regex = re.compile('(public|private|protected)\s([^\s]+)\s(\w+)', re.DOTALL)
+        method.internal = internal
+        swagger_methods.append(method)
 
-    if 'static' in signature_param:
-        signature = signature_param.replace(' static', '')
-    else:
-        signature = signature_param
+    return swagger_methods
+
+def parse_method(block):
+    # builds the ir.Operation of a single /*api block, the raw attribute
+    # values are unquoted and coerced here once
+    method_name, method_return = method_sig_analyzer(block.signature)
+    api_operations = parse_api_operation(block.annotation)
+    api_responses = parse_api_responses(block.annotation)
+    implicit_params = parse_implicit_params(block.annotation)
+
+    return ir.Operation(
+        http_method=unquote(api_operations['httpMethod']).lower(),
+        path=parse_path(block.annotation),
+        operation_id=unquote(api_operations['nickname']) if 'nickname' in api_operations else method_name,
+        summary=unquote(api_operations['value']),
+        description=unquote(api_operations['notes']) if 'notes' in api_operations else None,
+        produces=split_media_types(api_operations.get('produces')),
+        consumes=split_media_types(api_operations.get('consumes')),
+        tags=api_operations.get('tags'),
+        response=unquote(api_operations['response']) if 'response' in api_operations else None,
+        response_container='responseContainer' in api_operations,
+        parameters=[parse_parameter(param) for param in implicit_params or []],
+        responses=[parse_response(response) for response in api_responses or []])
+
+def parse_parameter(param):
+    # builds the ir.Parameter of the attributes of an @ApiImplicitParam
+    data_type = unquote(param['dataType'])
+
+    default = None
+    if 'defaultValue' in param:
+        default = converter.default_value(data_type, unquote(param['defaultValue']))
+
+    minimum = maximum = enum = None
+    if 'allowableValues' in param:
+        minimum, maximum, enum = converter.allowable_values(unquote(param['allowableValues']))
+
+    return ir.Parameter(
+        name=unquote(param['name']),
+        location=unquote(param['paramType']),
+        data_type=data_type,
+        description=unquote(param['value']) if 'value' in param else None,
+        default=default,
+        minimum=minimum,
+        maximum=maximum,
+        enum=enum,
+        required='required' in param and param['required'].lower() == 'true')
+
+def parse_response(response):
+    # builds the ir.Response of the attributes of an @ApiResponse
+    return ir.Response(
+        code=response['code'],
+        message=unquote(response['message']),
+        response=unquote(response['response']) if 'response' in response else None,
+        container='responseContainer' in response)
+
+def parse_resource(class_annotations):
+    # builds the ir.Resource of the annotations of a class
+    api = parse_api(class_annotations)
+
+    return ir.Resource(
+        path=parse_path(class_annotations),
+        produces=split_media_types(api.get('produces')),
+        consumes=split_media_types(api.get('consumes')),
+        tags=api.get('tags'))
 
-    method_sig_raw = signature.replace('\n', ' ')
-    method_sig_matches = method_sig_regex.search(method_sig_raw)
+def split_media_types(raw):
+    # eg: "application/json, application/xml" -> ['application/json', 'application/xml']
+    # or {"application/json", "application/xml"}
+    if raw is None:
+        return None
+    if raw.startswith('{'):
+        return [unquote(x).strip(' ') for x in split_array(raw)]
+    return [x.strip(' ') for x in unquote(raw).split(",")]
+
+def unquote(raw):
+    # turns the raw value of an attribute as tokenize_attributes returns it
+    # into the string it stands for: the quotation marks of a literal are
+    # removed, its escape sequences resolved and literals joined with + are
+    # concatenated, eg: "Say \"hi\" " + "twice" -> Say "hi" twice
+    # values that are not made of literals only (numbers, booleans,
+    # constants) can't be resolved here and are kept as written
+    parts = []
+    index = 0
+    length = len(raw)
+
+    while True:
+        index = skip_filler(raw, index)
+        if index >= length or raw[index] not in '"\'':
+            break
+
+        end = scan_string(raw, index)
+        closed = end - 1 > index and raw[end - 1] == raw[index]
+        parts.append(JAVA_ESCAPE_REGEX.sub(unescape, raw[index + 1:end - 1 if closed else end]))
+
+        index = skip_filler(raw, end)
+        if index >= length:
+            return ''.join(parts)
+        if raw[index] != '+':
+            break
+        index += 1
+
+    return raw.strip()
+
+def unescape(match):
+    # replacement of a JAVA_ESCAPE_REGEX match
+    if match.group(1):
+        return chr(int(match.group(1), 16))
+    if match.group(2):
+        return chr(int(match.group(2), 8))
+    return JAVA_ESCAPES.get(match.group(3), match.group(3))
+
+def method_sig_analyzer(signature):
+    # this method analyzes a method signature and returns its constituents
 
-    method_name = method_sig_matches.group(3)
-    method_return = method_sig_matches.group(2)
+    # the method name is the first identifier followed by an opening
+    # parenthesis that is not an annotation such as @Path("/{id}")
+    method_sig_matches = METHOD_NAME_REGEX.search(signature)
+    if not method_sig_matches:
+        raise ValueError('no method declaration found in ' + repr(signature.strip()))
+
+    method_name = method_sig_matches.group(1)
+
+    # the return type is the last type before the name, generic arguments
+    # such as Map<String, Pet> included
+    index = method_sig_matches.start()
+    while index > 0 and signature[index - 1].isspace():
+        index -= 1
+    return_end = index
+    angle_depth = 0
+    while index > 0:
+        char = signature[index - 1]
+        if char == '>':
+            angle_depth += 1
+        elif char == '<':
+            angle_depth -= 1
+        elif angle_depth == 0 and (char.isspace() or char == ')'):
+            break
+        index -= 1
+    method_return = signature[index:return_end]
 
     return method_name, method_return
 
 def parse_api_operation(annotations):
     # takes a set of annotations and returns a dict of attributes contained
     # in @ApiOperation tag body
-    greedy_key_val_rgx = re.compile('(\w+)\s*?=\s*?(".*"|true|false|\{".*"\})', re.DOTALL)
-    parts = re.split('\*\s*?@', annotations)
-
-    key_val_list = []
-
-    for item in parts:
-        if 'ApiOperation' in item:
-            api_op_regex = re.compile('ApiOperation\((.*)\)', re.DOTALL)
-            matches = api_op_regex.search(item)
-            key_val_annotations = matches.group(1)
-
-            attrb_list = ['value', 'authorizations', 'code',
-                'consumes', 'extensions', 'hidden', 'httpMethod',
-                'nickname', 'notes', 'produces', 'protocols', 'response',
-                'responseContainer', 'responseHeaders', 'responseReference', 'tags']
-
-            for attrb in attrb_list:
-                attrb_regex = re.compile(attrb + '\s*?=\s*?', re.DOTALL)
-                attrb_match = attrb_regex.search(key_val_annotations)
+    api_operation = {}
 
-                curr_attrb_index = attrb_list.index(attrb)
+    start = annotations.find('@ApiOperation(')
+    if start == -1:
+        return api_operation
 
-                if attrb_match:
-                    index = attrb_match.start()
+    key_val_list, _ = tokenize_attributes(annotations, start + len('@ApiOperation('))
 
-                    # get the index of the adjacent attribute
-                    next_attrb_list = [
-                            re.search(i + '\s*?=\s*?', key_val_annotations, re.DOTALL).start()
-                            # all the attributes except the current one being analyzed
-                            for i in attrb_list[:curr_attrb_index] + attrb_list[(curr_attrb_index + 1):]
+    for attrb_key, attrb_val in key_val_list:
+        if attrb_key == 'tags':
+            api_operation['tags'] = parse_tags(attrb_val)
+        elif attrb_key in API_OPERATION_ATTRIBUTES:
+            api_operation[attrb_key] = attrb_val
 
-                            if  re.search(i + '\s*?=\s*?', key_val_annotations, re.DOTALL) and
-                                re.search(i + '\s*?=\s*?', key_val_annotations, re.DOTALL).start() > index
-                    ]
-
-                    next_attrb_index = min(next_attrb_list) if next_attrb_list else len(key_val_annotations)
-
-                    raw_attrb = key_val_annotations[index:next_attrb_index]
-                    key_val = greedy_key_val_rgx.search(raw_attrb)
-
-                    attrb_key = key_val.group(1)
-                    attrb_val = key_val.group(2)
-                    key_val_list.append((attrb_key, attrb_val))
-
-            key_val_list.extend(parse_tags(key_val_annotations))
-
-    return dict(key_val_list)
+    return api_operation
 
 def parse_tags(tags_annotation):
-    # takes a tag annotation and returns a list containing a single tuple
-    # as the key-value pair: ('tags', ["pet", "animal"])
-
-    tags_regex = re.compile('(tags)\s*?=\s*?\{(.*?)\}', re.DOTALL)
-    tags_list = tags_regex.findall(tags_annotation)
-
-    if tags_list:
-        tags_obj = [x.strip('"') for x in re.split('\s?,\s?', tags_list[0][1])]
-        return [('tags', tags_obj)]
-    else:
-        return []
+    # takes the raw value of a tags attribute and returns it as a list
+    # eg: {"pet", "animal"} -> ["pet", "animal"]
+    return [unquote(x) for x in split_array(tags_annotation)]
 
 def parse_api_responses(annotations):
     # takes a set of annotations and returns a dict of attributes contained
     # in @ApiResponses tag body
     api_responses = []
 
-    key_val_regex = re.compile('(\w+)\s*?=\s*?(".*?"|[0-9]{3})', re.DOTALL)
-    inner_tag_regex = re.compile('@ApiResponses\((.*?}).*?\)', re.DOTALL)
+    start = annotations.find('@ApiResponses(')
+    if start == -1:
+        return None
 
-    inner_tag = inner_tag_regex.search(annotations)
+    key_val_list, _ = tokenize_attributes(annotations, start + len('@ApiResponses('))
 
-    if inner_tag:
-        response_annotations = inner_tag.group(1)
+    for key, value in key_val_list:
+        if key != 'value':
+            continue
 
-        single_response_regex = re.compile('ApiResponse\((.*?)\)', re.DOTALL)
-        response_list = single_response_regex.findall(response_annotations)
+        for response in split_array(value):
+            if not response.startswith('@ApiResponse('):
+                continue
 
-        for response in response_list:
-            key_val_list = key_val_regex.findall(response)
-            api_responses.append(dict(key_val_list))
-        return api_responses
+            response_attrbs, _ = tokenize_attributes(response, len('@ApiResponse('))
+            # only quoted strings and status codes are meaningful to the converter
+            api_responses.append(dict(
+                (attrb_key, attrb_val) for attrb_key, attrb_val in response_attrbs
+                if attrb_val.startswith('"') or attrb_val.isdigit()))
 
-    else:
-        return None
+    return api_responses
 
 def parse_implicit_params(annotations):
     # takes a set of annotations and returns a dict of attributes contained
@@ -219,57 +1210,153 @@ def parse_implicit_params(annotations):
 
     implicit_params = []
 
-    greedy_key_val_rgx = re.compile('(\w+)\s*?=\s*?(".*"|true|false)', re.DOTALL)
-    inner_tag_regex = re.compile('@ApiImplicitParams\((.*?}).*?\)', re.DOTALL)
-
-    inner_tag = inner_tag_regex.search(annotations)
-
-    if inner_tag:
-        implicit_param_annotations = inner_tag.group(1)
-
-        param_list = implicit_param_annotations.split('@ApiImplicitParam(')
-
-        for param in param_list[1:]:
-            key_val_list = []
-
-            attrb_list = ['access', 'allowableValues', 'allowMultiple',
-                'dataType', 'defaultValue', 'example', 'examples',
-                'name', 'paramType', 'required', 'value']
-
-            for attrb in attrb_list:
-                attrb_regex = re.compile(attrb + '\s*?=\s*?', re.DOTALL)
-                attrb_match = attrb_regex.search(param)
-
-                curr_attrb_index = attrb_list.index(attrb)
-
-                if attrb_match:
-                    index = attrb_match.start()
-
-                    # get the index of the adjacent attribute
-                    next_attrb_list = [
-                            re.search(i + '\s*?=\s*?', param, re.DOTALL).start()
-                            # all the attributes except the current one being analyzed
-                            for i in attrb_list[:curr_attrb_index] + attrb_list[(curr_attrb_index + 1):]
-
-                            if  re.search(i + '\s*?=\s*?', param, re.DOTALL) and
-                                re.search(i + '\s*?=\s*?', param, re.DOTALL).start() > index
-                    ]
-
-                    next_attrb_index = min(next_attrb_list) if next_attrb_list else len(param)
-
-                    raw_attrb = param[index:next_attrb_index]
-                    key_val = greedy_key_val_rgx.search(raw_attrb)
+    start = annotations.find('@ApiImplicitParams(')
+    if start == -1:
+        return None
 
-                    attrb_key = key_val.group(1)
-                    attrb_val = key_val.group(2)
-                    key_val_list.append((attrb_key, attrb_val))
+    key_val_list, _ = tokenize_attributes(annotations, start + len('@ApiImplicitParams('))
 
-            implicit_params.append(dict(key_val_list))
+    for key, value in key_val_list:
+        if key != 'value':
+            continue
 
-        return implicit_params
+        for param in split_array(value):
+            if not param.startswith('@ApiImplicitParam('):
+                continue
 
-    else:
-        return None
+            param_attrbs, _ = tokenize_attributes(param, len('@ApiImplicitParam('))
+            implicit_params.append(dict(
+                (attrb_key, attrb_val) for attrb_key, attrb_val in param_attrbs
+                if attrb_key in IMPLICIT_PARAM_ATTRIBUTES))
+
+    return implicit_params
+
+def tokenize_attributes(body, index=0):
+    # single left-to-right pass over the key = value body of an annotation
+    # starting just after its opening parenthesis, eg:
+    #   name = "petId", required = true, code = 200, tags = {"pet", "store"})
+    # returns a list of (key, raw_value) tuples and the index just past the
+    # closing parenthesis. Raw values are kept exactly as written so quoted
+    # strings keep their quotation marks and arrays their braces. A value
+    # without a key, eg: @ApiImplicitParams({...}), is returned as 'value'
+    key_val_list = []
+    length = len(body)
+
+    while True:
+        index = skip_filler(body, index)
+        if index >= length:
+            return key_val_list, length
+
+        if body[index] == ')':
+            return key_val_list, index + 1
+
+        key_end = index
+        while key_end < length and (body[key_end].isalnum() or body[key_end] == '_'):
+            key_end += 1
+
+        equals_index = skip_filler(body, key_end)
+        if key_end > index and equals_index < length and body[equals_index] == '=':
+            key = body[index:key_end]
+            index = skip_filler(body, equals_index + 1)
+        else:
+            key = 'value'
+
+        value_end = max(scan_value(body, index), index + 1)
+        key_val_list.append((key, body[index:value_end].rstrip()))
+        index = value_end
+
+def split_array(raw_array):
+    # splits the raw value of an array attribute into its raw elements, eg:
+    #   {"pet", "store"} -> ['"pet"', '"store"']
+    # a single element without braces is treated as a one element array
+    if not raw_array.startswith('{'):
+        return [raw_array] if raw_array else []
+
+    elements = []
+    index = 1
+    length = len(raw_array)
+
+    while True:
+        index = skip_filler(raw_array, index)
+        if index >= length or raw_array[index] == '}':
+            return elements
+
+        value_end = max(scan_value(raw_array, index), index + 1)
+        elements.append(raw_array[index:value_end].rstrip())
+        index = value_end
+
+def skip_filler(body, index):
+    # skips whitespace, attribute separators and the leading asterisks of
+    # the comment lines an annotation can span
+    length = len(body)
+    while index < length and (body[index] in ' \t\r\n,*'):
+        index += 1
+    return index
+
+def scan_value(body, index):
+    # returns the index just past the raw value starting at index
+    length = len(body)
+    if index >= length:
+        return length
+
+    char = body[index]
+
+    if char == '"' or char == "'":
+        index = scan_string(body, index)
+        # string concatenation, eg: "Returns a pet " + "by ID"
+        next_index = skip_filler(body, index)
+        while next_index < length and body[next_index] == '+':
+            index = scan_value(body, skip_filler(body, next_index + 1))
+            next_index = skip_filler(body, index)
+        return index
+
+    if char == '@':
+        # nested annotation, eg: @ApiResponse(code = 400, message = "...")
+        index += 1
+        while index < length and (body[index].isalnum() or body[index] in '_.'):
+            index += 1
+        if index >= length or body[index] != '(':
+            return index
+        char = '('
+
+    if char == '{' or char == '(':
+        # arrays and annotation bodies, skipping over any quoted strings so
+        # that braces and parentheses inside them are not counted
+        depth = 0
+        while index < length:
+            char = body[index]
+            if char == '"' or char == "'":
+                index = scan_string(body, index)
+                continue
+            if char == '{' or char == '(':
+                depth += 1
+            elif char == '}' or char == ')':
+                depth -= 1
+                if depth == 0:
+                    return index + 1
+            index += 1
+        return length
+
+    # booleans, numbers and class literals run until the next delimiter
+    while index < length and body[index] not in ',)}' and not body[index].isspace():
+        index += 1
+    return index
+
+def scan_string(body, index):
+    # returns the index just past the quoted string starting at index,
+    # honouring backslash escaped quotation marks
+    quote = body[index]
+    length = len(body)
+    index += 1
+    while index < length:
+        char = body[index]
+        if char == '\\':
+            index += 2
+        elif char == quote:
+            return index + 1
+        else:
+            index += 1
+    return length
 
 def parse_http_method(annotations):
     # takes an annotations string and returns the extracted HTTP method
@@ -284,7 +1371,7 @@ def parse_http_method(annotations):
 def parse_path(annotations):
     # takes a string containing a subset of the annotations and returns the
     # value of the path variable
-    matches = re.search('@Path\("(.*?)"\)', annotations, re.DOTALL)
+    matches = re.search(r'@Path\("(.*?)"\)', annotations, re.DOTALL)
     if matches:
         return matches.group(1)
     else:
@@ -293,7 +1380,7 @@ def parse_path(annotations):
 def parse_produces(annotations):
     # takes a string containing a subset of the annotations and returns a list
     # containing the types it produces
-    matches = re.search('@Produces\(\{(.*?)\}\)', annotations, re.DOTALL)
+    matches = re.search(r'@Produces\(\{(.*?)\}\)', annotations, re.DOTALL)
     if matches:
         inner_content = matches.group(1)
     else:
@@ -306,7 +1393,7 @@ def parse_produces(annotations):
 def parse_consumes(annotations):
     # takes a string containing a subset of the annotations and returns a list
     # containing the types it consumes
-    matches = re.search('@Consumes\(\{(.*?)\}\)', annotations, re.DOTALL)
+    matches = re.search(r'@Consumes\(\{(.*?)\}\)', annotations, re.DOTALL)
     if matches:
         inner_content = matches.group(1)
     else:
@@ -321,44 +1408,69 @@ def parse_api(annotations):
     # takes a string containing a subset of the annotations and returns a dict
     # containing the the key-value pair (description: '..')
 
-    api_result = []
-
-    matches = re.search('@Api\((.*?)\)', annotations, re.DOTALL)
-    inner_content = matches.group(1)
-
-    # split by comma ONLY if the quotation marks (") match up
-    # this essentially allows commas within quotations as opposed to solely limiting
-    # the use of commas as an attribute delimiter
-    key_val_regex = re.compile('(\w+)\s*?=\s*?"(.*?)"', re.DOTALL)
-    key_val_list = key_val_regex.findall(inner_content)
-    key_val_list.extend(parse_tags(inner_content))
-
-    return dict(key_val_list)
-
-def get_api_annotated_files_old():
-    # returns a list of files that have been annotated with @Api signifying
-    # that the file is a Swagger resource, as well as the start index of @Api(...)
-    file_list = []
-
-    # get the list of all the java files in the api directory
-    path = Path(API_PATH)
-    all_files = [ f.resolve() for f in list(path.rglob('*.java')) if f.is_file() ]
-
-    # filter the files for ones containing the @Api declaration
-    # eg: @Api(value = "/pet", description = "Operations about pets")
-    for curr_file in all_files:
-        with curr_file.open() as source_file:
-            code = source_file.read()
-            annotation_exists = code.find("@Api(")
-
-        if (annotation_exists != -1):
-            file_list.append(curr_file)
-
-    return file_list
-
-def get_resource_model_lists(include_list, production):
+    api_result = {}
+
+    start = annotations.find('@Api(')
+    if start == -1:
+        return api_result
+
+    key_val_list, _ = tokenize_attributes(annotations, start + len('@Api('))
+
+    for key, value in key_val_list:
+        if key == 'tags':
+            api_result['tags'] = parse_tags(value)
+        elif len(value) > 1 and value[0] == '"' and value[-1] == '"':
+            # only quoted attributes are kept and their quotation marks removed
+            api_result[key] = unquote(value)
+
+    return api_result
+
+def discover_files(info_obj, base_dir, build_cache=None):
+    # returns the resource and model files found by the "discover" rules of
+    # the config (see discovery.discover), the index of the files already
+    # checked is kept next to the build cache
+    rules = info_obj.get('discover')
+    if not rules:
+        return [], []
+
+    index_file = discovery.index_path(build_cache.directory, base_dir) if build_cache else None
+    try:
+        return discovery.discover(rules, base_dir, index_file)
+    except OSError as error:
+        raise ParseError(base_dir, 'unable to discover files: ' + (error.strerror or str(error)))
+
+def discovered_in(info_obj, production):
+    # discovered files are part of the production spec unless the discover
+    # rules say "production": false
+    return 'discover' in info_obj and (not production or info_obj['discover'].get('production', True))
+
+def add_discovered(resource_list, model_list, discovered_resources, discovered_models, included=()):
+    # appends the discovered files the include list doesn't already name and
+    # returns the ones that were added. included are the files of the include
+    # entries left out of the lists (eg: by -p), discovery must not bring
+    # them back
+    listed = set(os.path.normpath(file_path) for file_path in resource_list + model_list)
+    listed.update(os.path.normpath(file_path) for file_path in included)
+
+    added_resources = [file_path for file_path in discovered_resources
+        if os.path.normpath(file_path) not in listed]
+    added_models = [file_path for file_path in discovered_models
+        if os.path.normpath(file_path) not in listed]
+
+    resource_list.extend(added_resources)
+    model_list.extend(added_models)
+
+    return added_resources, added_models
+
+def included_files(include_list, base_dir):
+    # every resource and model file the include list names, production or not
+    return [os.path.join(base_dir, file_obj[key]) for file_obj in include_list
+        for key in ('resource', 'model') if file_obj.get(key)]
+
+def get_resource_model_lists(include_list, production, base_dir=API_DIR):
     # returns a list of files that have been annotated with @Api signifying
     # that the file is a Swagger resource, as well as the start index of @Api(...)
+    # the include list entries are relative to base_dir
     resource_list = []
     model_list = []
 
@@ -366,14 +1478,14 @@ def get_resource_model_lists(include_list, production):
     if production:
         for file_obj in include_list:
             if file_obj['production'] and file_obj['resource']:
-                file_path = '../api/' + file_obj['resource']
+                file_path = os.path.join(base_dir, file_obj['resource'])
                 if os.path.isfile(file_path):
                     resource_list.append(file_path)
                 else:
                     print('WARNING: ' + file_path + ' does not exist')
 
             if file_obj['production'] and file_obj['model']:
-                file_path = '../api/' + file_obj['model']
+                file_path = os.path.join(base_dir, file_obj['model'])
                 if os.path.isfile(file_path):
                     model_list.append(file_path)
                 else:
@@ -381,14 +1493,14 @@ def get_resource_model_lists(include_list, production):
     else:
         for file_obj in include_list:
             if file_obj['resource']:
-                file_path = '../api/' + file_obj['resource']
+                file_path = os.path.join(base_dir, file_obj['resource'])
                 if os.path.isfile(file_path):
                     resource_list.append(file_path)
                 else:
                     print('WARNING: ' + file_path + ' does not exist')
 
             if file_obj['model']:
-                file_path = '../api/' + file_obj['model']
+                file_path = os.path.join(base_dir, file_obj['model'])
                 if os.path.isfile(file_path):
                     model_list.append(file_path)
                 else:
@@ -433,5 +1545,13 @@ class colors:
     BOLD = '\033[1m'
     UNDERLINE = '\033[4m'
 
+# subcommands, see main
+COMMANDS = {
+    'diff': diff_command,
+    'merge': merge_command,
+    'serve': serve_command,
+    'validate': validate_command
+}
+
 if __name__ == '__main__':
     main()
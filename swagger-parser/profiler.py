@@ -0,0 +1,141 @@
+import json
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# number of slowest source files listed as hot spots in the report
+HOT_SPOTS = 10
+
+class Profiler:
+    # records the wall and CPU time of every stage of a build, the timings and
+    # counts of every source file, running counters and the peak memory, and
+    # passes each of these events on to the registered hooks, eg:
+    #   profiler.add_hook(lambda event: print(event['event'], event['name']))
+    # where an event is a dict with an 'event' key of 'stage' or 'file'
+    enabled = True
+
+    def __init__(self):
+        self.stages = {}
+        self.files = []
+        self.counters = {}
+        self.hooks = []
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def stage(self, name):
+        # context manager timing one run of a stage, eg:
+        #   with profiler.stage('parse'):
+        return StageTimer(self, name)
+
+    def add_stage(self, name, wall, cpu):
+        stage = self.stages.setdefault(name, {'wall': 0.0, 'cpu': 0.0, 'calls': 0})
+        stage['wall'] += wall
+        stage['cpu'] += cpu
+        stage['calls'] += 1
+        self.emit({'event': 'stage', 'name': name, 'wall': wall, 'cpu': cpu})
+
+    def add_file(self, source_file, stats):
+        # stats holds the timings and counts of a single source file, the
+        # counts are added to the counters of the same name
+        entry = dict(stats)
+        entry['file'] = source_file
+        self.files.append(entry)
+
+        for name in FILE_COUNTERS:
+            if name in stats:
+                self.count(name, stats[name])
+
+        event = dict(entry)
+        event['event'] = 'file'
+        event['name'] = source_file
+        self.emit(event)
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def emit(self, event):
+        for hook in self.hooks:
+            hook(event)
+
+    def report(self):
+        # returns the machine-readable report of everything recorded so far
+        report = {}
+        report['total'] = {
+            'wall': time.perf_counter() - self.start_wall,
+            'cpu': time.process_time() - self.start_cpu
+        }
+        report['stages'] = self.stages
+        report['counters'] = self.counters
+        report['files'] = self.files
+        report['hot_spots'] = [entry['file'] for entry in
+            sorted(self.files, key=lambda entry: entry.get('wall', 0), reverse=True)[:HOT_SPOTS]]
+        report['peak_memory_kb'] = peak_memory()
+        return report
+
+    def write(self, report_file):
+        with open(report_file, 'w') as outfile:
+            json.dump(self.report(), outfile, sort_keys=True, indent=4 * ' ')
+
+class NullProfiler:
+    # stand-in used when profiling is off, every call is a no-op so the
+    # instrumented code only pays for a method call
+    enabled = False
+
+    def add_hook(self, hook):
+        pass
+
+    def stage(self, name):
+        return NULL_STAGE
+
+    def add_stage(self, name, wall, cpu):
+        pass
+
+    def add_file(self, source_file, stats):
+        pass
+
+    def count(self, name, amount=1):
+        pass
+
+class StageTimer:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.profiler.add_stage(self.name, time.perf_counter() - self.wall, time.process_time() - self.cpu)
+
+class NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        pass
+
+NULL_STAGE = NullStage()
+NULL_PROFILER = NullProfiler()
+
+# per-file values that are also totalled in the counters, the parse and
+# convert times are otherwise lost inside the pool processes
+FILE_COUNTERS = ['bytes', 'methods', 'params', 'responses', 'cached', 'parse_wall', 'convert_wall']
+
+def peak_memory():
+    # peak resident set size of this process and of its (pool) children in
+    # kilobytes, or None where the resource module is not available
+    if not resource:
+        return None
+
+    return {
+        'self': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'children': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    }
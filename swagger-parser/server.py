@@ -0,0 +1,143 @@
+import assembler
+import artifacts
+import collections
+import email.utils
+import hashlib
+import http.server
+import json
+
+# the served spec in both encodings, replaced as a whole on every update so
+# the request threads never see a half updated one
+Representation = collections.namedtuple('Representation', ['body', 'gzip_body', 'etag', 'last_modified'])
+
+class SpecStore:
+    # holds the spec as served (parser.py serve), bodies and ETags are computed
+    # once per update so a request only has to compare and send bytes
+    def __init__(self):
+        self.current = None
+
+    def publish(self, spec):
+        # takes the spec dict and returns whether it differs from the one
+        # served so far, the body is byte for byte what apis.json would be
+        # and the ETag the one the artifacts manifest (--artifacts) lists
+        minified = json.dumps(spec, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        etag = artifacts.spec_etag(hashlib.sha256(minified).hexdigest())
+
+        if self.current is not None and self.current.etag == etag:
+            return False
+
+        body = json.dumps(spec, sort_keys=True, indent=assembler.INDENT).encode('utf-8')
+        compress, flush = artifacts.gzip_compressor()
+        gzip_body = compress(body) + flush()
+
+        self.current = Representation(body, gzip_body, etag, email.utils.formatdate(usegmt=True))
+        return True
+
+class SpecHandler(http.server.BaseHTTPRequestHandler):
+    # answers GET and HEAD for the spec with a strong ETag per encoding, a 304
+    # when If-None-Match still matches and the precompressed body when the
+    # client accepts gzip
+    server_version = 'swagger-parser'
+    # keep-alive, so clients polling the spec reuse their connection
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.respond(True)
+
+    def do_HEAD(self):
+        self.respond(False)
+
+    def respond(self, send_body):
+        if self.path.split('?', 1)[0] not in self.server.spec_paths:
+            self.send_error(404)
+            return
+
+        spec = self.server.store.current
+        if spec is None:
+            self.send_response(503)
+            self.send_header('Retry-After', '1')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        # the gzip representation is a different entity and so gets its own
+        # strong ETag
+        if accepts_gzip(self.headers.get('Accept-Encoding', '')):
+            body = spec.gzip_body
+            etag = spec.etag[:-1] + '-gzip"'
+        else:
+            body = spec.body
+            etag = spec.etag
+
+        if etag_matches(self.headers.get('If-None-Match'), etag):
+            self.send_response(304)
+            self.send_cache_headers(etag, spec)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        if body is spec.gzip_body:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_cache_headers(etag, spec)
+        self.end_headers()
+
+        if send_body:
+            self.wfile.write(body)
+
+    def send_cache_headers(self, etag, spec):
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', spec.last_modified)
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+
+def create_server(store, host, port, spec_paths):
+    # returns a threaded HTTP server answering with the spec of store on every
+    # path in spec_paths, eg: ['/', '/apis.json']
+    server = http.server.ThreadingHTTPServer((host, port), SpecHandler)
+    server.daemon_threads = True
+    server.store = store
+    server.spec_paths = set(spec_paths)
+    return server
+
+def accepts_gzip(accept_encoding):
+    # whether the Accept-Encoding header allows gzip, eg: 'gzip, br' or
+    # 'gzip;q=0.5' but not 'gzip;q=0', a gzip entry takes precedence over *
+    qualities = {}
+    for coding in accept_encoding.split(','):
+        name, _, params = coding.partition(';')
+        name = name.strip().lower()
+        if name in ('gzip', '*'):
+            qualities.setdefault(name, coding_quality(params))
+
+    return qualities.get('gzip', qualities.get('*', 0)) > 0
+
+def coding_quality(params):
+    # the q value of an Accept-Encoding entry, 1 when it has none and 0 when
+    # it can't be read
+    for param in params.split(';'):
+        key, _, value = param.partition('=')
+        if key.strip().lower() == 'q':
+            try:
+                return float(value)
+            except ValueError:
+                return 0
+    return 1
+
+def etag_matches(if_none_match, etag):
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored
+    if not if_none_match:
+        return False
+
+    if if_none_match.strip() == '*':
+        return True
+
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+
+    return False
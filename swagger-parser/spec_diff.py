@@ -0,0 +1,245 @@
+import collections
+import hashlib
+import json
+
+# a node of the hash tree of a spec: digest covers the whole subtree and
+# children (None for leaves) maps each entry name to its own node
+MerkleNode = collections.namedtuple('MerkleNode', ['digest', 'children'])
+
+# keys of a parameter or property that change what a client has to send or
+# can expect back
+TYPE_KEYS = ['type', 'format', 'schema', 'items', '$ref', 'additionalProperties', 'collectionFormat']
+
+def merkle_tree(obj, depth):
+    # hashes obj down to depth levels of nesting, eg: depth 2 over the paths
+    # object gives a node per path with a leaf per operation. Leaves hash their
+    # canonical JSON and inner nodes the names and digests of their children,
+    # so two subtrees with the same digest are equal and need no comparison
+    if depth == 0 or not isinstance(obj, dict):
+        text = json.dumps(obj, sort_keys=True, separators=(',', ':'))
+        return MerkleNode(hashlib.sha256(text.encode('utf-8')).hexdigest(), None)
+
+    children = dict((name, merkle_tree(value, depth - 1)) for name, value in obj.items())
+
+    digest = hashlib.sha256()
+    for name in sorted(children):
+        digest.update(name.encode('utf-8') + b'\0' + children[name].digest.encode('ascii') + b'\0')
+
+    return MerkleNode(digest.hexdigest(), children)
+
+def diff_specs(old_spec, new_spec):
+    # compares two assembled specs and returns the list of changed operations
+    # and definitions, each a dict of:
+    #   kind: 'operation' (with path and method) or 'definition' (with name)
+    #   change: 'added', 'removed' or 'modified'
+    #   breaking: whether existing clients can break
+    #   details: for modified entries a list of {'message', 'breaking'}
+    # only the subtrees whose digests differ are looked at in detail
+    changes = []
+
+    old_paths = old_spec.get('paths', {})
+    new_paths = new_spec.get('paths', {})
+    old_tree = merkle_tree(old_paths, 2)
+    new_tree = merkle_tree(new_paths, 2)
+
+    if old_tree.digest != new_tree.digest:
+        old_items = old_tree.children or {}
+        new_items = new_tree.children or {}
+        for path in sorted(set(old_items) | set(new_items)):
+            old_node = old_items.get(path)
+            new_node = new_items.get(path)
+            if old_node and new_node and old_node.digest == new_node.digest:
+                continue
+
+            # a path item that is not an object (children None) has no
+            # operations, its operations count as removed or added
+            old_methods = (old_node.children or {}) if old_node else {}
+            new_methods = (new_node.children or {}) if new_node else {}
+
+            for method in sorted(set(old_methods) | set(new_methods)):
+                change = compare_entry(old_methods.get(method), new_methods.get(method),
+                    lambda: operation_details(old_paths[path][method], new_paths[path][method]))
+                if change:
+                    change['kind'] = 'operation'
+                    change['path'] = path
+                    change['method'] = method
+                    changes.append(change)
+
+    old_definitions = old_spec.get('definitions', {})
+    new_definitions = new_spec.get('definitions', {})
+    old_tree = merkle_tree(old_definitions, 1)
+    new_tree = merkle_tree(new_definitions, 1)
+
+    if old_tree.digest != new_tree.digest:
+        old_models = old_tree.children or {}
+        new_models = new_tree.children or {}
+        for name in sorted(set(old_models) | set(new_models)):
+            change = compare_entry(old_models.get(name), new_models.get(name),
+                lambda: definition_details(old_definitions[name], new_definitions[name]))
+            if change:
+                change['kind'] = 'definition'
+                change['name'] = name
+                changes.append(change)
+
+    return changes
+
+def compare_entry(old_node, new_node, get_details):
+    # returns the change between two leaves or None if they are equal
+    if old_node is None:
+        return {'change': 'added', 'breaking': False, 'details': []}
+
+    if new_node is None:
+        return {'change': 'removed', 'breaking': True, 'details': []}
+
+    if old_node.digest == new_node.digest:
+        return None
+
+    details = get_details()
+    return {
+        'change': 'modified',
+        'breaking': any(detail['breaking'] for detail in details),
+        'details': details
+    }
+
+def operation_details(old, new):
+    # the changes between two versions of an operation object
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return [detail('operation is not an object', not isinstance(new, dict))]
+
+    details = []
+
+    old_params = dict(((param.get('in'), param.get('name')), param) for param in old.get('parameters', []))
+    new_params = dict(((param.get('in'), param.get('name')), param) for param in new.get('parameters', []))
+
+    for key in sorted(set(old_params) | set(new_params), key=str):
+        label = 'parameter %s (%s)' % (key[1], key[0])
+        old_param = old_params.get(key)
+        new_param = new_params.get(key)
+
+        if new_param is None:
+            details.append(detail(label + ' removed', True))
+        elif old_param is None:
+            if new_param.get('required'):
+                details.append(detail('required ' + label + ' added', True))
+            else:
+                details.append(detail('optional ' + label + ' added', False))
+        elif old_param != new_param:
+            details.extend(value_details(label, old_param, new_param))
+
+    old_responses = old.get('responses', {})
+    new_responses = new.get('responses', {})
+
+    for code in sorted(set(old_responses) | set(new_responses)):
+        label = 'response ' + code
+        if code not in new_responses:
+            # clients rely on the success responses, dropping an error is fine
+            details.append(detail(label + ' removed', code.startswith('2')))
+        elif code not in old_responses:
+            details.append(detail(label + ' added', False))
+        elif old_responses[code].get('schema') != new_responses[code].get('schema'):
+            details.append(detail(label + ' schema changed', True))
+        elif old_responses[code] != new_responses[code]:
+            details.append(detail(label + ' description changed', False))
+
+    for key in ['produces', 'consumes']:
+        removed = set(old.get(key, [])) - set(new.get(key, []))
+        added = set(new.get(key, [])) - set(old.get(key, []))
+        if removed:
+            details.append(detail(key + ' no longer lists ' + ', '.join(sorted(removed)), True))
+        if added:
+            details.append(detail(key + ' now lists ' + ', '.join(sorted(added)), False))
+
+    for key in sorted(set(old) | set(new)):
+        if key in ('parameters', 'responses', 'produces', 'consumes'):
+            continue
+        if old.get(key) != new.get(key):
+            details.append(detail(key + ' changed', False))
+
+    return details
+
+def definition_details(old, new):
+    # the changes between two versions of a model
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return [detail('definition is not an object', not isinstance(new, dict))]
+
+    details = []
+
+    if old.get('type') != new.get('type'):
+        details.append(detail('type changed from %s to %s' % (old.get('type'), new.get('type')), True))
+
+    old_properties = old.get('properties', {})
+    new_properties = new.get('properties', {})
+
+    for name in sorted(set(old_properties) | set(new_properties)):
+        label = 'property ' + name
+        if name not in new_properties:
+            details.append(detail(label + ' removed', True))
+        elif name not in old_properties:
+            details.append(detail(label + ' added', False))
+        elif old_properties[name] != new_properties[name]:
+            details.extend(value_details(label, old_properties[name], new_properties[name]))
+
+    newly_required = set(new.get('required', [])) - set(old.get('required', []))
+    for name in sorted(newly_required):
+        details.append(detail('property ' + name + ' became required', True))
+
+    for key in sorted(set(old) | set(new)):
+        if key in ('type', 'properties', 'required'):
+            continue
+        if old.get(key) != new.get(key):
+            details.append(detail(key + ' changed', False))
+
+    return details
+
+def value_details(label, old, new):
+    # the changes between two versions of a parameter or property
+    details = []
+
+    if any(old.get(key) != new.get(key) for key in TYPE_KEYS):
+        details.append(detail(label + ' type changed', True))
+
+    if not old.get('required') and new.get('required'):
+        details.append(detail(label + ' became required', True))
+
+    removed_values = [value for value in old.get('enum') or [] if value not in (new.get('enum') or [])]
+    if removed_values and 'enum' in new:
+        details.append(detail(label + ' no longer allows ' + ', '.join(map(str, removed_values)), True))
+
+    if narrower(old.get('minimum'), new.get('minimum'), 1) or narrower(old.get('maximum'), new.get('maximum'), -1):
+        details.append(detail(label + ' range narrowed', True))
+
+    if not details:
+        details.append(detail(label + ' changed', False))
+
+    return details
+
+def narrower(old_bound, new_bound, direction):
+    # whether a minimum (direction 1) or maximum (direction -1) got tighter
+    if new_bound is None:
+        return False
+    if old_bound is None:
+        return True
+    return (new_bound - old_bound) * direction > 0
+
+def detail(message, breaking):
+    return {'message': message, 'breaking': breaking}
+
+def format_changes(changes):
+    # human readable report of diff_specs, one line per change followed by
+    # its details
+    lines = []
+    symbols = {'added': '+', 'removed': '-', 'modified': '~'}
+
+    for change in changes:
+        if change['kind'] == 'operation':
+            name = change['method'].upper() + ' ' + change['path']
+        else:
+            name = 'definition ' + change['name']
+
+        lines.append('%s %s%s' % (symbols[change['change']], name, ' [breaking]' if change['breaking'] else ''))
+        for item in change['details']:
+            lines.append('    %s%s' % (item['message'], ' [breaking]' if item['breaking'] else ''))
+
+    breaking = sum(1 for change in changes if change['breaking'])
+    lines.append('%d changes, %d breaking' % (len(changes), breaking))
+    return '\n'.join(lines)
@@ -0,0 +1,320 @@
+import re
+import spec_diff
+
+# bump whenever a check changes so that cached results are no longer used
+VALIDATOR_VERSION = '1'
+
+HTTP_METHODS = set(['get', 'put', 'post', 'delete', 'options', 'head', 'patch'])
+PARAMETER_LOCATIONS = set(['query', 'header', 'path', 'formData', 'body'])
+PARAMETER_TYPES = set(['string', 'number', 'integer', 'boolean', 'array', 'file'])
+SCHEMA_TYPES = set(['string', 'number', 'integer', 'boolean', 'array', 'object', 'file'])
+SCHEMES = set(['http', 'https', 'ws', 'wss'])
+
+DEFINITIONS_PREFIX = '#/definitions/'
+PATH_PARAM_REGEX = re.compile(r'\{([^}/]+)\}')
+RESPONSE_CODE_REGEX = re.compile(r'[1-5]\d\d\Z')
+
+class SpecValidator:
+    # checks an assembled spec against the subset of Swagger 2.0 this tool
+    # writes. Every operation and definition is checked on its own and its
+    # result kept under the digest of its subtree (see spec_diff.merkle_tree),
+    # so validating a rebuilt spec only re-checks the entries that changed.
+    # The dangling $ref, duplicate operationId and document level checks
+    # need the whole spec and always run, they are cheap
+    #
+    # with a build cache the results outlive the process, name (eg: the
+    # output file) keeps the results of different specs apart
+    def __init__(self, build_cache=None, name=''):
+        self.build_cache = build_cache
+        self.results = {}
+
+        if build_cache:
+            self.cache_key = build_cache.key('validation', name.encode('utf-8'), VALIDATOR_VERSION)
+            self.results = build_cache.get(self.cache_key) or {}
+
+    def validate(self, spec):
+        # returns the list of issues, each a dict of severity ('error' or
+        # 'warning'), location and message
+        issues = check_document(spec)
+        results = {}
+        refs = []
+        operation_ids = {}
+
+        paths = spec.get('paths') or {}
+        paths_tree = spec_diff.merkle_tree(paths, 2) if isinstance(paths, dict) else None
+
+        for path in sorted(paths_tree.children if paths_tree else []):
+            if not isinstance(paths[path], dict):
+                issues.append(issue('error', path, 'path item is not an object'))
+                continue
+
+            for method in sorted(paths[path]):
+                location = method.upper() + ' ' + path
+                # the issues name the operation and its path parameters are
+                # checked against the path, so both are part of the key
+                key = 'operation\0' + path + '\0' + method + '\0' + paths_tree.children[path].children[method].digest
+                result = self.results.get(key) or check_operation(path, method, paths[path][method], location)
+                results[key] = result
+
+                issues.extend(result['issues'])
+                refs.extend((ref, location) for ref in result['refs'])
+
+                operation_id = paths[path][method].get('operationId') if isinstance(paths[path][method], dict) else None
+                if operation_id:
+                    operation_ids.setdefault(operation_id, []).append(location)
+
+        definitions = spec.get('definitions') or {}
+        definitions_tree = spec_diff.merkle_tree(definitions, 1) if isinstance(definitions, dict) else None
+
+        for name in sorted(definitions_tree.children if definitions_tree else []):
+            location = 'definition ' + name
+            key = 'definition\0' + name + '\0' + definitions_tree.children[name].digest
+            result = self.results.get(key) or check_definition(definitions[name], location)
+            results[key] = result
+
+            issues.extend(result['issues'])
+            refs.extend((ref, location) for ref in result['refs'])
+
+        for ref, location in refs:
+            if not ref.startswith(DEFINITIONS_PREFIX):
+                issues.append(issue('error', location, '$ref ' + ref + ' does not point into #/definitions'))
+            elif ref[len(DEFINITIONS_PREFIX):] not in definitions:
+                issues.append(issue('error', location, '$ref ' + ref + ' points at an undefined model'))
+
+        for operation_id, locations in sorted(operation_ids.items()):
+            if len(locations) > 1:
+                issues.append(issue('error', ', '.join(locations), 'operationId ' + operation_id + ' is not unique'))
+
+        # only the entries of the current spec are kept, so the cache doesn't
+        # grow with every change
+        if results != self.results:
+            self.results = results
+            if self.build_cache:
+                self.build_cache.put(self.cache_key, results)
+
+        return issues
+
+def check_document(spec):
+    # the top-level fields, see the Swagger Object of the 2.0 specification
+    issues = []
+
+    if spec.get('swagger') != '2.0':
+        issues.append(issue('error', 'swagger', 'swagger must be "2.0"'))
+
+    info = spec.get('info')
+    if not isinstance(info, dict):
+        issues.append(issue('error', 'info', 'info is missing'))
+    else:
+        for key in ['title', 'version']:
+            if not isinstance(info.get(key), str):
+                issues.append(issue('error', 'info', 'info.' + key + ' is missing'))
+
+    base_path = spec.get('basePath')
+    if base_path is not None and not (isinstance(base_path, str) and base_path.startswith('/')):
+        issues.append(issue('error', 'basePath', 'basePath must start with /'))
+
+    for scheme in spec.get('schemes') or []:
+        if scheme not in SCHEMES:
+            issues.append(issue('error', 'schemes', 'unknown scheme ' + str(scheme)))
+
+    paths = spec.get('paths')
+    if not isinstance(paths, dict):
+        issues.append(issue('error', 'paths', 'paths is missing'))
+    else:
+        for path in paths:
+            if not isinstance(path, str) or not path.startswith('/'):
+                issues.append(issue('error', str(path), 'path must start with /'))
+
+    return issues
+
+def check_operation(path, method, operation, location):
+    # returns {'issues': [...], 'refs': [...]} of an operation object
+    issues = []
+    refs = []
+
+    if method not in HTTP_METHODS:
+        issues.append(issue('error', location, 'unknown HTTP method ' + method))
+
+    if not isinstance(operation, dict):
+        issues.append(issue('error', location, 'operation is not an object'))
+        return {'issues': issues, 'refs': refs}
+
+    for key in ['produces', 'consumes', 'tags']:
+        if key in operation and not is_string_list(operation[key]):
+            issues.append(issue('error', location, key + ' must be a list of strings'))
+
+    for key in ['produces', 'consumes']:
+        for media_type in operation.get(key) or []:
+            if isinstance(media_type, str) and '/' not in media_type:
+                issues.append(issue('warning', location, key + ' lists ' + repr(media_type) + ' which is not a media type'))
+
+    parameters = operation.get('parameters') or []
+    seen = set()
+    locations = []
+    path_params = set()
+
+    for index, param in enumerate(parameters):
+        param_location = location + ' parameter ' + (str(param.get('name')) if isinstance(param, dict) else str(index))
+        if not isinstance(param, dict):
+            issues.append(issue('error', param_location, 'parameter is not an object'))
+            continue
+
+        issues.extend(check_parameter(param, param_location))
+        collect_refs(param, refs)
+
+        key = (param.get('name'), param.get('in'))
+        if key in seen:
+            issues.append(issue('error', param_location, 'parameter is declared twice'))
+        seen.add(key)
+        locations.append(param.get('in'))
+
+        if param.get('in') == 'path':
+            path_params.add(param.get('name'))
+
+    if locations.count('body') > 1:
+        issues.append(issue('error', location, 'there can be only one body parameter'))
+    if 'body' in locations and 'formData' in locations:
+        issues.append(issue('error', location, 'body and formData parameters can\'t be combined'))
+
+    for name in PATH_PARAM_REGEX.findall(path):
+        if name not in path_params:
+            issues.append(issue('error', location, 'path parameter ' + name + ' is not declared'))
+    for name in sorted(path_params - set(PATH_PARAM_REGEX.findall(path)), key=str):
+        issues.append(issue('error', location, 'path parameter ' + str(name) + ' is not in the path'))
+
+    responses = operation.get('responses')
+    if not isinstance(responses, dict) or not responses:
+        issues.append(issue('error', location, 'responses are missing, declare at least one @ApiResponse'))
+    else:
+        for code, response in sorted(responses.items()):
+            response_location = location + ' response ' + code
+            if code != 'default' and not RESPONSE_CODE_REGEX.match(code):
+                issues.append(issue('error', response_location, 'response code must be a HTTP status code or default'))
+            if not isinstance(response, dict) or not isinstance(response.get('description'), str):
+                issues.append(issue('error', response_location, 'response description is missing'))
+                continue
+            if 'schema' in response:
+                issues.extend(check_schema(response['schema'], response_location))
+                collect_refs(response['schema'], refs)
+
+    return {'issues': issues, 'refs': refs}
+
+def check_parameter(param, location):
+    issues = []
+
+    if not isinstance(param.get('name'), str) or not param.get('name'):
+        issues.append(issue('error', location, 'parameter name is missing'))
+
+    param_in = param.get('in')
+    if param_in not in PARAMETER_LOCATIONS:
+        issues.append(issue('error', location, 'parameter location (paramType) ' + repr(param_in) + ' is not one of '
+            + ', '.join(sorted(PARAMETER_LOCATIONS))))
+        return issues
+
+    if param_in == 'path' and param.get('required') is not True:
+        issues.append(issue('error', location, 'path parameters must be required'))
+
+    if param_in == 'body':
+        if 'schema' not in param:
+            issues.append(issue('error', location, 'body parameters need a schema'))
+        else:
+            issues.extend(check_schema(param['schema'], location))
+        return issues
+
+    if 'schema' in param:
+        issues.append(issue('error', location, param_in + ' parameters can only have a primitive type, not a schema (dataType)'))
+        return issues
+
+    param_type = param.get('type')
+    if param_type not in PARAMETER_TYPES:
+        issues.append(issue('error', location, 'parameter type ' + repr(param_type) + ' is not one of '
+            + ', '.join(sorted(PARAMETER_TYPES))))
+    elif param_type == 'array' and 'items' not in param:
+        issues.append(issue('error', location, 'array parameters need items'))
+    elif param_type == 'file' and param_in != 'formData':
+        issues.append(issue('error', location, 'file parameters must be formData'))
+
+    if 'enum' in param and not (isinstance(param['enum'], list) and param['enum']):
+        issues.append(issue('error', location, 'enum must be a non-empty list'))
+
+    if isinstance(param.get('minimum'), (int, float)) and isinstance(param.get('maximum'), (int, float)):
+        if param['minimum'] > param['maximum']:
+            issues.append(issue('error', location, 'minimum is larger than maximum'))
+
+    return issues
+
+def check_definition(definition, location):
+    # returns {'issues': [...], 'refs': [...]} of a model
+    refs = []
+    issues = check_schema(definition, location)
+    collect_refs(definition, refs)
+
+    if isinstance(definition, dict) and isinstance(definition.get('properties'), dict):
+        for name in definition.get('required') or []:
+            if name not in definition['properties']:
+                issues.append(issue('warning', location, 'required property ' + str(name) + ' is not declared'))
+
+    return {'issues': issues, 'refs': refs}
+
+def check_schema(schema, location):
+    # the structure of a schema object and the ones nested in it
+    issues = []
+    pending = [schema]
+
+    while pending:
+        schema = pending.pop()
+        if not isinstance(schema, dict):
+            issues.append(issue('error', location, 'schema is not an object'))
+            continue
+
+        if '$ref' in schema:
+            if not isinstance(schema['$ref'], str):
+                issues.append(issue('error', location, '$ref must be a string'))
+            continue
+
+        schema_type = schema.get('type')
+        if schema_type is not None and schema_type not in SCHEMA_TYPES:
+            issues.append(issue('error', location, 'schema type ' + repr(schema_type) + ' is not one of '
+                + ', '.join(sorted(SCHEMA_TYPES))))
+
+        if schema_type == 'array':
+            if 'items' not in schema:
+                issues.append(issue('error', location, 'array schemas need items'))
+            else:
+                pending.append(schema['items'])
+
+        if 'properties' in schema:
+            if not isinstance(schema['properties'], dict):
+                issues.append(issue('error', location, 'properties must be an object'))
+            else:
+                pending.extend(schema['properties'].values())
+
+        if isinstance(schema.get('additionalProperties'), dict):
+            pending.append(schema['additionalProperties'])
+
+        if 'required' in schema and not is_string_list(schema['required']):
+            issues.append(issue('error', location, 'required must be a list of property names'))
+
+    return issues
+
+def collect_refs(obj, refs):
+    # appends every $ref string below obj to refs
+    pending = [obj]
+    while pending:
+        value = pending.pop()
+        if isinstance(value, dict):
+            ref = value.get('$ref')
+            if isinstance(ref, str):
+                refs.append(ref)
+            pending.extend(value.values())
+        elif isinstance(value, list):
+            pending.extend(value)
+
+def is_string_list(value):
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+def issue(severity, location, message):
+    return {'severity': severity, 'location': location, 'message': message}
+
+def format_issue(found):
+    return '%s: %s: %s' % (found['severity'].upper(), found['location'], found['message'])
@@ -0,0 +1,183 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+# seconds without further changes before a burst of events is handed on,
+# editors often write a file in several steps (truncate, write, rename)
+DEBOUNCE = 0.05
+
+# seconds between two stat sweeps of the polling watcher
+POLL_INTERVAL = 0.25
+
+# inotify event flags, see inotify(7)
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, 'O_CLOEXEC', 0)
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+EVENT_HEADER = struct.Struct('iIII')
+
+def load_libc():
+    # returns libc when it provides inotify (Linux), None otherwise
+    library = ctypes.util.find_library('c')
+    if not library:
+        return None
+    try:
+        libc = ctypes.CDLL(library, use_errno=True)
+        libc.inotify_init1
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+class InotifyWatcher:
+    # watches the directories of the files and reports the changed paths from
+    # the kernel events, renames into place (the usual editor save) included
+    name = 'inotify'
+
+    def __init__(self, libc):
+        self.libc = libc
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.directories = {}
+
+    def watch(self, paths):
+        # adds a watch for the directory of every path, watches are never
+        # removed as they cost next to nothing
+        watched = set(self.directories.values())
+        for directory in set(os.path.dirname(os.path.abspath(path)) for path in paths):
+            if directory in watched:
+                continue
+            descriptor = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+            if descriptor >= 0:
+                self.directories[descriptor] = directory
+
+    def wait(self, timeout=None):
+        # returns the set of absolute paths changed before the timeout (None
+        # waits until something changes)
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            descriptor, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+
+            if descriptor in self.directories and name:
+                changed.add(os.path.join(self.directories[descriptor], os.fsdecode(name)))
+
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher:
+    # fallback that stats the files every POLL_INTERVAL seconds, the listings
+    # of their directories are compared as well to notice new files
+    name = 'polling'
+
+    def __init__(self):
+        self.files = {}
+        self.listings = {}
+
+    def watch(self, paths):
+        self.files = dict((path, file_signature(path)) for path in map(os.path.abspath, paths))
+        self.listings = dict((directory, list_directory(directory))
+            for directory in set(os.path.dirname(path) for path in self.files))
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            changed = self.sweep()
+            if changed:
+                return changed
+
+            if deadline is None:
+                time.sleep(POLL_INTERVAL)
+                continue
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return set()
+            time.sleep(min(POLL_INTERVAL, remaining))
+
+    def sweep(self):
+        changed = set()
+
+        for path, signature in self.files.items():
+            current = file_signature(path)
+            if current != signature:
+                self.files[path] = current
+                changed.add(path)
+
+        for directory, names in self.listings.items():
+            current = list_directory(directory)
+            if current != names:
+                self.listings[directory] = current
+                changed.update(os.path.join(directory, name) for name in current ^ names)
+
+        return changed
+
+    def close(self):
+        pass
+
+def create_watcher(paths):
+    # inotify where the platform has it, stat polling everywhere else
+    libc = load_libc()
+    watcher = None
+
+    if libc:
+        try:
+            watcher = InotifyWatcher(libc)
+        except OSError:
+            watcher = None
+
+    if watcher is None:
+        watcher = PollingWatcher()
+
+    watcher.watch(paths)
+    return watcher
+
+def wait_for_changes(watcher, debounce=DEBOUNCE):
+    # blocks until something changes and then keeps collecting the changes
+    # until there were none for debounce seconds, returns the changed paths
+    changed = set()
+    while not changed:
+        changed = watcher.wait()
+
+    while True:
+        more = watcher.wait(debounce)
+        if not more:
+            return changed
+        changed |= more
+
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def list_directory(directory):
+    try:
+        return set(os.listdir(directory))
+    except OSError:
+        return set()
@@ -0,0 +1,21 @@
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'swagger-parser'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import corpus
+
+@pytest.fixture
+def project(tmp_path):
+    # a small synthetic project (see benchmarks/corpus.py), returns the path
+    # of its SwaggerConfig.json
+    return corpus.write_corpus(str(tmp_path / 'project'), 6, 4, 3, 2)
+
+def load_json(path):
+    with open(path) as infile:
+        return json.load(infile)
@@ -0,0 +1,95 @@
+import gzip
+import hashlib
+import json
+import os
+
+import pytest
+
+import artifacts
+import assembler
+import parser
+from conftest import load_json
+
+def build(project, output_file):
+    base_dir = os.path.dirname(project)
+    complete_paths_obj, model_list, tag_list, metadata = parser.parse_project(parser.load_config(project), base_dir,
+        False)
+    assembler.assemble_project(complete_paths_obj, model_list, tag_list, metadata, output_file=output_file,
+        build_artifacts=True)
+
+def read(path):
+    with open(path, 'rb') as infile:
+        return infile.read()
+
+def test_output_file_is_only_replaced_when_its_content_changes(tmp_path):
+    path = str(tmp_path / 'out.json')
+    with artifacts.OutputFile(path) as outfile:
+        outfile.write('{"a": 1}')
+    assert outfile.changed
+    os.utime(path, ns=(0, 0))
+
+    with artifacts.OutputFile(path) as outfile:
+        outfile.write('{"a": 1}')
+    assert not outfile.changed
+    assert os.stat(path).st_mtime_ns == 0
+
+    with artifacts.OutputFile(path) as outfile:
+        outfile.write('{"a": 2}')
+    assert outfile.changed
+    assert read(path) == b'{"a": 2}'
+
+    # no temporary files are left behind
+    assert os.listdir(str(tmp_path)) == ['out.json']
+
+def test_failed_write_keeps_the_old_file(tmp_path):
+    path = str(tmp_path / 'out.json')
+    with artifacts.OutputFile(path) as outfile:
+        outfile.write('old')
+
+    with pytest.raises(ValueError):
+        with artifacts.OutputFile(path) as outfile:
+            outfile.write('new')
+            raise ValueError('failed')
+
+    assert read(path) == b'old'
+    assert os.listdir(str(tmp_path)) == ['out.json']
+
+def test_compressed_copies_hold_the_minified_spec(project, tmp_path):
+    output_file = str(tmp_path / 'apis.json')
+    build(project, output_file)
+
+    minified = read(artifacts.min_path(output_file))
+    assert minified == json.dumps(load_json(output_file), sort_keys=True, separators=(',', ':')).encode('utf-8')
+    assert gzip.decompress(read(artifacts.min_path(output_file) + '.gz')) == minified
+
+    if artifacts.brotli:
+        assert artifacts.brotli.decompress(read(artifacts.min_path(output_file) + '.br')) == minified
+    else:
+        assert not os.path.exists(artifacts.min_path(output_file) + '.br')
+
+def test_manifest_lists_sizes_and_hashes(project, tmp_path):
+    output_file = str(tmp_path / 'apis.json')
+    build(project, output_file)
+    manifest = load_json(artifacts.manifest_path(output_file))
+
+    assert 'apis.json' in manifest['files'] and 'apis.min.json.gz' in manifest['files']
+    for name, entry in manifest['files'].items():
+        data = read(str(tmp_path / name))
+        assert entry == {'bytes': len(data), 'sha256': hashlib.sha256(data).hexdigest()}, name
+
+    minified = read(artifacts.min_path(output_file))
+    assert manifest['sha256'] == hashlib.sha256(minified).hexdigest()
+    assert manifest['etag'] == artifacts.spec_etag(manifest['sha256'])
+
+def test_unchanged_build_rewrites_nothing(project, tmp_path):
+    output_dir = tmp_path / 'out'
+    output_dir.mkdir()
+    build(project, str(output_dir / 'apis.json'))
+    written = sorted(os.listdir(str(output_dir)))
+    for name in written:
+        os.utime(str(output_dir / name), ns=(0, 0))
+
+    build(project, str(output_dir / 'apis.json'))
+
+    assert sorted(os.listdir(str(output_dir))) == written
+    assert all(os.stat(str(output_dir / name)).st_mtime_ns == 0 for name in written)
@@ -0,0 +1,104 @@
+import os
+
+import converter
+import ir
+import parser
+import validator
+
+def test_reset_caches_empties_the_intern_table():
+    converter.resolve_response('List<Pet>', False)
+    assert converter.interned_schemas
+    assert converter.resolve_response.cache_info().currsize
+
+    converter.reset_caches()
+
+    assert not converter.interned_schemas
+    assert converter.resolve_response.cache_info().currsize == 0
+    assert converter.resolve_type.cache_info().currsize == 0
+
+def test_every_build_starts_with_empty_caches(project):
+    base_dir = os.path.dirname(project)
+    config = parser.load_config(project)
+
+    parser.generate(config, base_dir)
+    interned = len(converter.interned_schemas)
+    converter.resolve_response('SomethingElse', True)
+    parser.generate(config, base_dir)
+
+    assert len(converter.interned_schemas) == interned
+
+def test_generate_returns_plain_dicts(project):
+    spec = parser.generate(parser.load_config(project), os.path.dirname(project))
+
+    pending = [spec]
+    while pending:
+        value = pending.pop()
+        if isinstance(value, dict):
+            assert type(value) is dict
+            pending.extend(value.values())
+        elif isinstance(value, list):
+            pending.extend(value)
+
+    # and so can be changed by the caller
+    for path_item in spec['paths'].values():
+        for operation in path_item.values():
+            for response in operation.get('responses', {}).values():
+                if 'schema' in response:
+                    response['schema']['description'] = 'changed'
+
+def convert(location, data_type):
+    converter.reset_caches()
+    return converter.convert_parameters([ir.Parameter('p', location, data_type)])[0]
+
+def test_non_body_parameters_declare_their_type_inline():
+    assert convert('header', 'byte[]') == {'name': 'p', 'in': 'header', 'type': 'string', 'format': 'byte',
+        'required': False}
+    assert convert('query', 'List<String>') == {'name': 'p', 'in': 'query', 'type': 'array',
+        'items': {'type': 'string'}, 'required': False}
+    assert convert('query', 'Set<long>')['items'] == {'type': 'integer', 'format': 'int64'}
+    assert convert('query', 'Set<long>')['uniqueItems'] is True
+    assert convert('path', 'int')['type'] == 'integer'
+
+def test_models_and_maps_only_fit_a_body(capsys):
+    for data_type in ['Pet', 'Map<String, Pet>', 'List<Pet>']:
+        param = convert('query', data_type)
+        assert 'schema' not in param and param['type'] == 'string'
+        assert 'WARNING: query parameter p can\'t be of type ' + data_type in capsys.readouterr().out
+
+    assert convert('body', 'List<Pet>')['schema'] == {'type': 'array', 'items': {'$ref': '#/definitions/Pet'}}
+    assert convert('body', 'string')['schema'] == {'type': 'string'}
+    assert 'type' not in convert('body', 'string')
+
+RESOURCE = '''/*api
+ * @Path("/files")
+ * @Api(value = "/files", description = "Files")
+ */
+public class FileResource {
+    /*api
+     * @PUT
+     * @Path("/{id}")
+     * @ApiOperation(value = "Upload a file", response = "File", httpMethod = "PUT")
+     * @ApiResponses(value = { @ApiResponse(code = 404, message = "Not found") })
+     * @ApiImplicitParams({
+     *     @ApiImplicitParam(name = "id", value = "Id", required = true, dataType = "long", paramType = "path"),
+     *     @ApiImplicitParam(name = "checksum", value = "Checksum", dataType = "byte[]", paramType = "header"),
+     *     @ApiImplicitParam(name = "tags", value = "Tags", dataType = "List<String>", paramType = "query"),
+     *     @ApiImplicitParam(name = "ids", value = "Ids", dataType = "Set<Long>", paramType = "query"),
+     *     @ApiImplicitParam(name = "body", value = "Content", required = true, dataType = "string", paramType = "body")
+     * })
+     */
+    public Response put(String id) { return null; }
+}
+'''
+
+def test_generated_spec_is_valid_swagger(tmp_path):
+    (tmp_path / 'FileResource.java').write_text(RESOURCE)
+    (tmp_path / 'models.json').write_text('{"definitions": {"File": {"type": "object"}}}')
+    config = {'swagger': '2.0', 'info': {'title': 't', 'version': '1'}, 'host': 'h', 'basePath': '/',
+        'schemes': ['https'], 'include': [{'name': 'files', 'description': 'Files', 'resource': 'FileResource.java',
+        'model': 'models.json', 'production': True}]}
+
+    spec = parser.generate(config, str(tmp_path))
+
+    assert validator.SpecValidator().validate(spec) == []
+    assert len(spec['paths']['/files/{id}']['put']['parameters']) == 5
@@ -0,0 +1,25 @@
+import os
+
+import pytest
+
+import corpus
+import parser
+import validator
+
+@pytest.mark.parametrize('production', [False, True])
+def test_corpus_spec_is_valid(tmp_path, production):
+    project = corpus.write_corpus(str(tmp_path / 'project'), 12, 6, 5, 3)
+
+    spec = parser.generate(parser.load_config(project), os.path.dirname(project), production)
+
+    assert spec['paths'] and spec['definitions']
+    assert validator.SpecValidator().validate(spec) == []
+
+def test_corpus_is_deterministic(tmp_path):
+    first = corpus.write_corpus(str(tmp_path / 'first'), 4, 3, 3, 2, seed=7)
+    second = corpus.write_corpus(str(tmp_path / 'second'), 4, 3, 3, 2, seed=7)
+
+    for rel_path in ['SwaggerConfig.json', 'resources/Resource3.java', 'models/Model3.json']:
+        with open(os.path.join(os.path.dirname(first), rel_path)) as a, \
+                open(os.path.join(os.path.dirname(second), rel_path)) as b:
+            assert a.read() == b.read()
@@ -0,0 +1,86 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import discovery
+import parser
+from conftest import ROOT, load_json
+
+def test_discover_finds_annotated_resources_and_models(project):
+    base_dir = os.path.dirname(project)
+    with open(os.path.join(base_dir, 'resources', 'Helper.java'), 'w') as outfile:
+        outfile.write('public class Helper {}\n')
+
+    resources, models = discovery.discover({'resources': ['resources/*.java'], 'models': ['models/**/*.json']},
+        base_dir)
+
+    assert [os.path.basename(path) for path in resources] == ['Resource%d.java' % index for index in range(6)]
+    assert len(models) == 6
+
+def test_discover_uses_and_refreshes_its_index(project, tmp_path):
+    base_dir = os.path.dirname(project)
+    rules = {'resources': ['**/*.java'], 'exclude': ['**/Resource5.java']}
+    index_file = str(tmp_path / 'index.json')
+
+    first, _ = discovery.discover(rules, base_dir, index_file)
+    assert len(first) == 5 and os.path.isfile(index_file)
+
+    # a file that lost its annotation is picked up although the index knows it
+    resource = os.path.join(base_dir, 'resources', 'Resource0.java')
+    with open(resource, 'w') as outfile:
+        outfile.write('public class Resource0 { }\n')
+
+    second, _ = discovery.discover(rules, base_dir, index_file)
+    assert resource not in second and len(second) == 4
+
+def test_production_build_keeps_non_production_entries_out(project):
+    base_dir = os.path.dirname(project)
+    config = load_json(project)
+    config['include'][0]['production'] = False
+    config['discover'] = {'resources': ['resources/*.java'], 'models': ['models/*.json']}
+
+    spec = parser.generate(config, base_dir, production=True)
+
+    assert not any(path.startswith('/resource0/') for path in spec['paths'])
+    assert not any(model.startswith('Model0_') for model in spec['definitions'])
+    # the other entries and the discovered files are still there
+    assert any(path.startswith('/resource1/') for path in spec['paths'])
+
+def test_full_build_lists_included_files_once(project):
+    base_dir = os.path.dirname(project)
+    config = load_json(project)
+    config['discover'] = {'resources': ['resources/*.java'], 'models': ['models/*.json']}
+
+    resources, models, _ = parser.list_project_files(config, False, base_dir)
+
+    assert len(resources) == len(set(map(os.path.normpath, resources))) == 6
+    assert len(models) == len(set(map(os.path.normpath, models))) == 6
+
+def test_config_in_the_working_directory(project, tmp_path):
+    # -c SwaggerConfig.json has no directory part, discovery still has to
+    # search the working directory
+    base_dir = os.path.dirname(project)
+    config = load_json(project)
+    config['include'] = []
+    config['discover'] = {'resources': ['resources/*.java'], 'models': ['models/*.json']}
+    with open(project, 'w') as outfile:
+        json.dump(config, outfile)
+
+    output_file = str(tmp_path / 'apis.json')
+    result = subprocess.run([sys.executable, os.path.join(ROOT, 'swagger-parser', 'parser.py'), '-c',
+        'SwaggerConfig.json', '--no-cache', '-o', output_file], cwd=base_dir, capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stdout + result.stderr
+    spec = load_json(output_file)
+    assert len(spec['paths']) == 6 * 4 and len(spec['definitions']) > 6
+
+def test_unreadable_project_directory_is_an_error(tmp_path):
+    with pytest.raises(OSError):
+        discovery.discover({'resources': ['**/*.java']}, str(tmp_path / 'missing'))
+
+    with pytest.raises(parser.ParseError):
+        parser.generate({'info': {'title': 't', 'version': '1'}, 'discover': {'resources': ['**/*.java']}},
+            str(tmp_path / 'missing'))
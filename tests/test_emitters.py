@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+import assembler
+import openapi
+import parser
+from conftest import load_json
+
+yaml = pytest.importorskip('yaml')
+
+def emit_project(project, tmp_path):
+    # builds the project the way the command line does, with the interned
+    # schemas of the converter in the paths, and writes every emitter
+    base_dir = os.path.dirname(project)
+    complete_paths_obj, model_list, tag_list, metadata = parser.parse_project(parser.load_config(project), base_dir, False)
+
+    output_file = str(tmp_path / 'apis.json')
+    assembler.assemble_project(complete_paths_obj, model_list, tag_list, metadata,
+        output_file=output_file, formats=list(assembler.EMITTERS))
+    return output_file
+
+def read(path):
+    with open(path) as infile:
+        return infile.read()
+
+def test_every_emitter_is_written(project, tmp_path):
+    output_file = emit_project(project, tmp_path)
+
+    for name in assembler.EMITTERS:
+        assert os.path.exists(assembler.format_path(output_file, name)), name
+
+def test_emitters_match_the_spec(project, tmp_path):
+    output_file = emit_project(project, tmp_path)
+    spec = load_json(output_file)
+    converted = openapi.convert_document(spec)
+
+    assert yaml.safe_load(read(assembler.format_path(output_file, 'yaml'))) == spec
+    assert load_json(assembler.format_path(output_file, 'openapi3')) == converted
+    assert yaml.safe_load(read(assembler.format_path(output_file, 'openapi3-yaml'))) == converted
+    assert '#/definitions/' not in read(assembler.format_path(output_file, 'openapi3'))
+
+def test_yaml_has_no_anchors_or_aliases(project, tmp_path):
+    output_file = emit_project(project, tmp_path)
+
+    for name in ['yaml', 'openapi3-yaml']:
+        events = yaml.parse(read(assembler.format_path(output_file, name)))
+        assert not any(isinstance(event, yaml.AliasEvent) or getattr(event, 'anchor', None) for event in events), name
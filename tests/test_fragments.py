@@ -0,0 +1,91 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import fragments
+from conftest import ROOT
+
+PARSER = os.path.join(ROOT, 'swagger-parser', 'parser.py')
+
+def run(*args):
+    return subprocess.run([sys.executable, PARSER] + list(args), capture_output=True, text=True)
+
+def read(path):
+    with open(path, 'rb') as infile:
+        return infile.read()
+
+def build(project, output_file, *options):
+    result = run('-c', project, '--no-cache', '-o', output_file, *options)
+    assert result.returncode == 0, result.stdout + result.stderr
+
+@pytest.mark.parametrize('production', [False, True])
+@pytest.mark.parametrize('count', [1, 2, 3])
+def test_merged_shards_match_a_single_build(project, tmp_path, count, production):
+    options = ['-p'] if production else []
+    single = str(tmp_path / 'single.json')
+    build(project, single, *options)
+
+    output_file = str(tmp_path / 'apis.json')
+    for index in range(1, count + 1):
+        build(project, output_file, '--shard', '%d/%d' % (index, count), *options)
+
+    merged = str(tmp_path / 'merged.json')
+    result = run('merge', '-o', merged,
+        *[fragments.fragment_path(output_file, index, count) for index in range(1, count + 1)])
+
+    assert result.returncode == 0, result.stdout
+    assert 'WARNING' not in result.stdout
+    assert read(merged) == read(single)
+
+def test_merge_needs_every_shard_once(project, tmp_path):
+    output_file = str(tmp_path / 'apis.json')
+    for index in [1, 3]:
+        build(project, output_file, '--shard', '%d/3' % index)
+    first, third = [fragments.fragment_path(output_file, index, 3) for index in [1, 3]]
+
+    missing = run('merge', '-o', str(tmp_path / 'merged.json'), first, third)
+    assert missing.returncode == 1 and 'missing the fragments of shard 2' in missing.stdout
+
+    duplicate = run('merge', '-o', str(tmp_path / 'merged.json'), first, first, third)
+    assert duplicate.returncode == 1 and 'more than one fragment of shard 1' in duplicate.stdout
+
+def test_merge_refuses_shards_of_different_builds(project, tmp_path):
+    output_file = str(tmp_path / 'apis.json')
+    build(project, output_file, '--shard', '1/2')
+    build(project, output_file, '--shard', '2/2', '-p')
+
+    result = run('merge', '-o', str(tmp_path / 'merged.json'),
+        fragments.fragment_path(output_file, 1, 2), fragments.fragment_path(output_file, 2, 2))
+    assert result.returncode == 1 and 'built from a different project' in result.stdout
+
+def test_collisions_are_reported_and_the_later_file_wins():
+    project = {'parser': 'test'}
+    metadata = {'swagger': '2.0', 'info': {'title': 't', 'version': '1'}, 'host': 'h', 'basePath': '/',
+        'schemes': ['https']}
+    first = fragments.build_fragment(1, 2, project, metadata, [], [[0, 'A.java', {'/pets': {'get': 'a'}}]],
+        [[0, 'a.json', {'Pet': {'title': 'a'}}], [2, 'c.json', {'Pet': {'title': 'c'}}]])
+    second = fragments.build_fragment(2, 2, project, metadata, [], [[1, 'B.java', {'/pets': {'get': 'b'}}]],
+        [[1, 'b.json', {'Pet': {'title': 'b'}}]])
+
+    spec, collisions = fragments.merge_fragments([second, first])
+
+    assert spec['paths'] == {'/pets': {'get': 'b'}}
+    assert spec['definitions'] == {'Pet': {'title': 'c'}}
+    assert collisions == [
+        {'kind': 'path', 'name': '/pets', 'files': ['A.java', 'B.java']},
+        {'kind': 'definition', 'name': 'Pet', 'files': ['a.json', 'b.json', 'c.json']}
+    ]
+
+def test_options_a_shard_cant_take(project, tmp_path):
+    output_file = str(tmp_path / 'apis.json')
+
+    result = run('-c', project, '-o', output_file, '--shard', '1/2', '--validate')
+    assert result.returncode == 2 and 'pass it to parser.py merge instead' in result.stderr
+
+    for option in ['--artifacts', '--tag-shards', '--watch']:
+        result = run('-c', project, '-o', output_file, '--shard', '1/2', option)
+        assert result.returncode == 2, option
+        assert option + ' can\'t be used with a sharded build' in result.stderr
+        assert 'parser.py merge' not in result.stderr
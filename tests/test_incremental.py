@@ -0,0 +1,99 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import parser
+from conftest import ROOT, load_json
+
+def start(project, tmp_path):
+    output_file = str(tmp_path / 'apis.json')
+    build = parser.IncrementalBuild(project, False, output_file)
+    build.load()
+    build.emit()
+    return build, output_file
+
+def project_file(project, rel_path):
+    return os.path.abspath(os.path.join(os.path.dirname(project), rel_path))
+
+def age(path):
+    # moves the modification time back so a rewrite can't go unnoticed
+    os.utime(path, ns=(0, 0))
+
+def test_changed_resource_is_rebuilt(project, tmp_path):
+    build, output_file = start(project, tmp_path)
+    resource = project_file(project, 'resources/Resource1.java')
+    with open(resource) as infile:
+        source = infile.read()
+    with open(resource, 'w') as outfile:
+        outfile.write(source.replace('@Path("/resource1")', '@Path("/renamed1")'))
+
+    build.update([resource])
+
+    paths = load_json(output_file)['paths']
+    assert any(path.startswith('/renamed1/') for path in paths)
+    assert not any(path.startswith('/resource1/') for path in paths)
+
+def test_changed_model_is_rebuilt(project, tmp_path):
+    build, output_file = start(project, tmp_path)
+    model = project_file(project, 'models/Model2.json')
+    definitions = load_json(model)
+    definitions['definitions']['Added'] = {'type': 'object'}
+    with open(model, 'w') as outfile:
+        outfile.write(parser.json.dumps(definitions))
+
+    build.update([model])
+
+    assert load_json(output_file)['definitions']['Added'] == {'type': 'object'}
+
+def test_unchanged_spec_is_not_rewritten(project, tmp_path, capsys):
+    build, output_file = start(project, tmp_path)
+    age(output_file)
+    resource = project_file(project, 'resources/Resource0.java')
+    os.utime(resource)
+
+    build.update([resource])
+
+    assert os.stat(output_file).st_mtime_ns == 0
+    assert 'unchanged ' + output_file in capsys.readouterr().out
+
+def test_broken_resource_keeps_its_previous_paths(project, tmp_path, capsys):
+    build, output_file = start(project, tmp_path)
+    before = load_json(output_file)
+    resource = project_file(project, 'resources/Resource3.java')
+    with open(resource, 'w') as outfile:
+        outfile.write('/*api @Path("/broken") @Api(value = "/broken") */ public class Broken {\n'
+            '    /*api @ApiOperation(value = "no HTTP method") */\n    public void get() {}\n}\n')
+
+    build.update([resource])
+
+    assert 'ERROR: ' + resource in capsys.readouterr().out
+    assert load_json(output_file) == before
+
+def test_new_file_reloads_the_project(project, tmp_path):
+    config = load_json(project)
+    config['discover'] = {'resources': ['extra/*.java']}
+    with open(project, 'w') as outfile:
+        outfile.write(parser.json.dumps(config))
+    build, output_file = start(project, tmp_path)
+
+    extra = project_file(project, 'extra/Extra.java')
+    os.makedirs(os.path.dirname(extra))
+    with open(project_file(project, 'resources/Resource0.java')) as infile:
+        source = infile.read()
+    with open(extra, 'w') as outfile:
+        outfile.write(source.replace('resource0', 'extra'))
+
+    build.update([extra])
+
+    assert extra in build.watched_files()
+    assert any(path.startswith('/extra/') for path in load_json(output_file)['paths'])
+
+@pytest.mark.parametrize('option', ['--variants=full', '--artifacts', '--tag-shards', '--profile'])
+def test_watch_refuses_options_it_ignores(project, tmp_path, option):
+    result = subprocess.run([sys.executable, os.path.join(ROOT, 'swagger-parser', 'parser.py'), '-c', project,
+        '-o', str(tmp_path / 'apis.json'), '--watch', option], capture_output=True, text=True, timeout=60)
+
+    assert result.returncode == 2
+    assert '--watch builds a single spec and can\'t be combined with ' + option.split('=')[0] in result.stderr
@@ -0,0 +1,56 @@
+import lexer
+import parser
+
+SOURCE = b'''/*api
+ * @Path("/pet")
+ * @Api(value = "/pet", description = "Operations about \\"pets\\"", produces = "application/json, application/xml")
+ */
+public class PetResource {
+    /*api
+     * @GET
+     * @Path("/{id}")
+     * @ApiOperation(value = "Say \\"hi\\"", notes = "Returns the pet " + "when it exists, {braces} " +
+     *     "and (parens) are kept", response = "Pet", httpMethod = "GET", tags = {"pet", "a \\"quoted\\" tag"})
+     * @ApiResponses(value = { @ApiResponse(code = 404, message = "Pet " + "not found") })
+     * @ApiImplicitParams({
+     *     @ApiImplicitParam(name = "id", value = "The \\\\ id\\tof the pet", required = true, dataType = "long",
+     *         paramType = "path", defaultValue = "4" + "2"),
+     *     @ApiImplicitParam(name = "status", value = "Status", dataType = "string", paramType = "query",
+     *         allowableValues = "available,pending,sold")
+     * })
+     */
+    public Pet get(long id) { return null; }
+}
+'''
+
+def parse():
+    blocks = list(lexer.scan(SOURCE))
+    return parser.parse_resource(lexer.class_header(blocks[0])), parser.parse_methods(blocks[1:], False)[0]
+
+def test_unquote():
+    assert parser.unquote('"Say \\"hi\\""') == 'Say "hi"'
+    assert parser.unquote('"a" + "b"') == 'ab'
+    assert parser.unquote('"a"\n     *     + "b" + "c"') == 'abc'
+    assert parser.unquote('"tab\\there \\u00e9 \\101 \\\\"') == 'tab\there é A \\'
+    assert parser.unquote('""') == ''
+    # values that aren't literals only are kept as written
+    assert parser.unquote('"quote""') == '"quote""'
+    assert parser.unquote('200') == '200'
+    assert parser.unquote('true') == 'true'
+    assert parser.unquote('PREFIX + "x"') == 'PREFIX + "x"'
+
+def test_escaped_quotes_end_up_in_the_ir():
+    resource, operation = parse()
+
+    assert operation.summary == 'Say "hi"'
+    assert operation.tags == ['pet', 'a "quoted" tag']
+    assert operation.parameters[0].description == 'The \\ id\tof the pet'
+    assert resource.produces == ['application/json', 'application/xml']
+
+def test_concatenated_literals_are_joined():
+    _, operation = parse()
+
+    assert operation.description == 'Returns the pet when it exists, {braces} and (parens) are kept'
+    assert operation.responses[0].message == 'Pet not found'
+    assert operation.parameters[0].default == 42
+    assert operation.parameters[1].enum == ['available', 'pending', 'sold']
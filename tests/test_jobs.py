@@ -0,0 +1,43 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import parser
+from conftest import ROOT, load_json
+
+PARSER = os.path.join(ROOT, 'swagger-parser', 'parser.py')
+
+def run(*args):
+    return subprocess.run([sys.executable, PARSER, '--no-cache'] + list(args), capture_output=True, text=True)
+
+def read(path):
+    with open(path, 'rb') as infile:
+        return infile.read()
+
+@pytest.mark.parametrize('production', [False, True])
+def test_parallel_build_matches_a_serial_one(project, tmp_path, production):
+    options = ['-p'] if production else []
+    serial = str(tmp_path / 'serial.json')
+    parallel = str(tmp_path / 'parallel.json')
+
+    serial_result = run('-c', project, '-j', '1', '-o', serial, *options)
+    parallel_result = run('-c', project, '-j', '3', '-o', parallel, *options)
+
+    assert serial_result.returncode == parallel_result.returncode == 0, parallel_result.stdout
+    assert read(parallel) == read(serial)
+    # the warnings come back in include order too
+    assert parallel_result.stdout.replace(parallel, serial) == serial_result.stdout
+
+def test_broken_resource_fails_a_parallel_build(project):
+    base_dir = os.path.dirname(project)
+    resource = os.path.join(base_dir, 'resources', 'Resource1.java')
+    with open(resource, 'w') as outfile:
+        outfile.write('/*api @Path("/broken") @Api(value = "/broken") */ public class Broken {\n'
+            '    /*api @ApiOperation(value = "no HTTP method") */\n    public void get() {}\n}\n')
+
+    with pytest.raises(parser.ParseError) as error:
+        parser.generate(load_json(project), base_dir, jobs=2)
+
+    assert resource in str(error.value)
@@ -0,0 +1,46 @@
+import math
+
+import pytest
+
+import json_backend
+
+DOCUMENTS = [
+    b'{"definitions": {"Pet": {"type": "object", "properties": {"id": {"type": "integer"}}}}}',
+    b'{"minimum": NaN, "maximum": Infinity, "lower": -Infinity}',
+    b'{"big": 123456789012345678901234567890, "negative": -98765432109876543210}',
+    b'{"surrogate": "\xed\xa0\x80"}',
+    b'{"text": "caf\xc3\xa9", "escaped": "\\u00e9", "empty": null}'
+]
+
+OBJECTS = [
+    {'a': [1, 2.5, 'three', None, True]},
+    {'nan': float('nan'), 'inf': float('inf')},
+    {'big': 2 ** 70},
+    {1: 'integer key'},
+    {'unicode': 'café ✓'}
+]
+
+BACKENDS = sorted(json_backend.BACKENDS)
+
+def same(left, right):
+    # equality that treats NaN as equal to itself
+    if isinstance(left, float) and isinstance(right, float) and math.isnan(left):
+        return math.isnan(right)
+    if isinstance(left, dict) and isinstance(right, dict):
+        return left.keys() == right.keys() and all(same(left[key], right[key]) for key in left)
+    if isinstance(left, list) and isinstance(right, list):
+        return len(left) == len(right) and all(same(a, b) for a, b in zip(left, right))
+    return type(left) is type(right) and left == right
+
+@pytest.mark.parametrize('document', DOCUMENTS)
+def test_every_backend_loads_the_same(document):
+    reference = json_backend.BACKENDS['json'].loads(document)
+    for name in BACKENDS:
+        assert same(json_backend.BACKENDS[name].loads(document), reference), name
+
+@pytest.mark.parametrize('obj', OBJECTS)
+def test_every_backend_dumps_the_same(obj):
+    reference = json_backend.BACKENDS['json'].loads(json_backend.BACKENDS['json'].dumps(obj))
+    for name in BACKENDS:
+        backend = json_backend.BACKENDS[name]
+        assert same(backend.loads(backend.dumps(obj)), reference), name
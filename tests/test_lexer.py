@@ -0,0 +1,64 @@
+import glob
+import os
+
+import pytest
+
+import lexer
+
+SOURCE = b'''package pet;
+
+// /*api @GET */ in a line comment
+/*api
+ * @Path("/pet")
+ * @Api(value = "/pet", description = "Pets")
+ */
+@Produces({"application/json"})
+public class PetResource {
+    private static final String MARKER = "/*api in a string */ {";
+    private static final char BRACE = '}';
+
+    /*api
+     * @GET
+     * @Path("/{id}")
+     * @ApiOperation(value = "Find a pet")
+     */
+    @Override
+    public Response get(@PathParam("id") String id) {
+        if (id == null) { throw new NotFoundException("missing }"); }
+        /* an ordinary comment { */
+        return Response.ok().build();
+    }
+
+    /*api @DELETE */
+    public abstract Response delete();
+}
+'''
+
+@pytest.mark.parametrize('prefilter', [False, True])
+def test_scan_finds_the_api_blocks(prefilter):
+    blocks = list(lexer.scan(SOURCE, prefilter=prefilter))
+
+    assert [block.is_class for block in blocks] == [True, False, False]
+    assert [block.line for block in blocks] == [4, 13, 25]
+    assert [block.offset for block in blocks] == [SOURCE.index(b'/*api\n'), SOURCE.index(b'/*api\n     * @GET'),
+        SOURCE.index(b'/*api @DELETE')]
+
+    assert '@Api(value = "/pet", description = "Pets")' in blocks[0].annotation
+    assert blocks[1].signature == '\n    @Override\n    public Response get(@PathParam("id") String id) '
+    assert blocks[2].annotation == ' @DELETE '
+    assert blocks[2].signature == '\n    public abstract Response delete()'
+
+def test_class_header():
+    block = next(lexer.scan(SOURCE))
+
+    assert lexer.class_header(block) == ('/*api\n * @Path("/pet")\n * @Api(value = "/pet", description = "Pets")\n */'
+        '\n@Produces({"application/json"})\npublic class PetResource {')
+
+def test_prefilter_matches_the_full_scan_on_the_project(project):
+    sources = glob.glob(os.path.join(os.path.dirname(project), 'resources', '*.java'))
+    assert sources
+
+    for source_file in sources:
+        with open(source_file, 'rb') as infile:
+            source = infile.read()
+        assert list(lexer.scan(source, prefilter=True)) == list(lexer.scan(source)), source_file
@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+
+import parser
+from conftest import ROOT, load_json
+
+PARSER = os.path.join(ROOT, 'swagger-parser', 'parser.py')
+
+def read(path):
+    with open(path, 'rb') as infile:
+        return infile.read()
+
+def test_model_workers_give_the_same_spec(project):
+    base_dir = os.path.dirname(project)
+    config = load_json(project)
+
+    assert parser.generate(config, base_dir, model_workers=4) == parser.generate(config, base_dir)
+
+def test_model_workers_option_writes_the_same_file(project, tmp_path):
+    outputs = []
+    for workers in ['1', '4']:
+        outputs.append(str(tmp_path / ('apis%s.json' % workers)))
+        result = subprocess.run([sys.executable, PARSER, '-c', project, '--no-cache', '--model-workers', workers,
+            '-o', outputs[-1]], capture_output=True, text=True)
+        assert result.returncode == 0, result.stdout + result.stderr
+
+    assert read(outputs[0]) == read(outputs[1])
@@ -0,0 +1,69 @@
+import json
+
+import assembler
+from conftest import load_json
+
+DEFINITIONS = {
+    'Pet': {'type': 'object', 'properties': {
+        'tags': {'type': 'array', 'items': {'$ref': '#/definitions/Tag'}},
+        'owner': {'allOf': [{'$ref': '#/definitions/Owner'}]}}},
+    'Tag': {'type': 'object', 'additionalProperties': {'$ref': '#/definitions/Label'}},
+    'Label': {'type': 'string'},
+    'Owner': {'type': 'object', 'properties': {'pets': {'type': 'array', 'items': {'$ref': '#/definitions/Pet'}}}},
+    'Order': {'type': 'object'},
+    'Unused': {'type': 'object', 'properties': {'category': {'$ref': '#/definitions/Category'}}},
+    'Category': {'type': 'object'},
+    'CycleA': {'$ref': '#/definitions/CycleB'},
+    'CycleB': {'$ref': '#/definitions/CycleA'}
+}
+
+PATHS = {
+    '/pets': {'get': {'responses': {'200': {'description': 'ok',
+        'schema': {'type': 'array', 'items': {'$ref': '#/definitions/Pet'}}}}}},
+    '/orders': {'post': {'parameters': [{'name': 'body', 'in': 'body', 'schema': {'type': 'object',
+        'additionalProperties': {'type': 'array', 'items': {'$ref': '#/definitions/Order'}}}}],
+        'responses': {'204': {'description': 'ok'}}}}
+}
+
+METADATA = {'swagger': '2.0', 'info': {'title': 't', 'version': '1'}, 'host': 'h', 'basePath': '/',
+    'schemes': ['https']}
+
+KEPT = ['Label', 'Order', 'Owner', 'Pet', 'Tag']
+PRUNED = ['Category', 'CycleA', 'CycleB', 'Unused']
+
+def write_models(tmp_path):
+    model_file = str(tmp_path / 'models.json')
+    with open(model_file, 'w') as outfile:
+        json.dump({'definitions': DEFINITIONS}, outfile)
+    return model_file
+
+def test_assemble_project_keeps_nested_and_array_refs(tmp_path, capsys):
+    output_file = str(tmp_path / 'apis.json')
+    pruned = assembler.assemble_project(PATHS, [write_models(tmp_path)], [], METADATA, prune=True,
+        output_file=output_file)
+
+    assert pruned == PRUNED
+    assert sorted(load_json(output_file)['definitions']) == KEPT
+    assert 'NOTE: pruned 4 unreachable definitions: ' + ', '.join(PRUNED) in capsys.readouterr().out
+
+def test_build_spec_prunes_the_same(tmp_path):
+    spec = assembler.build_spec(PATHS, [write_models(tmp_path)], [], METADATA, prune=True)
+
+    assert sorted(spec['definitions']) == KEPT
+
+def test_nothing_is_pruned_without_the_option(tmp_path, capsys):
+    output_file = str(tmp_path / 'apis.json')
+    assert assembler.assemble_project(PATHS, [write_models(tmp_path)], [], METADATA, output_file=output_file) == []
+
+    assert sorted(load_json(output_file)['definitions']) == sorted(DEFINITIONS)
+    assert 'NOTE' not in capsys.readouterr().out
+
+def test_find_reachable():
+    ref_index = dict((model, assembler.collect_refs(value)) for model, value in DEFINITIONS.items())
+
+    reachable, pruned = assembler.find_reachable(PATHS, ref_index)
+
+    assert sorted(reachable) == KEPT and pruned == PRUNED
+    # refs to models that don't exist are not reported as reachable
+    assert assembler.find_reachable({'/a': {'$ref': '#/definitions/Missing'}}, ref_index) == (set(),
+        sorted(DEFINITIONS))
@@ -0,0 +1,136 @@
+import gzip
+import http.client
+import os
+import threading
+
+import pytest
+
+import artifacts
+import parser
+import server
+from conftest import load_json
+
+SPEC = {'swagger': '2.0', 'info': {'title': 'Pets', 'version': '1'}, 'paths': {}, 'definitions': {}}
+
+@pytest.mark.parametrize('header, expected', [
+    ('gzip', True),
+    ('gzip, deflate, br', True),
+    ('br;q=1.0, gzip;q=0.5', True),
+    ('GZIP', True),
+    ('*', True),
+    ('gzip;q=0', False),
+    ('gzip; q=0.0', False),
+    ('gzip;q=0, *', False),
+    ('*;q=1, gzip;q=0', False),
+    ('*;q=0', False),
+    ('gzip;q=oops', False),
+    ('br, deflate', False),
+    ('', False)
+])
+def test_accepts_gzip(header, expected):
+    assert server.accepts_gzip(header) == expected
+
+@pytest.mark.parametrize('header, expected', [
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"xyz", "abc"', True),
+    ('"xyz",W/"abc"', True),
+    ('*', True),
+    ('"xyz"', False),
+    ('"abc-gzip"', False),
+    ('', False),
+    (None, False)
+])
+def test_etag_matches(header, expected):
+    assert server.etag_matches(header, '"abc"') == expected
+
+@pytest.fixture
+def serve():
+    store = server.SpecStore()
+    httpd = server.create_server(store, '127.0.0.1', 0, ['/', '/apis.json'])
+    thread = threading.Thread(target=httpd.serve_forever)
+    thread.start()
+
+    def request(method='GET', path='/apis.json', **headers):
+        connection = http.client.HTTPConnection('127.0.0.1', httpd.server_address[1], timeout=10)
+        connection.request(method, path, headers=headers)
+        response = connection.getresponse()
+        body = response.read()
+        connection.close()
+        return response, body
+
+    yield store, request
+
+    httpd.shutdown()
+    httpd.server_close()
+    thread.join()
+
+def test_nothing_is_served_before_the_first_build(serve):
+    _, request = serve
+
+    response, _ = request()
+    assert response.status == 503 and response.getheader('Retry-After') == '1'
+
+def test_spec_and_revalidation(serve):
+    store, request = serve
+    assert store.publish(SPEC)
+
+    response, body = request()
+    assert response.status == 200
+    assert body == parser.json.dumps(SPEC, sort_keys=True, indent=4).encode('utf-8')
+    etag = response.getheader('ETag')
+    assert response.getheader('Vary') == 'Accept-Encoding'
+
+    for if_none_match in [etag, 'W/' + etag, '"other", ' + etag, '*']:
+        response, body = request(**{'If-None-Match': if_none_match})
+        assert response.status == 304 and body == b'' and response.getheader('ETag') == etag
+
+    response, _ = request(**{'If-None-Match': '"other"'})
+    assert response.status == 200
+
+    assert request('GET', '/other')[0].status == 404
+    response, body = request('HEAD')
+    assert response.status == 200 and body == b'' and response.getheader('Content-Length') == str(len(
+        store.current.body))
+
+def test_gzip_negotiation(serve):
+    store, request = serve
+    store.publish(SPEC)
+
+    response, body = request(**{'Accept-Encoding': 'gzip'})
+    assert response.getheader('Content-Encoding') == 'gzip'
+    assert gzip.decompress(body) == store.current.body
+    gzip_etag = response.getheader('ETag')
+    assert gzip_etag != store.current.etag
+
+    response, _ = request(**{'Accept-Encoding': 'gzip', 'If-None-Match': gzip_etag})
+    assert response.status == 304
+
+    # the identity ETag doesn't validate the gzip representation
+    response, _ = request(**{'Accept-Encoding': 'gzip', 'If-None-Match': store.current.etag})
+    assert response.status == 200
+
+    response, body = request(**{'Accept-Encoding': 'gzip;q=0'})
+    assert response.getheader('Content-Encoding') is None and body == store.current.body
+
+def test_unchanged_spec_keeps_its_etag(serve):
+    store, _ = serve
+    assert store.publish(SPEC)
+    etag = store.current.etag
+
+    assert not store.publish(dict(SPEC))
+    assert store.publish(dict(SPEC, basePath='/v2'))
+    assert store.current.etag != etag
+
+def test_etag_is_the_one_of_the_artifacts_manifest(project, tmp_path):
+    output_file = str(tmp_path / 'apis.json')
+    base_dir = os.path.dirname(project)
+    complete_paths_obj, model_list, tag_list, metadata = parser.parse_project(parser.load_config(project), base_dir,
+        False)
+    parser.assembler.assemble_project(complete_paths_obj, model_list, tag_list, metadata, output_file=output_file,
+        build_artifacts=True)
+
+    store = server.SpecStore()
+    store.publish(load_json(output_file))
+
+    assert store.current.etag == load_json(artifacts.manifest_path(output_file))['etag']
@@ -0,0 +1,109 @@
+import copy
+
+import spec_diff
+
+def operation(**fields):
+    value = {'operationId': 'getPet', 'produces': ['application/json'], 'consumes': ['application/json'],
+        'parameters': [{'name': 'id', 'in': 'path', 'required': True, 'type': 'integer', 'minimum': 1,
+            'maximum': 100},
+            {'name': 'status', 'in': 'query', 'required': False, 'type': 'string', 'enum': ['a', 'b', 'c']}],
+        'responses': {'200': {'description': 'ok', 'schema': {'$ref': '#/definitions/Pet'}},
+            '404': {'description': 'not found'}}}
+    value.update(fields)
+    return value
+
+def spec():
+    return {
+        'paths': {'/pets/{id}': {'get': operation(), 'delete': operation(operationId='deletePet')}},
+        'definitions': {'Pet': {'type': 'object', 'required': ['id'],
+            'properties': {'id': {'type': 'integer'}, 'name': {'type': 'string'}}}}
+    }
+
+def changed(edit):
+    # diffs spec() against a copy changed by edit
+    new = copy.deepcopy(spec())
+    edit(new)
+    return spec_diff.diff_specs(spec(), new)
+
+def details(changes):
+    return dict((item['message'], item['breaking']) for change in changes for item in change['details'])
+
+def get_operation(new):
+    return new['paths']['/pets/{id}']['get']
+
+def test_equal_specs_have_no_changes():
+    assert spec_diff.diff_specs(spec(), spec()) == []
+
+def test_removed_operations_break_added_ones_dont():
+    removed = changed(lambda new: new['paths']['/pets/{id}'].pop('delete'))
+    assert [(change['change'], change['method'], change['breaking']) for change in removed] == [
+        ('removed', 'delete', True)]
+
+    added = changed(lambda new: new['paths'].setdefault('/pets', {}).update(post=operation()))
+    assert [(change['change'], change['path'], change['breaking']) for change in added] == [
+        ('added', '/pets', False)]
+
+def test_added_parameters():
+    def add(required):
+        return lambda new: get_operation(new)['parameters'].append(
+            {'name': 'q', 'in': 'query', 'required': required, 'type': 'string'})
+
+    assert details(changed(add(True))) == {'required parameter q (query) added': True}
+    assert details(changed(add(False))) == {'optional parameter q (query) added': False}
+    assert details(changed(lambda new: get_operation(new)['parameters'].pop())) == {
+        'parameter status (query) removed': True}
+
+def test_removed_responses():
+    assert details(changed(lambda new: get_operation(new)['responses'].pop('200'))) == {
+        'response 200 removed': True}
+    assert details(changed(lambda new: get_operation(new)['responses'].pop('404'))) == {
+        'response 404 removed': False}
+
+def test_removed_enum_values():
+    def narrow(new):
+        get_operation(new)['parameters'][1]['enum'] = ['a', 'b']
+
+    assert details(changed(narrow)) == {'parameter status (query) no longer allows c': True}
+
+    def widen(new):
+        get_operation(new)['parameters'][1]['enum'] = ['a', 'b', 'c', 'd']
+
+    assert details(changed(widen)) == {'parameter status (query) changed': False}
+
+def test_narrowed_range():
+    def narrow(new):
+        get_operation(new)['parameters'][0]['maximum'] = 50
+
+    assert details(changed(narrow)) == {'parameter id (path) range narrowed': True}
+
+    def widen(new):
+        get_operation(new)['parameters'][0]['minimum'] = 0
+
+    assert details(changed(widen)) == {'parameter id (path) changed': False}
+
+def test_property_became_required():
+    def require(new):
+        new['definitions']['Pet']['required'].append('name')
+
+    changes = changed(require)
+    assert [(change['kind'], change['name'], change['breaking']) for change in changes] == [('definition', 'Pet', True)]
+    assert details(changes) == {'property name became required': True}
+
+def test_removed_media_types():
+    assert details(changed(lambda new: get_operation(new).update(produces=[]))) == {
+        'produces no longer lists application/json': True}
+    assert details(changed(lambda new: get_operation(new).update(consumes=['application/json', 'text/plain']))) == {
+        'consumes now lists text/plain': False}
+
+def test_path_items_that_are_not_objects():
+    changes = changed(lambda new: new['paths'].update({'/pets/{id}': 'broken'}))
+    assert sorted((change['change'], change['method']) for change in changes) == [
+        ('removed', 'delete'), ('removed', 'get')]
+
+    changes = spec_diff.diff_specs({'paths': {'/a': None}}, {'paths': {'/a': {'get': operation()}}})
+    assert [(change['change'], change['method']) for change in changes] == [('added', 'get')]
+
+    changes = spec_diff.diff_specs({'paths': {'/a': {'get': 'broken'}}}, {'paths': {'/a': {'get': operation()}}})
+    assert details(changes) == {'operation is not an object': False}
+
+    assert spec_diff.diff_specs({'paths': None}, {'paths': None}) == []
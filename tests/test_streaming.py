@@ -0,0 +1,78 @@
+import io
+import json
+import os
+
+import pytest
+
+import assembler
+import parser
+
+HEADER = {
+    'swagger': '2.0',
+    'info': {'title': 'Pets', 'version': '1', 'description': 'café ☃ "quoted"\n'},
+    'tags': [{'name': 'pets', 'description': 'Pet operations'}],
+    'schemes': ['https'],
+    'empty': {}
+}
+
+PATHS = {
+    '/pets': {'get': {'responses': {'200': {'description': 'ok', 'schema': {'type': 'array',
+        'items': {'$ref': '#/definitions/Pet'}}}}}},
+    '/pets/{id}': {'delete': {'parameters': [{'name': 'id', 'in': 'path', 'required': True, 'type': 'integer',
+        'minimum': 1.5, 'maximum': 10}], 'responses': {'204': {'description': 'gone'}}}},
+    '/a': {}
+}
+
+DEFINITIONS = {
+    'Pet': {'type': 'object', 'properties': {'id': {'type': 'integer'}, 'tags': {'type': 'array', 'items': {}}}},
+    'Empty': {}
+}
+
+def streamed(objects):
+    return dict((key, assembler.StreamedObject(list(value), value.get)) for key, value in objects.items())
+
+def write(final_obj, streamed_objects, indent):
+    outfile = io.StringIO()
+    assembler.write_spec(outfile, final_obj, streamed_objects, indent)
+    return outfile.getvalue()
+
+def dump(obj, indent):
+    if indent is None:
+        return json.dumps(obj, sort_keys=True, separators=(',', ':'))
+    return json.dumps(obj, sort_keys=True, indent=indent)
+
+@pytest.mark.parametrize('indent', [assembler.INDENT, '  ', None])
+def test_write_spec_matches_json_dumps(indent):
+    expected = dict(HEADER, paths=PATHS, definitions=DEFINITIONS)
+
+    assert write(HEADER, streamed({'paths': PATHS, 'definitions': DEFINITIONS}), indent) == dump(expected, indent)
+
+@pytest.mark.parametrize('indent', [assembler.INDENT, None])
+def test_empty_streamed_objects(indent):
+    expected = dict(HEADER, paths={}, definitions={})
+
+    assert write(HEADER, streamed({'paths': {}, 'definitions': {}}), indent) == dump(expected, indent)
+
+@pytest.mark.parametrize('indent', [assembler.INDENT, None])
+def test_nested_streamed_objects(indent):
+    final_obj = {'openapi': '3.0.3', 'info': HEADER['info']}
+    objects = {'paths': streamed({'paths': PATHS})['paths'], 'components': streamed({'schemas': DEFINITIONS})}
+    expected = dict(final_obj, paths=PATHS, components={'schemas': DEFINITIONS})
+
+    assert write(final_obj, objects, indent) == dump(expected, indent)
+
+def test_streamed_build_matches_the_in_memory_one(project, tmp_path):
+    # the command line streams the spec out, generate() builds it in memory
+    # and writes it with json.dump, both must give the same bytes
+    base_dir = os.path.dirname(project)
+    config = parser.load_config(project)
+
+    streamed_file = str(tmp_path / 'streamed.json')
+    complete_paths_obj, model_list, tag_list, metadata = parser.parse_project(config, base_dir, False)
+    assembler.assemble_project(complete_paths_obj, model_list, tag_list, metadata, output_file=streamed_file)
+
+    dumped_file = str(tmp_path / 'dumped.json')
+    parser.generate(config, base_dir, output=dumped_file)
+
+    with open(streamed_file, 'rb') as streamed_spec, open(dumped_file, 'rb') as dumped_spec:
+        assert streamed_spec.read() == dumped_spec.read()
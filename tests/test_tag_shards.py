@@ -0,0 +1,45 @@
+import os
+
+import assembler
+from conftest import load_json
+
+def write_shards(tmp_path, tags, operations):
+    # writes the tag shards of a spec whose paths each hold one operation with
+    # the given tags, returns the shard directory
+    final_obj = assembler.spec_header([(tag, tag + ' operations') for tag in tags],
+        {'swagger': '2.0', 'info': {'title': 't', 'version': '1'}, 'host': 'h', 'basePath': '/', 'schemes': ['https']})
+    paths = dict(('/op%d' % index, {'get': {'tags': op_tags, 'responses': {}}})
+        for index, op_tags in enumerate(operations))
+
+    output_file = str(tmp_path / 'apis.json')
+    definitions = assembler.StreamedObject([], None)
+    assembler.write_tag_shards(output_file, final_obj, paths, {}, definitions)
+    return assembler.shard_path(output_file)
+
+def test_tag_named_index_does_not_replace_the_index(tmp_path):
+    shard_dir = write_shards(tmp_path, ['index', 'pets'], [['index'], ['pets']])
+    index = load_json(os.path.join(shard_dir, assembler.SHARD_INDEX))
+
+    assert [shard['tag'] for shard in index['shards']] == ['index', 'pets']
+    shard = load_json(os.path.join(shard_dir, index['shards'][0]['file']))
+    assert list(shard['paths']) == ['/op0']
+
+def test_tags_sanitized_to_the_same_name_get_their_own_files(tmp_path):
+    shard_dir = write_shards(tmp_path, ['a b', 'a/b', 'a_b'], [['a b'], ['a/b'], ['a_b']])
+    index = load_json(os.path.join(shard_dir, assembler.SHARD_INDEX))
+
+    files = [shard['file'] for shard in index['shards']]
+    assert len(set(files)) == 3
+    for shard, path in zip(index['shards'], ['/op0', '/op1', '/op2']):
+        assert list(load_json(os.path.join(shard_dir, shard['file']))['paths']) == [path]
+
+def test_shards_of_removed_tags_are_deleted(tmp_path):
+    write_shards(tmp_path, ['pets', 'store'], [['pets'], ['store']])
+    shard_dir = write_shards(tmp_path, ['pets'], [['pets']])
+
+    assert sorted(os.listdir(shard_dir)) == [assembler.SHARD_INDEX, 'tag-pets.json']
+
+def test_shard_file_names():
+    assert assembler.shard_file_name('pets', set()) == 'tag-pets.json'
+    assert assembler.shard_file_name('pets', set(['tag-pets.json'])).startswith('tag-pets-')
+    assert assembler.shard_file_name('a b', set()) != assembler.shard_file_name('a/b', set())
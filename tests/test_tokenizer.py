@@ -0,0 +1,84 @@
+import pytest
+
+import parser
+
+def tokenize(body):
+    return parser.tokenize_attributes(body)[0]
+
+def test_tokenize_keeps_raw_values():
+    body = 'value = "Find", code = 200, hidden = true, ratio = -1.5, response = Pet.class)'
+
+    assert parser.tokenize_attributes(body) == ([('value', '"Find"'), ('code', '200'), ('hidden', 'true'),
+        ('ratio', '-1.5'), ('response', 'Pet.class')], len(body))
+
+def test_tokenize_escaped_quotes_and_concatenation():
+    assert tokenize(r'value = "say \"hi\", )", notes = "a, " +' + '\n * "b")') == [
+        ('value', r'"say \"hi\", )"'), ('notes', '"a, " +\n * "b"')]
+
+def test_tokenize_arrays_and_nested_annotations():
+    assert tokenize('tags = {"pet", "store"}, value = {@ApiResponse(code = 400, message = "bad ) {")})') == [
+        ('tags', '{"pet", "store"}'), ('value', '{@ApiResponse(code = 400, message = "bad ) {")}')]
+
+def test_tokenize_value_without_key():
+    assert tokenize('{@ApiImplicitParam(name = "id")})') == [('value', '{@ApiImplicitParam(name = "id")}')]
+
+def test_tokenize_stops_after_the_closing_parenthesis():
+    body = 'value = "a") public void get(String b)'
+
+    assert parser.tokenize_attributes(body) == ([('value', '"a"')], body.index(')') + 1)
+
+@pytest.mark.parametrize('body', ['value = "unterminated, code = 1', 'value = {"a", "b"', 'code = , = 3)',
+    'value = @Nested(', '=', ''])
+def test_tokenize_malformed_input_ends(body):
+    key_val_list, index = parser.tokenize_attributes(body)
+
+    assert index <= len(body)
+    assert all(isinstance(value, str) for _, value in key_val_list)
+
+def test_split_array():
+    assert parser.split_array('{"a", {"b", "c"}, 3, "d}"}') == ['"a"', '{"b", "c"}', '3', '"d}"']
+    assert parser.split_array('"one"') == ['"one"']
+    assert parser.split_array('{}') == parser.split_array('') == []
+
+def test_parse_api_operation():
+    annotations = ('@GET @ApiOperation(value = "Find " + "a pet", tags = {"pet", "animal"}, code = 201,'
+        ' hidden = true, response = Pet.class, unknown = "x")')
+
+    assert parser.parse_api_operation(annotations) == {'value': '"Find " + "a pet"', 'tags': ['pet', 'animal'],
+        'code': '201', 'hidden': 'true', 'response': 'Pet.class'}
+    assert parser.parse_api_operation('@GET') == {}
+
+def test_parse_implicit_params():
+    annotations = ('@ApiImplicitParams({\n * @ApiImplicitParam(name = "id", paramType = "path", required = true,'
+        ' dataType = "long", unknown = "x"),\n * @ApiImplicitParam(name = "q", value = "a \\"b\\"",'
+        ' paramType = "query", dataType = "string"), "not a param"})')
+
+    assert parser.parse_implicit_params(annotations) == [
+        {'name': '"id"', 'paramType': '"path"', 'required': 'true', 'dataType': '"long"'},
+        {'name': '"q"', 'value': '"a \\"b\\""', 'paramType': '"query"', 'dataType': '"string"'}]
+    assert parser.parse_implicit_params('@GET') is None
+
+def test_parse_api_responses():
+    annotations = ('@ApiResponses(value = {@ApiResponse(code = 400, message = "Invalid " + "ID",'
+        ' response = Error.class), @ApiResponse(code = 404, message = "Not found")})')
+
+    assert parser.parse_api_responses(annotations) == [{'code': '400', 'message': '"Invalid " + "ID"'},
+        {'code': '404', 'message': '"Not found"'}]
+    assert parser.parse_api_responses('@GET') is None
+
+def test_parse_api():
+    annotations = r'@Path("/pet") @Api(value = "/pet", description = "Pets \"all\"", tags = {"pet"}, hidden = true)'
+
+    assert parser.parse_api(annotations) == {'value': '/pet', 'description': 'Pets "all"', 'tags': ['pet']}
+    assert parser.parse_api('@Path("/pet")') == {}
+
+def test_malformed_annotation_is_a_parse_error(tmp_path):
+    resource = tmp_path / 'Broken.java'
+    # the unterminated string swallows the httpMethod attribute
+    resource.write_text('/*api @Path("/pet") @Api(value = "/pet") */\npublic class Broken {\n'
+        '    /*api\n     * @ApiOperation(value = "Find, httpMethod = "GET")\n     */\n    public Pet get() {}\n}\n')
+
+    with pytest.raises(parser.ParseError) as error:
+        parser.parse_resources([str(resource)], False)
+
+    assert str(resource) in str(error.value) and 'line 3' in str(error.value)
@@ -0,0 +1,71 @@
+import copy
+
+import cache
+import validator
+
+def make_spec():
+    bad_definition = {'type': 'array'}
+    bad_operation = {'operationId': None, 'parameters': [{'name': 'q', 'in': 'query'}],
+        'responses': {'200': {'description': 'ok'}}}
+    return {
+        'swagger': '2.0',
+        'info': {'title': 't', 'version': '1'},
+        'basePath': '/',
+        'paths': {
+            '/a': {'get': copy.deepcopy(bad_operation), 'post': copy.deepcopy(bad_operation)},
+            '/b/{id}': {'get': {'operationId': 'getB', 'responses': {'200': {'description': 'ok',
+                'schema': {'$ref': '#/definitions/Missing'}}}}}
+        },
+        'definitions': {'Alpha': copy.deepcopy(bad_definition), 'Beta': copy.deepcopy(bad_definition)}
+    }
+
+def report(issues):
+    return sorted((found['location'], found['message']) for found in issues)
+
+def test_finds_the_errors_of_the_spec():
+    locations = set(found['location'] for found in validator.SpecValidator().validate(make_spec()))
+
+    assert 'GET /a parameter q' in locations and 'POST /a parameter q' in locations
+    assert 'definition Alpha' in locations and 'definition Beta' in locations
+    assert 'GET /b/{id}' in locations
+
+def test_warm_cache_reports_the_same_issues():
+    spec_validator = validator.SpecValidator()
+    cold = report(spec_validator.validate(make_spec()))
+    warm = report(spec_validator.validate(make_spec()))
+
+    assert warm == cold
+    assert report(validator.SpecValidator().validate(make_spec())) == cold
+
+def test_warm_cache_follows_renamed_definitions():
+    spec_validator = validator.SpecValidator()
+    spec_validator.validate(make_spec())
+
+    spec = make_spec()
+    spec['definitions']['Gamma'] = spec['definitions'].pop('Alpha')
+    locations = set(location for location, _ in report(spec_validator.validate(spec)))
+
+    assert 'definition Gamma' in locations
+    assert 'definition Alpha' not in locations
+
+def test_only_changed_entries_are_checked_again(monkeypatch):
+    spec_validator = validator.SpecValidator()
+    spec_validator.validate(make_spec())
+
+    checked = []
+    check_operation = validator.check_operation
+    monkeypatch.setattr(validator, 'check_operation', lambda *args: checked.append(args[3]) or check_operation(*args))
+
+    spec = make_spec()
+    spec['paths']['/a']['post']['summary'] = 'changed'
+    spec_validator.validate(spec)
+
+    assert checked == ['POST /a']
+
+def test_results_persist_in_the_build_cache(tmp_path):
+    build_cache = cache.BuildCache('test', str(tmp_path / 'cache'))
+    cold = report(validator.SpecValidator(build_cache, 'apis.json').validate(make_spec()))
+
+    spec_validator = validator.SpecValidator(build_cache, 'apis.json')
+    assert spec_validator.results
+    assert report(spec_validator.validate(make_spec())) == cold
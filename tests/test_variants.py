@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+
+import parser
+from conftest import ROOT, load_json
+
+PARSER = os.path.join(ROOT, 'swagger-parser', 'parser.py')
+
+def build(*args):
+    result = subprocess.run([sys.executable, PARSER, '--no-cache'] + list(args), capture_output=True, text=True)
+    assert result.returncode == 0, result.stdout + result.stderr
+
+def read(path):
+    with open(path, 'rb') as infile:
+        return infile.read()
+
+def test_generate_variants_matches_separate_builds(project):
+    base_dir = os.path.dirname(project)
+    config = load_json(project)
+
+    specs = parser.generate_variants(config, base_dir)
+
+    assert specs['full'] == parser.generate(config, base_dir)
+    assert specs['production'] == parser.generate(config, base_dir, production=True)
+    assert specs['full'] != specs['production']
+
+def test_variants_option_matches_separate_builds(project, tmp_path):
+    build('-c', project, '-o', str(tmp_path / 'full.json'))
+    build('-c', project, '-p', '-o', str(tmp_path / 'production.json'))
+    build('-c', project, '--variants', 'full,production', '-o', str(tmp_path / 'apis.json'))
+
+    assert read(str(tmp_path / 'apis.full.json')) == read(str(tmp_path / 'full.json'))
+    assert read(str(tmp_path / 'apis.production.json')) == read(str(tmp_path / 'production.json'))